@@ -0,0 +1,359 @@
+"""Deterministic stand-ins for the OpenAI models and the PostgreSQL driver, used by the benchmark."""
+
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.llms import CompletionResponse, CompletionResponseGen, CustomLLM, LLMMetadata
+from llama_index.core.llms.callbacks import llm_completion_callback
+
+WORD = re.compile(r"\w+")
+
+# Keywords routing a ReAct question to a tool, checked in order
+TOOL_ROUTES = [
+    (("status of an application for", "application id for"), "execute_database"),
+    (("table", "column", "sql", "database", "schema"), "query_database"),
+    (("ui", "page", "form", "field", "validation", "frontend"), "query_frontend"),
+    (("api", "backend", "decline", "submission", "persist", "service"), "query_backend"),
+]
+FAKE_SQL = "SELECT la.id, la.status FROM loan_applications la JOIN applicants a ON a.id = la.applicant_id LIMIT 10"
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except Exception:  # tiktoken is optional, fall back to a rough estimate
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens of the text for OpenAI models, estimated as 4 characters per token without tiktoken."""
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def hash_embedding(text: str, dimension: int = 256) -> List[float]:
+    """Deterministic bag-of-words embedding: every word is hashed to a signed bucket, the vector is L2-normalized."""
+    vector = [0.0] * dimension
+    for word in WORD.findall(text.lower()):
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dimension
+        vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+def _digest(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()[:12]
+
+
+class CallRecorder:
+    """Thread-safe collector of per-stage call timings and token counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations: Dict[str, List[float]] = defaultdict(list)
+        self._tokens: Dict[str, int] = defaultdict(int)
+
+    def record(self, stage: str, seconds: float, tokens: int = 0) -> None:
+        with self._lock:
+            self._durations[stage].append(seconds)
+            self._tokens[stage] += tokens
+
+    @contextmanager
+    def time(self, stage: str, tokens: int = 0) -> Iterator[None]:
+        """Record the duration of the block under the given stage."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - started, tokens)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._durations.clear()
+            self._tokens.clear()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Return count, total, p50, max and token count for every stage."""
+        with self._lock:
+            stats = {}
+            for stage, durations in self._durations.items():
+                ordered = sorted(durations)
+                stats[stage] = {
+                    "count": len(ordered),
+                    "total": sum(ordered),
+                    "p50": ordered[len(ordered) // 2],
+                    "max": ordered[-1],
+                    "tokens": self._tokens[stage],
+                }
+            return stats
+
+
+class FakeChatModel(BaseChatModel):
+    """LangChain chat model answering deterministically after a fixed latency.
+
+    For ReAct prompts it picks a tool by keyword routing on the question and
+    gives a final answer once an observation is in the scratchpad, so agent
+    loops run through exactly one tool call. Other prompts get an answer
+    derived from a hash of the prompt.
+    """
+
+    latency: float = 0.0
+    recorder: Optional[Any] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Optional[Any] = None, **kwargs: Any) -> ChatResult:
+        started = time.perf_counter()
+        prompt = "\n".join(str(message.content) for message in messages)
+        time.sleep(self.latency)
+
+        text = self._react_step(prompt) if "Action Input:" in prompt else f"Deterministic answer {_digest(prompt)}."
+        if self.recorder is not None:
+            self.recorder.record("llm", time.perf_counter() - started, count_tokens(prompt))
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))])
+
+    def _react_step(self, prompt: str) -> str:
+        question, _, scratchpad = prompt.rpartition("\nQuestion: ")[2].partition("\n")
+        if "Observation:" in scratchpad:
+            return f"Thought: I know the answer now.\nFinal Answer: Deterministic answer {_digest(prompt)}."
+
+        available = re.search(r"tool names are: (.*)", prompt)
+        tool_names = available.group(1) if available else ""
+        lowered = question.lower()
+        for keywords, tool_name in TOOL_ROUTES:
+            if tool_name in tool_names and any(keyword in lowered for keyword in keywords):
+                break
+        else:
+            tool_name = "query_backend"
+        tool_input = FAKE_SQL if tool_name == "execute_database" else question
+        return f"Thought: I need to use a tool to help me answer the question.\nAction: {tool_name}\nAction Input: {tool_input}"
+
+
+class FakeLLM(CustomLLM):
+    """LlamaIndex LLM answering with a hash of the prompt after a fixed latency."""
+
+    latency: float = Field(default=0.0, description="Seconds slept per completion.")
+    context_window: int = Field(default=32000, description="Context window reported to LlamaIndex.")
+    _recorder: Optional[CallRecorder] = PrivateAttr(default=None)
+
+    def __init__(self, recorder: Optional[CallRecorder] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._recorder = recorder
+
+    @property
+    def metadata(self) -> LLMMetadata:
+        return LLMMetadata(context_window=self.context_window, num_output=256, model_name="fake-llm")
+
+    def _answer(self, prompt: str) -> str:
+        started = time.perf_counter()
+        time.sleep(self.latency)
+        tokens = count_tokens(prompt)
+        if self._recorder is not None:
+            self._recorder.record("llm", time.perf_counter() - started, tokens)
+        return f"Deterministic answer {_digest(prompt)} from {tokens} prompt tokens."
+
+    @llm_completion_callback()
+    def complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponse:
+        return CompletionResponse(text=self._answer(prompt))
+
+    @llm_completion_callback()
+    def stream_complete(self, prompt: str, formatted: bool = False, **kwargs: Any) -> CompletionResponseGen:
+        text = self._answer(prompt)
+        response = ""
+        for token in text.split(" "):
+            delta = token if not response else " " + token
+            response += delta
+            yield CompletionResponse(text=response, delta=delta)
+
+
+class FakeEmbedding(BaseEmbedding):
+    """LlamaIndex embedding model returning hash embeddings after a fixed per-call latency."""
+
+    dimension: int = Field(default=256, description="Embedding dimension.")
+    latency: float = Field(default=0.0, description="Seconds slept per embedding call.")
+    _recorder: Optional[CallRecorder] = PrivateAttr(default=None)
+
+    def __init__(self, recorder: Optional[CallRecorder] = None, **kwargs: Any):
+        super().__init__(model_name="fake-embedding", **kwargs)
+        self._recorder = recorder
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "FakeEmbedding"
+
+    def _embed(self, texts: Sequence[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        time.sleep(self.latency)
+        embeddings = [hash_embedding(text, self.dimension) for text in texts]
+        if self._recorder is not None:
+            self._recorder.record("embedding", time.perf_counter() - started, sum(count_tokens(text) for text in texts))
+        return embeddings
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._embed([query])[0]
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._embed([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+
+class FakeEmbeddings(Embeddings):
+    """LangChain embeddings returning hash embeddings after a fixed per-call latency."""
+
+    def __init__(self, dimension: int = 256, latency: float = 0.0, recorder: Optional[CallRecorder] = None):
+        self.dimension = dimension
+        self.latency = latency
+        self.recorder = recorder
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        started = time.perf_counter()
+        time.sleep(self.latency)
+        embeddings = [hash_embedding(text, self.dimension) for text in texts]
+        if self.recorder is not None:
+            self.recorder.record("embedding", time.perf_counter() - started, sum(count_tokens(text) for text in texts))
+        return embeddings
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+class FakeCursor:
+    """psycopg2 cursor stand-in returning the rows of its FakeConnection for every read statement."""
+
+    def __init__(self, connection: "FakeConnection", name: Optional[str] = None, dict_rows: bool = False):
+        self.connection = connection
+        self.name = name
+        self.dict_rows = dict_rows
+        self.itersize = 2000
+        self.description = None
+        self.rowcount = -1
+        self._rows: List[Any] = []
+        self._position = 0
+
+    def __enter__(self) -> "FakeCursor":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def execute(self, query: str, params: Any = None) -> None:
+        started = time.perf_counter()
+        time.sleep(self.connection.latency)
+        statement = query.strip()
+        keyword = statement.split(None, 1)[0].upper() if statement else ""
+        if keyword == "PREPARE":
+            _, name, _, body = statement.split(None, 3)
+            self.connection.prepared[name] = body.split(None, 1)[0].upper()
+        elif keyword == "EXECUTE":
+            keyword = self.connection.prepared.get(statement.split()[1], "SELECT")
+
+        if keyword == "EXPLAIN":
+            plan = {"Node Type": "Seq Scan", "Relation Name": "loan_applications",
+                    "Total Cost": float(len(self.connection.rows)), "Plan Rows": len(self.connection.rows)}
+            self.description = [("QUERY PLAN",)]
+            self._rows = [({"QUERY PLAN": [{"Plan": plan}]} if self.dict_rows else ([{"Plan": plan}],))]
+            self._position = 0
+            self.rowcount = 1
+        elif keyword == "MOVE":
+            target = self.connection.named_cursors.get(statement.rsplit(None, 1)[-1].strip('"'))
+            self.rowcount = target.skip_remaining() if target is not None else 0
+        elif keyword in ("SELECT", "WITH", "VALUES", "TABLE"):
+            rows = [{"?column?": 1}] if statement.upper() == "SELECT 1" else self.connection.rows
+            columns = list(rows[0]) if rows else []
+            self.description = [(column,) for column in columns]
+            self._rows = [row if self.dict_rows else tuple(row[column] for column in columns) for row in rows]
+            self._position = 0
+            self.rowcount = len(rows)
+        else:
+            # PREPARE, SET, DDL and writes
+            self.description = None
+            self.rowcount = 0 if keyword == "PREPARE" else 1
+
+        if self.connection.recorder is not None:
+            self.connection.recorder.record("db", time.perf_counter() - started)
+
+    def fetchone(self) -> Optional[Any]:
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchall(self) -> List[Any]:
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        return rows
+
+    def fetchmany(self, size: int) -> List[Any]:
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        return rows
+
+    def skip_remaining(self) -> int:
+        skipped = len(self._rows) - self._position
+        self._position = len(self._rows)
+        return skipped
+
+    def close(self) -> None:
+        if self.name is not None:
+            self.connection.named_cursors.pop(self.name, None)
+
+
+class FakeConnection:
+    """psycopg2 connection stand-in serving a fixed list of rows with a fixed per-statement latency."""
+
+    def __init__(self, rows: Sequence[Dict[str, Any]], latency: float = 0.0, recorder: Optional[CallRecorder] = None):
+        self.rows = list(rows)
+        self.latency = latency
+        self.recorder = recorder
+        self.named_cursors: Dict[str, FakeCursor] = {}
+        self.prepared: Dict[str, str] = {}
+        self.closed = 0
+
+    def cursor(self, name: Optional[str] = None, cursor_factory: Any = None) -> FakeCursor:
+        cursor = FakeCursor(self, name=name, dict_rows=cursor_factory is not None)
+        if name is not None:
+            self.named_cursors[name] = cursor
+        return cursor
+
+    def commit(self) -> None:
+        pass
+
+    def rollback(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = 1
+
+
+def fake_loan_applications(count: int = 1000) -> List[Dict[str, Any]]:
+    """Deterministic rows shaped like a join of loan_applications and applicants."""
+    statuses = ["PENDING", "APPROVED", "DECLINED", "NEEDS_REVIEW"]
+    return [
+        {
+            "id": f"00000000-0000-0000-0000-{number:012d}",
+            "first_name": f"First{number}",
+            "last_name": f"Last{number}",
+            "status": statuses[number % len(statuses)],
+            "loan_amount": 10000 + (number * 7919) % 490000,
+        }
+        for number in range(count)
+    ]
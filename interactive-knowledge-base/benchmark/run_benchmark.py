@@ -0,0 +1,255 @@
+"""Offline benchmark of all agents on deterministic LLM, embedding and database stand-ins.
+
+Runs the example questions of every agent as workloads and reports per-stage
+timings, memory peaks and prompt token counts. Results can be saved as a
+baseline, and later runs compared against it fail on regressions.
+
+Usage (from interactive-knowledge-base):
+    python -m benchmark.run_benchmark --save-baseline
+    python -m benchmark.run_benchmark --baseline benchmark/baseline.json
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from benchmark.fakes import (
+    CallRecorder,
+    FakeChatModel,
+    FakeConnection,
+    FakeEmbedding,
+    FakeEmbeddings,
+    FakeLLM,
+    fake_loan_applications,
+)
+
+DEFAULT_BASELINE_PATH = Path(__file__).parent / "baseline.json"
+DEFAULT_TOLERANCE = 0.25  # Allowed relative increase before a metric counts as a regression
+MIN_TIME_DELTA = 0.005  # Timing differences below 5 ms are noise
+CHECK_PACKER_TOKEN_BUDGET = 200  # Words, small enough for the retrieved chunks to be cut
+DB_WORKLOAD = [
+    ("SELECT * FROM loan_applications", None),
+    ("SELECT * FROM loan_applications WHERE status = %(status)s", {"status": "DECLINED"}),
+    ("UPDATE loan_applications SET status = 'PENDING' WHERE id = %(id)s", {"id": "00000000-0000-0000-0000-000000000000"}),
+]
+
+
+class TimedAgent:
+    """Proxy recording the duration of every query of a sub-agent as a tool call."""
+
+    def __init__(self, agent: Any, recorder: CallRecorder, stage: str):
+        self._agent = agent
+        self._recorder = recorder
+        self._stage = stage
+
+    def query(self, question: str) -> str:
+        with self._recorder.time(self._stage):
+            return self._agent.query(question)
+
+    def execute_query(self, query: str, params: Any = None) -> Any:
+        with self._recorder.time(self._stage):
+            return self._agent.execute_query(query, params)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._agent, name)
+
+
+class Benchmark:
+    """Runs the benchmark stages and collects their metrics."""
+
+    def __init__(self, llm_latency: float, embed_latency: float, db_latency: float, rows: int):
+        self.recorder = CallRecorder()
+        self.llm_latency = llm_latency
+        self.embed_latency = embed_latency
+        self.db_latency = db_latency
+        self.rows = fake_loan_applications(rows)
+        self.results: Dict[str, Dict[str, float]] = {}
+
+    @contextmanager
+    def section(self, name: str) -> Iterator[None]:
+        """Measure wall time, memory peak and the recorded calls of a benchmark section."""
+        self.recorder.reset()
+        tracemalloc.start()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            result = {"wall_time": elapsed, "memory_peak_mb": peak / 2 ** 20}
+            for stage, stats in self.recorder.stats().items():
+                result[f"{stage}.count"] = stats["count"]
+                result[f"{stage}.total"] = stats["total"]
+                result[f"{stage}.p50"] = stats["p50"]
+                if stats["tokens"]:
+                    result[f"{stage}.tokens"] = stats["tokens"]
+            self.results[name] = result
+            print(f"{name:<24} {elapsed:8.3f}s  peak {result['memory_peak_mb']:8.1f} MB", file=sys.stderr)
+
+    def llm(self) -> FakeLLM:
+        return FakeLLM(recorder=self.recorder, latency=self.llm_latency)
+
+    def embed_model(self) -> FakeEmbedding:
+        return FakeEmbedding(recorder=self.recorder, latency=self.embed_latency)
+
+    def chat_model(self) -> FakeChatModel:
+        return FakeChatModel(recorder=self.recorder, latency=self.llm_latency)
+
+    def db_executor(self, **kwargs: Any):
+        from database_executor import DatabaseExecutor
+        return DatabaseExecutor(
+            connect=lambda: FakeConnection(self.rows, latency=self.db_latency, recorder=self.recorder),
+            **kwargs,
+        )
+
+    def run(self, index_dir: Path) -> Dict[str, Dict[str, float]]:
+        import backend_agent
+        import database_agent
+        import frontend_agent
+        import knowledge_base_agent
+        from utils.field_lineage import FieldLineageIndex
+
+        code_agents = {}
+        for name, module, agent_class in [
+            ("backend", backend_agent, backend_agent.BackendAgent),
+            ("frontend", frontend_agent, frontend_agent.FrontendAgent),
+        ]:
+            # Cold start embeds every chunk, warm start only hashes the source files
+            with self.section(f"{name}.index_build"):
+                agent_class(use_cache=False, llm=self.llm(), embed_model=self.embed_model(), index_dir=index_dir / name)
+            with self.section(f"{name}.index_load"):
+                agent = agent_class(use_cache=False, llm=self.llm(), embed_model=self.embed_model(), index_dir=index_dir / name)
+
+            with self.section(f"{name}.retrieval"):
+                for question in module.EXAMPLE_QUESTIONS:
+                    with self.recorder.time("retrieval"):
+                        agent.retriever.retrieve(question)
+
+            with self.section(f"{name}.query"):
+                self._query_all(agent, module.EXAMPLE_QUESTIONS)
+            code_agents[name] = agent
+
+        with self.section("context_packer.query"):
+            self._check_context_packer(code_agents["backend"], backend_agent.EXAMPLE_QUESTIONS[0])
+
+        with self.section("database.query"):
+            db_agent = database_agent.DatabaseAgent(use_cache=False, llm=self.chat_model(), embeddings=FakeEmbeddings())
+            self._query_all(db_agent, database_agent.EXAMPLE_QUESTIONS)
+
+        for name, stream_results in [("db.execution.buffered", False), ("db.execution.streaming", True)]:
+            executor = self.db_executor(stream_results=stream_results)
+            with self.section(name):
+                for query, params in DB_WORKLOAD:
+                    with self.recorder.time("execution"):
+                        executor.execute_query(query, params)
+            executor.close()
+
+        with self.section("knowledge_base.query"):
+            # Sub-agents are reused, tool calls are timed through the proxies
+            factories = {
+                "db_agent": lambda: TimedAgent(db_agent, self.recorder, "tool"),
+                "backend_agent": lambda: TimedAgent(code_agents["backend"], self.recorder, "tool"),
+                "frontend_agent": lambda: TimedAgent(code_agents["frontend"], self.recorder, "tool"),
+                "db_executor": lambda: TimedAgent(self.db_executor(stream_results=True, guard_queries=True),
+                                                   self.recorder, "tool"),
+                # Parsed sources are kept with the benchmark indexes, not in the real storage
+                "field_lineage": lambda: FieldLineageIndex(knowledge_base_agent.PLATFORM_PATH,
+                                                           index_dir / "field_lineage.json"),
+            }
+            # Every question runs through the ReAct loop, keeping the workload comparable to the baseline
+            # and the routing log out of the real storage
+            agent = knowledge_base_agent.KnowledgeBaseAgent(llm=self.chat_model(), agent_factories=factories,
+                                                            route_questions=False)
+            self._query_all(agent, knowledge_base_agent.EXAMPLE_QUESTIONS)
+
+        return self.results
+
+    def _check_context_packer(self, agent: Any, question: str) -> None:
+        """Run a query through a query engine packing with a custom token counter into a budget it must cut to."""
+        from llama_index.core.query_engine import RetrieverQueryEngine
+        from utils.context_packer import ContextPacker
+
+        budget = CHECK_PACKER_TOKEN_BUDGET
+        packer = ContextPacker(token_budget=budget, min_fragment_tokens=budget // 4,
+                               count_tokens=lambda text: len(text.split()))
+        engine = RetrieverQueryEngine.from_args(agent.retriever, llm=self.llm(), node_postprocessors=[packer])
+        with self.recorder.time("query"):
+            response = engine.query(question)
+
+        stats = packer.stats()
+        if stats["queries"] != 1 or not response.source_nodes or stats["tokens_out"] > budget:
+            raise RuntimeError(f"Context packer check failed: {stats}")
+
+    def _query_all(self, agent: Any, questions: List[str]) -> None:
+        for question in questions:
+            with self.recorder.time("query"):
+                agent.query(question)
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> List[str]:
+    """Return a description of every metric that got worse than the baseline by more than the tolerance.
+
+    Counts must match exactly, since the workload is deterministic.
+    """
+    regressions = []
+    for section, metrics in baseline.items():
+        for metric, expected in metrics.items():
+            actual = results.get(section, {}).get(metric)
+            if actual is None:
+                regressions.append(f"{section} {metric}: missing (baseline {expected})")
+            elif metric.endswith(".count"):
+                if actual != expected:
+                    regressions.append(f"{section} {metric}: {actual} != baseline {expected}")
+            elif actual > expected * (1 + tolerance):
+                is_timing = not metric.endswith((".tokens", "_mb"))
+                if not is_timing or actual - expected > MIN_TIME_DELTA:
+                    regressions.append(f"{section} {metric}: {actual:.4f} > baseline {expected:.4f} (+{(actual / expected - 1) * 100 if expected else float('inf'):.0f}%)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds per fake LLM call.")
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="Seconds per fake embedding call.")
+    parser.add_argument("--db-latency", type=float, default=0.0, help="Seconds per fake database statement.")
+    parser.add_argument("--rows", type=int, default=1000, help="Rows returned by the fake database.")
+    parser.add_argument("--output", type=Path, help="Write the results as JSON to this file.")
+    parser.add_argument("--baseline", type=Path, help="Compare the results against this baseline.")
+    parser.add_argument("--save-baseline", nargs="?", type=Path, const=DEFAULT_BASELINE_PATH,
+                        help=f"Save the results as baseline (default {DEFAULT_BASELINE_PATH.name}).")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative increase of a metric over the baseline.")
+    args = parser.parse_args()
+
+    benchmark = Benchmark(args.llm_latency, args.embed_latency, args.db_latency, args.rows)
+    with tempfile.TemporaryDirectory(prefix="ikb-benchmark-") as index_dir:
+        results = benchmark.run(Path(index_dir))
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        args.save_baseline.write_text(json.dumps(results, indent=2))
+        print(f"Baseline saved to {args.save_baseline}", file=sys.stderr)
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text()), args.tolerance)
+        if regressions:
+            print("REGRESSIONS against baseline:", file=sys.stderr)
+            for regression in regressions:
+                print(f"  {regression}", file=sys.stderr)
+            return 1
+        print("No regressions against baseline.", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
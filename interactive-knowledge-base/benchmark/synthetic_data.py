@@ -0,0 +1,273 @@
+"""Synthetic Quick Loan Platform data for load tests against a local PostgreSQL.
+
+Generates applicants, businesses and loan applications that satisfy the
+constraints and foreign keys of db/schema.sql, with statuses decided by the
+backend's rule and a share of businesses and loans placed exactly on the
+decline and approval thresholds. Rows are generated lazily from the seed and
+their index, so any number of rows is loaded in bounded memory through
+DatabaseExecutor.bulk_insert.
+
+Usage (from interactive-knowledge-base, on a database with db/schema.sql applied):
+    python -m benchmark.synthetic_data --applications 1000000
+    python -m benchmark.synthetic_data --applications 100000 --method insert --seed 7
+    python -m benchmark.synthetic_data --applications 100000 --dry-run
+"""
+
+import argparse
+import hashlib
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+TABLE_COLUMNS = {
+    "applicants": ("id", "first_name", "last_name", "email", "phone", "ssn",
+                   "street_address", "city", "state", "zip_code", "created_at"),
+    "businesses": ("id", "name", "ein", "street_address", "city", "state", "zip_code",
+                   "type", "years_in_operation", "annual_revenue", "created_at"),
+    "loan_applications": ("id", "applicant_id", "business_id", "loan_amount", "loan_purpose",
+                          "status", "submitted_at"),
+}
+# Referenced tables first
+LOAD_ORDER = ("applicants", "businesses", "loan_applications")
+
+# Thresholds of ApplicationService.submitApplication
+MIN_REVENUE = Decimal("50000")
+APPROVAL_REVENUE = Decimal("200000")
+APPROVAL_YEARS = 3
+MAX_LOAN_SHARE = Decimal("0.5")
+CENT = Decimal("0.01")
+# (annual revenue, years in operation) of businesses on both sides of every threshold
+BOUNDARY_PROFILES = [
+    (Decimal("49999.99"), 5), (Decimal("50000.00"), 5), (Decimal("0.00"), 4),
+    (Decimal("350000.00"), 0), (Decimal("350000.00"), 1),
+    (Decimal("199999.99"), 6), (Decimal("200000.00"), 6),
+    (Decimal("400000.00"), 2), (Decimal("400000.00"), 3),
+]
+
+FIRST_NAMES = [
+    "Wilma", "James", "Mary", "Robert", "Patricia", "John", "Jennifer", "Michael", "Linda", "David",
+    "Elizabeth", "William", "Barbara", "Richard", "Susan", "Joseph", "Jessica", "Thomas", "Sarah", "Carlos",
+    "Karen", "Daniel", "Lisa", "Matthew", "Nancy", "Anthony", "Sandra", "Mark", "Ashley", "Priya",
+    "Wei", "Fatima", "Diego", "Aisha", "Hiroshi", "Olga", "Kwame", "Ingrid", "Mateo", "Leila",
+]
+LAST_NAMES = [
+    "Mason", "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis", "Rodriguez",
+    "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson", "Thomas", "Taylor", "Moore", "Jackson",
+    "Martin", "Lee", "Perez", "Thompson", "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis",
+    "Nguyen", "Patel", "Kim", "Chen", "Okafor", "Novak", "Schmidt", "Rossi", "Tanaka", "Cohen",
+]
+# (city, state, first three digits of its zip codes)
+CITIES = [
+    ("Austin", "TX", "787"), ("Dallas", "TX", "752"), ("San Francisco", "CA", "941"), ("Los Angeles", "CA", "900"),
+    ("San Diego", "CA", "921"), ("New York", "NY", "100"), ("Brooklyn", "NY", "112"), ("Chicago", "IL", "606"),
+    ("Seattle", "WA", "981"), ("Portland", "OR", "972"), ("Denver", "CO", "802"), ("Phoenix", "AZ", "850"),
+    ("Miami", "FL", "331"), ("Orlando", "FL", "328"), ("Atlanta", "GA", "303"), ("Boston", "MA", "021"),
+    ("Columbus", "OH", "432"), ("Nashville", "TN", "372"), ("Minneapolis", "MN", "554"), ("Raleigh", "NC", "276"),
+]
+STREETS = ["Main St", "Oak Ave", "Maple Dr", "Cedar Ln", "Park Blvd", "Elm St", "Washington Ave", "Lake Rd",
+           "Sunset Blvd", "Hillcrest Dr", "Market St", "River Rd"]
+BUSINESS_NOUNS = ["Bakery", "Coffee", "Construction", "Consulting", "Design", "Logistics", "Landscaping",
+                  "Auto Repair", "Dental", "Fitness", "Printing", "Catering", "Software", "Cleaning", "Pet Care"]
+# Options of the business type select in BusinessInfoForm.tsx
+BUSINESS_TYPES = ["Sole Proprietorship", "Partnership", "Limited Liability Company (LLC)", "Corporation",
+                  "S Corporation", "Nonprofit Organization"]
+LOAN_PURPOSES = [
+    "Working capital", "Equipment purchase", "Inventory", "Expansion to a second location", "Hiring staff",
+    "Refinance existing debt", "Marketing campaign", "Vehicle purchase", "Renovation", "Seasonal cash flow",
+]
+
+
+def loan_status(annual_revenue: Decimal, years_in_operation: int, loan_amount: Decimal) -> str:
+    """Status the backend assigns to a submitted application, as in ApplicationService.submitApplication."""
+    if annual_revenue < MIN_REVENUE or years_in_operation < 1:
+        return "DECLINED"
+    if (annual_revenue >= APPROVAL_REVENUE and years_in_operation >= APPROVAL_YEARS
+            and loan_amount <= annual_revenue * MAX_LOAN_SHARE):
+        return "APPROVED"
+    return "NEEDS_REVIEW"
+
+
+class SyntheticDataset:
+    """Deterministic synthetic applicants, businesses and loan applications.
+
+    Every row is derived from the seed and its index alone, so each table is
+    an independent stream and a loan application can reference its applicant
+    and business without any generated rows being kept in memory. The first
+    applications each get their own applicant and business, like submissions
+    through the backend; later ones reuse random earlier applicants and
+    businesses. Timestamps increase with the index, so rows are created before
+    the applications referencing them.
+    """
+
+    def __init__(self,
+                 applications: int = 10_000,
+                 applicants: Optional[int] = None,
+                 businesses: Optional[int] = None,
+                 seed: int = 0,
+                 edge_case_rate: float = 0.05,
+                 end: Optional[datetime] = None,
+                 days: int = 730):
+        """
+        Args:
+            applications: Number of loan applications
+            applicants: Number of applicants, defaults to 80% of the applications
+            businesses: Number of businesses, defaults to 80% of the applications
+            seed: Seed of all generated values; the same seed yields the same rows
+            edge_case_rate: Share of businesses with a boundary revenue and age, and of loans exactly at
+                or just above half of the revenue
+            end: Time of the last application, defaults to now
+            days: Days between the first and the last application
+        """
+        self.applications = applications
+        self.applicants = applicants if applicants is not None else max(applications * 4 // 5, 1)
+        self.businesses = businesses if businesses is not None else max(applications * 4 // 5, 1)
+        self.seed = seed
+        self.edge_case_rate = edge_case_rate
+        self.end = end or datetime.now(timezone.utc)
+        self.start = self.end - timedelta(days=days)
+        self._spacing = (self.end - self.start) / max(self.applications, self.applicants, self.businesses, 1)
+
+    def tables(self) -> List[Tuple[str, Sequence[str], Iterator[Tuple[Any, ...]]]]:
+        """Return (table, columns, rows) of every table in load order."""
+        generators = {
+            "applicants": self.applicant_rows,
+            "businesses": self.business_rows,
+            "loan_applications": self.loan_application_rows,
+        }
+        return [(table, TABLE_COLUMNS[table], generators[table]()) for table in LOAD_ORDER]
+
+    def applicant_rows(self) -> Iterator[Tuple[Any, ...]]:
+        for index in range(self.applicants):
+            rng = self._rng("applicant", index)
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            street, city, state, zip_code = self._address(rng)
+            yield (
+                self._id("applicant", index), first, last,
+                # The index keeps unique columns unique for any number of rows
+                f"{first}.{last}.{index}@example.com".lower(),
+                f"({rng.randint(201, 989)}) {rng.randint(200, 999)}-{rng.randint(0, 9999):04d}",
+                self._ssn(index), street, city, state, zip_code, self._time(index),
+            )
+
+    def business_rows(self) -> Iterator[Tuple[Any, ...]]:
+        for index in range(self.businesses):
+            rng = self._rng("business", index)
+            revenue, years = self.business_profile(index)
+            street, city, state, zip_code = self._address(rng)
+            name = f"{rng.choice(LAST_NAMES)} {rng.choice(BUSINESS_NOUNS)}"
+            yield (
+                self._id("business", index), name, self._ein(index), street, city, state, zip_code,
+                rng.choice(BUSINESS_TYPES), years, revenue, self._time(index),
+            )
+
+    def loan_application_rows(self) -> Iterator[Tuple[Any, ...]]:
+        for index in range(self.applications):
+            rng = self._rng("loan_application", index)
+            applicant = index if index < self.applicants else rng.randrange(self.applicants)
+            business = index if index < self.businesses else rng.randrange(self.businesses)
+            revenue, years = self.business_profile(business)
+            amount = self._loan_amount(rng, revenue)
+            yield (
+                self._id("loan_application", index), self._id("applicant", applicant),
+                self._id("business", business), amount, rng.choice(LOAN_PURPOSES),
+                loan_status(revenue, years, amount), self._time(index),
+            )
+
+    def business_profile(self, index: int) -> Tuple[Decimal, int]:
+        """Return (annual revenue, years in operation) of a business."""
+        rng = self._rng("business_profile", index)
+        if rng.random() < self.edge_case_rate:
+            return rng.choice(BOUNDARY_PROFILES)
+        # Mostly young small businesses, revenue log-normal around $250k
+        years = min(int(rng.expovariate(1 / 6)), 60)
+        revenue = Decimal(str(round(rng.lognormvariate(12.4, 1.0), 2))).quantize(CENT)
+        return revenue, years
+
+    def _loan_amount(self, rng: random.Random, revenue: Decimal) -> Decimal:
+        if revenue > 0 and rng.random() < self.edge_case_rate:
+            # Exactly at the approval limit or one cent above it
+            limit = (revenue * MAX_LOAN_SHARE).quantize(CENT)
+            return limit if rng.random() < 0.5 else limit + CENT
+        share = Decimal(str(round(rng.uniform(0.05, 1.2), 3)))
+        return max((revenue * share / 500).quantize(Decimal(1)) * 500, Decimal(1000)).quantize(CENT)
+
+    def _address(self, rng: random.Random) -> Tuple[str, str, str, str]:
+        city, state, zip_prefix = rng.choice(CITIES)
+        return f"{rng.randint(1, 9999)} {rng.choice(STREETS)}", city, state, f"{zip_prefix}{rng.randint(0, 99):02d}"
+
+    def _rng(self, kind: str, index: int) -> random.Random:
+        return random.Random(f"{self.seed}:{kind}:{index}")
+
+    def _id(self, kind: str, index: int) -> str:
+        # As text, which both COPY and psycopg2's parameter adaption take without registering the UUID type
+        return str(uuid.UUID(bytes=hashlib.md5(f"{self.seed}:{kind}:{index}".encode("utf-8")).digest(), version=4))
+
+    def _time(self, index: int) -> datetime:
+        # Spread evenly with a deterministic jitter below the spacing, so times increase with the index
+        return self.start + self._spacing * (index + (index * 2654435761 % 1000) / 1000)
+
+    @staticmethod
+    def _ssn(index: int) -> str:
+        # 7919 is prime and coprime to the range size, so distinct indexes map to distinct numbers
+        number = (index * 7919 + 12345) % 900_000_000 + 100_000_000
+        return f"{number // 1_000_000:03d}-{number // 10_000 % 100:02d}-{number % 10_000:04d}"
+
+    @staticmethod
+    def _ein(index: int) -> str:
+        number = (index * 7919 + 4321) % 990_000_000 + 10_000_000
+        return f"{number // 10_000_000:02d}-{number % 10_000_000:07d}"
+
+
+def load(executor: Any, dataset: SyntheticDataset, method: str = "copy", batch_size: int = 50_000) -> Dict[str, Dict[str, float]]:
+    """Bulk insert the dataset in load order and return rows, seconds and rows per second per table."""
+    results = {}
+    for table, columns, rows in dataset.tables():
+        started = time.perf_counter()
+        count = executor.bulk_insert(table, columns, rows, method=method, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        results[table] = {"rows": count, "seconds": elapsed, "rows_per_second": count / elapsed if elapsed else 0.0}
+        print(f"{table:<18} {count:>10,} rows  {elapsed:8.2f}s  {results[table]['rows_per_second']:>10,.0f} rows/s",
+              file=sys.stderr)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--applications", type=int, default=100_000, help="Number of loan applications.")
+    parser.add_argument("--applicants", type=int, help="Number of applicants (default 80%% of the applications).")
+    parser.add_argument("--businesses", type=int, help="Number of businesses (default 80%% of the applications).")
+    parser.add_argument("--seed", type=int, default=0, help="Seed; the same seed generates the same rows.")
+    parser.add_argument("--edge-case-rate", type=float, default=0.05,
+                        help="Share of businesses and loans placed on the decline and approval thresholds.")
+    parser.add_argument("--method", choices=["copy", "insert"], default="copy", help="Bulk insert method.")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="Rows per batch and transaction.")
+    parser.add_argument("--host", default="localhost", help="Database host.")
+    parser.add_argument("--port", type=int, default=5432, help="Database port.")
+    parser.add_argument("--dbname", default="loan_application", help="Database name.")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Only generate the rows and print the status distribution, without a database.")
+    args = parser.parse_args()
+
+    dataset = SyntheticDataset(args.applications, args.applicants, args.businesses, args.seed, args.edge_case_rate)
+    if args.dry_run:
+        statuses = Counter(row[5] for row in dataset.loan_application_rows())
+        for status, count in sorted(statuses.items()):
+            print(f"{status:<13} {count:>10,}  {count / args.applications:6.1%}")
+        return 0
+
+    from database_executor import DatabaseExecutor
+    executor = DatabaseExecutor(host=args.host, port=args.port, dbname=args.dbname)
+    try:
+        load(executor, dataset, args.method, args.batch_size)
+    finally:
+        executor.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,14 @@
+import asyncio
+import hashlib
 from pathlib import Path
 from dotenv import load_dotenv
-from langchain_openai import ChatOpenAI
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.runnables import RunnablePassthrough
+from utils.batching import abatch_query, batch_query
+from utils.response_cache import ResponseCache, files_fingerprint
+from utils.schema_catalog import SchemaCatalog
+from utils.tracing_callback_handler import TracingCallbackHandler
 
 # Load environment variables
 load_dotenv()
@@ -10,19 +16,28 @@ load_dotenv()
 MODEL = "gpt-4-turbo"
 TEMPERATURE = 0
 SCHEMA_PATH = Path(__file__).parent.parent / "quick-loan-platform" / "db" / "schema.sql"
+CACHE_PATH = Path(__file__).parent / "storage" / "cache" / "database_agent.jsonl"
 
 """
 Database Agent for answering questions about the database schema.
 This agent uses LangChain and OpenAI to provide answers based on the schema file.
+The schema is parsed once into a catalog and each question gets only the relevant tables and their FK neighbours.
+Answers are cached and reused for identical or near-duplicate questions until the schema changes;
+with introspect=True a change of the live schema is picked up when the agent is built again.
 """
 class DatabaseAgent:
 
-    def __init__(self):
-        # Load the schema
-        self.schema = self._load_schema(SCHEMA_PATH)
+    def __init__(self, use_cache: bool = True, introspect: bool = False, db_executor=None, llm=None, embeddings=None,
+                 tracer=None):
+        # Load the schema catalog from schema.sql or, if requested, from the live database
+        if introspect:
+            from database_executor import DatabaseExecutor
+            self.catalog = SchemaCatalog.from_database(db_executor or DatabaseExecutor(tracer=tracer))
+        else:
+            self.catalog = SchemaCatalog.from_file(SCHEMA_PATH)
 
-        # Initialize the LLM
-        self.llm = ChatOpenAI(model=MODEL, temperature=TEMPERATURE)
+        # Initialize the LLM; defaults to OpenAI and can be replaced, e.g. by benchmark fakes
+        self.llm = llm or ChatOpenAI(model=MODEL, temperature=TEMPERATURE)
 
         # Create the prompt template with separate system and user messages
         system_template = """
@@ -45,36 +60,121 @@ class DatabaseAgent:
 
         # Create the chain using the newer RunnableSequence approach
         self.chain = (
-            {"schema": lambda x: self.schema, "question": RunnablePassthrough()}
+            {"schema": self.catalog.render_for, "question": RunnablePassthrough()}
             | self.prompt
             | self.llm
         )
 
-    def _load_schema(self, schema_path):
-        with open(schema_path, 'r') as f:
-            return f.read()
+        # Cache answers until schema.sql changes or, for an introspected catalog, until the live schema
+        # differs when the agent is built again
+        if introspect:
+            catalog_fingerprint = hashlib.sha256(self.catalog.render().encode("utf-8")).hexdigest()
+            fingerprint = lambda: catalog_fingerprint
+        else:
+            fingerprint = lambda: files_fingerprint([SCHEMA_PATH])
+        self.cache = ResponseCache(
+            fingerprint=fingerprint,
+            embed=(embeddings or OpenAIEmbeddings()).embed_query,
+            persist_path=CACHE_PATH,
+        ) if use_cache else None
+
+        # Record LLM calls as spans when a tracer is given
+        self.run_config = {"callbacks": [TracingCallbackHandler(tracer)]} if tracer is not None else {}
 
     def query(self, question):
-        response = self.chain.invoke(question)
+        if self.cache is not None:
+            cached = self.cache.get(question)
+            if cached is not None:
+                return cached
+
+        response = self.chain.invoke(question, config=self.run_config)
+
+        if self.cache is not None:
+            self.cache.put(question, response.content)
         return response.content
 
+    async def aquery(self, question):
+        """
+        Asynchronously answer a question about the database schema.
+        """
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, question)
+            if cached is not None:
+                return cached
+
+        response = await self.chain.ainvoke(question, config=self.run_config)
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, question, response.content)
+        return response.content
+
+    def stream(self, question):
+        """
+        Answer a question about the database schema, yielding the answer in chunks as the LLM produces them.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(question)
+            if cached is not None:
+                yield cached
+                return
+
+        chunks = []
+        for chunk in self.chain.stream(question, config=self.run_config):
+            chunks.append(chunk.content)
+            yield chunk.content
+
+        if self.cache is not None:
+            self.cache.put(question, "".join(chunks))
+
+    async def astream(self, question):
+        """
+        Asynchronously answer a question about the database schema, yielding the answer in chunks.
+        """
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, question)
+            if cached is not None:
+                yield cached
+                return
+
+        chunks = []
+        async for chunk in self.chain.astream(question, config=self.run_config):
+            chunks.append(chunk.content)
+            yield chunk.content
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, question, "".join(chunks))
+
+    def batch_query(self, questions, concurrency=4):
+        """
+        Answer several questions concurrently, keeping the input order.
+        """
+        return batch_query(self.query, questions, concurrency)
+
+    async def abatch_query(self, questions, concurrency=4):
+        """
+        Asynchronously answer several questions concurrently, keeping the input order.
+        """
+        return await abatch_query(self.aquery, questions, concurrency)
+
+
+# Example questions, also used as the benchmark workload
+EXAMPLE_QUESTIONS = [
+    "What tables do we have in the database?",
+    "What fields do we have in an application?",
+    "Where do we persist application data?",
+    "Can a business have multiple loan applications?",
+    "How to submit an application? Where to find the status of an application?",
+    "Generate sql query to get application status by user email",
+]
+
 
 if __name__ == "__main__":
     # Example usage
     agent = DatabaseAgent()
 
-    # Example questions
-    questions = [
-        "What tables do we have in the database?",
-        "What fields do we have in an application?",
-        "Where do we persist application data?",
-        "Can a business have multiple loan applications?",
-        "How to submit an application? Where to find the status of an application?",
-        "Generate sql query to get application status by user email",
-    ]
-
-    # Print answers to example questions
-    for question in questions:
+    # Answer example questions concurrently and print them in order
+    answers = agent.batch_query(EXAMPLE_QUESTIONS, concurrency=4)
+    for question, answer in zip(EXAMPLE_QUESTIONS, answers):
         print(f"Question: {question}")
-        print(f"Answer: {agent.query(question)}")
+        print(f"Answer: {answer}")
         print("-" * 100)
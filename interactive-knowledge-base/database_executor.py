@@ -1,29 +1,128 @@
+import hashlib
+import itertools
+import json
+import re
+from contextlib import nullcontext
 import psycopg2
 from psycopg2 import sql
-from psycopg2.extras import RealDictCursor
-import pandas as pd
-from typing import Dict, List, Any, Optional, Union
+from psycopg2.extras import RealDictCursor, execute_values
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Any, Optional, Sequence, Union
+from utils.connection_pool import ConnectionPool, PooledConnection
+from utils.query_cache import QueryResultCache, is_cacheable, written_tables
+from utils.query_guard import QueryGuard, QueryRejected
+from utils.tracing import Tracer
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# Matches psycopg2 named placeholders like %(email)s
+NAMED_PLACEHOLDER = re.compile(r"%\((\w+)\)s")
+# Matches leading SQL comments and whitespace
+LEADING_COMMENTS = re.compile(r"^(\s+|--[^\n]*(\n|$)|/\*.*?\*/)*", re.DOTALL)
+# Statements that can be read through a server-side cursor
+STREAMABLE_STATEMENTS = ("select", "with", "values", "table")
+ERROR_PREFIX = "Error executing query"
+BULK_METHODS = ("copy", "insert")
+
+class _CsvStream:
+    """
+    Read-only file object rendering rows as CSV on demand, for COPY FROM STDIN.
+    Only the rows needed for the requested size are taken from the iterator.
+    """
+
+    def __init__(self, rows: Iterator[Sequence[Any]]):
+        self._rows = rows
+        self._pending = ""
+        self.rows = 0
+
+    def read(self, size: int = -1) -> str:
+        parts = [self._pending]
+        length = len(self._pending)
+        while size < 0 or length < size:
+            row = next(self._rows, None)
+            if row is None:
+                break
+            # Unquoted empty fields are NULL in CSV format, so every value is quoted
+            line = ",".join("" if value is None else '"' + str(value).replace('"', '""') + '"'
+                            for value in row) + "\n"
+            parts.append(line)
+            length += len(line)
+            self.rows += 1
+        data = "".join(parts)
+        if size < 0:
+            self._pending = ""
+            return data
+        self._pending = data[size:]
+        return data[:size]
 
 class DatabaseExecutor:
     """
     A class to connect to PostgreSQL database and execute SQL queries.
+    Connections are reused through a bounded, thread-safe connection pool.
+    In streaming mode results are read through server-side cursors and capped
+    by row count and size, so memory and output stay bounded for large tables.
+    Results of read queries can be cached by normalized SQL; writes through the
+    executor invalidate the cached results of the tables they touch.
+    In guarded mode every query is checked against its EXPLAIN estimates first
+    and runs in a read-only transaction with a statement timeout.
+    bulk_insert loads rows from an iterator in batches through COPY or multi-row INSERTs.
     """
-    
-    def __init__(self, 
-                 host: str = "localhost", 
-                 port: int = 5432, 
-                 dbname: str = "loan_application", 
-                 user: str = "loan_application_user", 
-                 password: str = "loan_application_password"):
+
+    def __init__(self,
+                 host: str = "localhost",
+                 port: int = 5432,
+                 dbname: str = "loan_application",
+                 user: str = "loan_application_user",
+                 password: str = "loan_application_password",
+                 min_pool_size: int = 1,
+                 max_pool_size: int = 5,
+                 pool_timeout: float = 30.0,
+                 health_check_interval: float = 30.0,
+                 connect: Optional[Callable[[], Any]] = None,
+                 stream_results: bool = False,
+                 max_rows: int = 100,
+                 max_bytes: int = 16000,
+                 fetch_size: int = 100,
+                 tracer: Optional[Tracer] = None,
+                 cache_results: bool = False,
+                 result_cache_size: int = 256,
+                 result_cache_ttl: Optional[float] = 60.0,
+                 guard_queries: bool = False,
+                 max_estimated_cost: float = 1_000_000.0,
+                 max_estimated_rows: int = 100_000,
+                 auto_limit: Optional[int] = 100,
+                 statement_timeout: Optional[float] = 30.0,
+                 read_only: bool = True):
         """
         Initialize the DatabaseExecutor with connection parameters.
-        
+
         Args:
             host: Database host
             port: Database port
             dbname: Database name
             user: Database username
             password: Database password
+            min_pool_size: Number of connections kept open once the pool is used
+            max_pool_size: Maximum number of open connections
+            pool_timeout: Seconds to wait for a free connection
+            health_check_interval: Idle seconds after which a pooled connection is pinged before reuse
+            connect: Optional connection factory, e.g. a stand-in for tests; defaults to psycopg2.connect
+            stream_results: Read SELECT results through a server-side cursor and render them as TSV
+            max_rows: Maximum number of rows rendered in streaming mode
+            max_bytes: Maximum size of the rendered result in streaming mode
+            fetch_size: Number of rows fetched per round trip in streaming mode
+            tracer: Optional tracer recording every query as a "sql" span
+            cache_results: Reuse results of repeated read queries until a write through this executor
+                touches one of the tables they read
+            result_cache_size: Maximum number of cached results
+            result_cache_ttl: Seconds a cached result stays valid, bounds staleness from writes by other clients
+            guard_queries: Check queries against their estimated cost and row count before running them,
+                and run them with statement_timeout and read_only
+            max_estimated_cost: Maximum estimated plan cost of a guarded query
+            max_estimated_rows: Maximum estimated number of rows returned by a guarded query
+            auto_limit: Row limit added to guarded reads over the limits instead of rejecting them, None to reject
+            statement_timeout: Seconds a guarded statement may run before PostgreSQL cancels it, None for no limit
+            read_only: Run guarded queries in read-only transactions and reject statements other than reads
         """
         self.connection_params = {
             "host": host,
@@ -32,50 +131,397 @@ class DatabaseExecutor:
             "user": user,
             "password": password
         }
-    
-    def execute_query(self, query: str, params: Optional[Dict[str, Any]] = None) -> Union[str, pd.DataFrame]:
+        self.pool = ConnectionPool(
+            connect=connect or (lambda: psycopg2.connect(**self.connection_params)),
+            min_size=min_pool_size,
+            max_size=max_pool_size,
+            timeout=pool_timeout,
+            health_check_interval=health_check_interval,
+        )
+        self.stream_results = stream_results
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.fetch_size = fetch_size
+        self._cursor_ids = itertools.count()
+        self.tracer = tracer
+        self.result_cache = QueryResultCache(result_cache_size, result_cache_ttl) if cache_results else None
+        self.guard = QueryGuard(max_estimated_cost, max_estimated_rows, auto_limit, read_only) if guard_queries else None
+        self.statement_timeout = statement_timeout
+        self.read_only = read_only
+
+    def execute_query(self, query: str, params: Optional[Dict[str, Any]] = None) -> Union[str, "pd.DataFrame"]:
         """
         Execute a SQL query and return the results.
-        
+        Queries with named parameters are prepared once per pooled connection and reused.
+        With cache_results, repeated read queries are answered from the result cache.
+
         Args:
             query: SQL query to execute
             params: Parameters for the SQL query
-            
+
         Returns:
             Results of the query as a formatted string or DataFrame
         """
-        try:
-            # Connect to the database
-            conn = psycopg2.connect(**self.connection_params)
-            
-            # Create a cursor with dictionary results
-            with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                # Execute the query
-                cursor.execute(query, params)
-                
-                # Check if this is a SELECT query (has results)
-                if cursor.description:
-                    # Fetch all results
-                    results = cursor.fetchall()
-                    
-                    # Convert to DataFrame for easier handling
-                    df = pd.DataFrame(results)
-                    
-                    if df.empty:
-                        return "Query executed successfully, but no results were returned."
-                    
-                    # Format the results as a string table
-                    return df.to_string(index=False)
-                else:
-                    # For non-SELECT queries (INSERT, UPDATE, DELETE)
+        if self.result_cache is None:
+            return self._run_query(query, params)
+
+        if not is_cacheable(query):
+            result = self._run_query(query, params)
+            # Drop cached results of the tables the statement may have changed
+            self.result_cache.invalidate(written_tables(query))
+            return result
+
+        result = self.result_cache.get(query, params)
+        if result is None:
+            # Taken before running, so a result read before a concurrent write is not cached after it
+            version = self.result_cache.version()
+            result = self._run_query(query, params)
+            if not (isinstance(result, str) and result.startswith(ERROR_PREFIX)):
+                self.result_cache.put(query, params, result, version)
+        return result
+
+    def _run_query(self, query: str, params: Optional[Dict[str, Any]] = None) -> Union[str, "pd.DataFrame"]:
+        """
+        Execute the query, bypassing the result cache.
+        In guarded mode queries over the cost limits are limited or rejected
+        with an explanation of their plan, returned in place of the result.
+        """
+        note = None
+        if self.guard is not None:
+            try:
+                query, note = self.guard.check(query, lambda statement: self._explain(statement, params))
+            except QueryRejected as e:
+                return f"{ERROR_PREFIX}: {e}"
+            except Exception as e:
+                return f"{ERROR_PREFIX}: {str(e)}"
+
+        result = self._run_guarded(query, params)
+        return f"{result}\n{note}" if note else result
+
+    def _run_guarded(self, query: str, params: Optional[Dict[str, Any]] = None) -> Union[str, "pd.DataFrame"]:
+        """
+        Execute the query after the guard check, streaming reads if stream_results is on.
+        """
+        if self.stream_results and self._is_streamable(query):
+            return self.stream_query(query, params)
+
+        # pandas is imported here to keep it off the startup path
+        import pandas as pd
+
+        with self._trace("execute_query", query) as span:
+            try:
+                # Borrow a connection from the pool
+                with self.pool.connection() as pooled:
+                    conn = pooled.connection
+                    self._begin(conn)
+
+                    # Create a cursor with dictionary results
+                    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
+                        # Execute the query
+                        self._execute(pooled, cursor, query, params)
+
+                        # Check if this is a SELECT query (has results)
+                        if cursor.description:
+                            # Fetch all results
+                            results = cursor.fetchall()
+
+                            # Convert to DataFrame for easier handling
+                            df = pd.DataFrame(results)
+
+                            if span is not None:
+                                span.attributes["rows"] = len(df)
+
+                            if df.empty:
+                                return "Query executed successfully, but no results were returned."
+
+                            # Format the results as a string table
+                            return df.to_string(index=False)
+                        else:
+                            # For non-SELECT queries (INSERT, UPDATE, DELETE)
+                            conn.commit()
+                            row_count = cursor.rowcount
+                            if span is not None:
+                                span.attributes["rows"] = row_count
+                            return f"Query executed successfully. {row_count} rows affected."
+
+            except Exception as e:
+                if span is not None:
+                    span.fail(e)
+                return f"{ERROR_PREFIX}: {str(e)}"
+
+    def stream_query(self, query: str, params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Execute a SELECT query through a server-side cursor and return a bounded TSV rendering.
+
+        Rows are fetched in batches of fetch_size until max_rows or max_bytes is reached.
+        When the output is truncated, the remaining rows are skipped on the server
+        to report the total row count.
+
+        Args:
+            query: SELECT query to execute
+            params: Parameters for the SQL query
+
+        Returns:
+            Results of the query as tab-separated text
+        """
+        with self._trace("stream_query", query) as span:
+            try:
+                with self.pool.connection() as pooled:
+                    conn = pooled.connection
+                    self._begin(conn)
+                    cursor_name = f"ikb_stream_{next(self._cursor_ids)}"
+
+                    with conn.cursor(name=cursor_name) as cursor:
+                        cursor.itersize = self.fetch_size
+                        cursor.execute(query, params)
+
+                        lines = []
+                        size = 0
+                        shown = 0
+                        pending = 0
+                        while not pending:
+                            batch = cursor.fetchmany(self.fetch_size)
+                            if not lines and cursor.description:
+                                header = "\t".join(column[0] for column in cursor.description)
+                                lines.append(header)
+                                size += len(header.encode("utf-8")) + 1
+                            if not batch:
+                                break
+                            for position, row in enumerate(batch):
+                                line = "\t".join(self._format_value(value) for value in row)
+                                line_size = len(line.encode("utf-8")) + 1
+                                if shown >= self.max_rows or size + line_size > self.max_bytes:
+                                    # Rows already fetched into this batch but not shown
+                                    pending = len(batch) - position
+                                    break
+                                lines.append(line)
+                                size += line_size
+                                shown += 1
+
+                        if span is not None:
+                            span.attributes["rows"] = shown
+
+                        if shown == 0 and not pending:
+                            return "Query executed successfully, but no results were returned."
+
+                        if pending:
+                            total = shown + pending + self._skip_remaining(conn, cursor_name)
+                            if span is not None:
+                                span.attributes["truncated_rows"] = total - shown
+                            lines.append(f"... output truncated: showing {shown} of {total} rows. "
+                                         f"Add filters or a LIMIT to see specific rows.")
+
+                        return "\n".join(lines)
+
+            except Exception as e:
+                if span is not None:
+                    span.fail(e)
+                return f"{ERROR_PREFIX}: {str(e)}"
+
+    def fetch_rows(self, query: str, params: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Execute a SELECT query and return its rows as dictionaries.
+        Unlike execute_query, errors are raised to the caller.
+
+        Args:
+            query: SQL query to execute
+            params: Parameters for the SQL query
+
+        Returns:
+            List of rows keyed by column name
+        """
+        with self._trace("fetch_rows", query), self.pool.connection() as pooled:
+            with pooled.connection.cursor(cursor_factory=RealDictCursor) as cursor:
+                self._execute(pooled, cursor, query, params)
+                return [dict(row) for row in cursor.fetchall()]
+
+    def bulk_insert(self,
+                    table: str,
+                    columns: Sequence[str],
+                    rows: Iterable[Sequence[Any]],
+                    method: str = "copy",
+                    batch_size: int = 50_000) -> int:
+        """
+        Insert rows taken lazily from an iterable and return the number of inserted rows.
+        Rows are loaded in batches of batch_size, each committed on its own, so memory stays
+        bounded for any number of rows. Unlike execute_query, errors are raised to the caller;
+        batches committed before an error stay inserted.
+
+        Args:
+            table: Table name, optionally schema-qualified
+            columns: Column names, in the order of the values of each row
+            rows: Rows as sequences of values, None is inserted as NULL
+            method: "copy" streams each batch through COPY FROM STDIN in CSV format,
+                "insert" sends it as multi-row INSERT statements (psycopg2's execute_values)
+            batch_size: Number of rows per batch and transaction
+
+        Returns:
+            Number of inserted rows
+        """
+        if method not in BULK_METHODS:
+            raise ValueError(f"Unknown bulk insert method {method!r}, expected one of {', '.join(BULK_METHODS)}")
+        if self.guard is not None and self.read_only:
+            raise ValueError("Bulk inserts need an executor without guard_queries or with read_only=False")
+
+        target = sql.Identifier(*table.split("."))
+        column_list = sql.SQL(", ").join(sql.Identifier(column) for column in columns)
+        if method == "copy":
+            statement = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv)").format(target, column_list)
+        else:
+            statement = sql.SQL("INSERT INTO {} ({}) VALUES %s").format(target, column_list)
+
+        rows = iter(rows)
+        total = 0
+        with self._trace("bulk_insert", f"{method} {table}") as span, self.pool.connection() as pooled:
+            conn = pooled.connection
+            query = statement.as_string(conn)
+            try:
+                while True:
+                    batch = itertools.islice(rows, batch_size)
+                    self._begin(conn)
+                    with conn.cursor() as cursor:
+                        if method == "copy":
+                            stream = _CsvStream(batch)
+                            cursor.copy_expert(query, stream)
+                            inserted = stream.rows
+                        else:
+                            batch = list(batch)
+                            if batch:
+                                execute_values(cursor, query, batch, page_size=1000)
+                            inserted = len(batch)
+                    if not inserted:
+                        conn.rollback()
+                        break
                     conn.commit()
-                    row_count = cursor.rowcount
-                    return f"Query executed successfully. {row_count} rows affected."
-                    
-        except Exception as e:
-            return f"Error executing query: {str(e)}"
-        
-        finally:
-            # Close the connection
-            if 'conn' in locals() and conn is not None:
-                conn.close()
\ No newline at end of file
+                    total += inserted
+            finally:
+                if span is not None:
+                    span.attributes["rows"] = total
+                # Cached results of the table are stale once a batch is committed
+                if total and self.result_cache is not None:
+                    self.result_cache.invalidate(written_tables(f"INSERT INTO {table}"))
+        return total
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Return result cache counters (hits, misses, invalidations, ...), empty if caching is off.
+        """
+        return self.result_cache.stats() if self.result_cache is not None else {}
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Return connection pool usage counters (checked out, waits, wait time, ...).
+        """
+        return self.pool.stats()
+
+    def close(self) -> None:
+        """
+        Close all pooled connections.
+        """
+        self.pool.closeall()
+
+    def _explain(self, query: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Return the root node of the JSON EXPLAIN plan of the query, without running it.
+        """
+        with self._trace("explain", query), self.pool.connection() as pooled:
+            self._begin(pooled.connection)
+            with pooled.connection.cursor() as cursor:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {query}", params)
+                plan = cursor.fetchone()[0]
+        # psycopg2 parses the json column, other drivers may return the text
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]["Plan"]
+
+    def _begin(self, conn) -> None:
+        """
+        Start the transaction of a guarded query as read-only with a statement timeout.
+        Both settings end with the transaction, so they are gone once the connection is back in the pool.
+        """
+        if self.guard is None:
+            return
+        with conn.cursor() as cursor:
+            if self.read_only:
+                cursor.execute("SET TRANSACTION READ ONLY")
+            if self.statement_timeout:
+                cursor.execute("SET LOCAL statement_timeout = %s", (int(self.statement_timeout * 1000),))
+
+    def _trace(self, operation: str, query: str):
+        """
+        Return a context manager recording the operation as a span, yielding None when tracing is off.
+        """
+        if self.tracer is None:
+            return nullcontext()
+        statement = LEADING_COMMENTS.sub("", query)
+        keyword = statement.split(None, 1)[0].lower() if statement.strip() else ""
+        return self.tracer.span("sql", operation, statement=keyword)
+
+    def _execute(self, pooled: PooledConnection, cursor, query: str, params: Optional[Dict[str, Any]]) -> None:
+        """
+        Execute the query, using a server-side prepared statement for parameterized queries.
+        """
+        if not params or not isinstance(params, dict):
+            cursor.execute(query, params)
+            return
+
+        names = list(dict.fromkeys(NAMED_PLACEHOLDER.findall(query)))
+        statement = pooled.prepared_statements.get(query)
+        if statement is None:
+            statement = self._prepare(pooled, cursor, query, names)
+
+        if not statement:
+            # The statement type can't be prepared (e.g. DDL), run it directly
+            cursor.execute(query, params)
+            return
+
+        if names:
+            arguments = ", ".join(f"%({name})s" for name in names)
+            cursor.execute(f"EXECUTE {statement} ({arguments})", params)
+        else:
+            cursor.execute(f"EXECUTE {statement}")
+
+    def _prepare(self, pooled: PooledConnection, cursor, query: str, names: List[str]) -> str:
+        """
+        Prepare the query on the pooled connection and return the statement name,
+        or an empty string if PostgreSQL refuses to prepare it.
+        """
+        statement = "stmt_" + hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+        positional = NAMED_PLACEHOLDER.sub(lambda m: f"${names.index(m.group(1)) + 1}", query)
+        try:
+            # Without parameters psycopg2 no longer unescapes %% itself
+            cursor.execute(f"PREPARE {statement} AS {positional.replace('%%', '%')}")
+        except psycopg2.ProgrammingError:
+            pooled.connection.rollback()
+            # The rollback also ended the guarded transaction settings
+            self._begin(pooled.connection)
+            statement = ""
+        pooled.prepared_statements[query] = statement
+        return statement
+
+    def _is_streamable(self, query: str) -> bool:
+        """
+        Check whether the query is a read statement that can run through a server-side cursor.
+        WITH statements containing data-modifying CTEs are executed buffered.
+        """
+        statement = LEADING_COMMENTS.sub("", query)
+        keyword = statement.split(None, 1)[0].lower() if statement.strip() else ""
+        if keyword == "with":
+            return written_tables(query) == set()
+        return keyword in STREAMABLE_STATEMENTS
+
+    def _skip_remaining(self, conn, cursor_name: str) -> int:
+        """
+        Move the server-side cursor to its end and return the number of skipped rows.
+        """
+        with conn.cursor() as cursor:
+            cursor.execute(sql.SQL("MOVE FORWARD ALL IN {}").format(sql.Identifier(cursor_name)))
+            return cursor.rowcount
+
+    def _format_value(self, value: Any) -> str:
+        """
+        Render a single value for TSV output, keeping each row on one line.
+        """
+        if value is None:
+            return "NULL"
+        return str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
@@ -1,75 +1,227 @@
+import asyncio
 from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
-from llama_index.core import SimpleDirectoryReader, VectorStoreIndex, Settings
+from llama_index.core import PromptHelper, get_response_synthesizer
+from llama_index.core.callbacks import CallbackManager
+from llama_index.core.query_engine import RetrieverQueryEngine
 from llama_index.core.prompts import PromptTemplate
 from llama_index.llms.openai import OpenAI
-from llama_index.embeddings.openai import OpenAIEmbedding
+from utils.index_store import PersistentIndexStore
+from utils.code_splitter import CHUNKING_VERSION, CodeStructureNodeParser
+from utils.hybrid_retriever import HybridRetriever, IdentifierReranker
+from utils.context_packer import ContextPacker
+from utils.batching import abatch_query, batch_query
+from utils.response_cache import ResponseCache, directory_fingerprint
+from utils.llama_index_tracing_handler import LlamaIndexTracingHandler
+from utils.embeddings import create_embed_model, embed_model_id
 
 # Load environment variables
 load_dotenv()
 
 MODEL = "gpt-4-turbo"
 TEMPERATURE = 0
+SIMILARITY_TOP_K = 8  # Chunks passed to context packing after fusion and reranking
+CONTEXT_TOKEN_BUDGET = 3000  # Tokens of packed chunks passed to the LLM
+CONTEXT_WINDOW = 32000  # Context window prompts are fitted to, below the model's own
+CANDIDATE_TOP_K = 10  # Candidates taken from each of vector and BM25 search
 TYPESCRIPT_FILES_PATH = Path(__file__).parent.parent / "quick-loan-platform" / "lovable-ui" / "src"
+INDEX_STORE_PATH = Path(__file__).parent / "storage" / "frontend"
+CACHE_PATH = Path(__file__).parent / "storage" / "cache" / "frontend_agent.jsonl"
 
 """
 Frontend Agent for answering questions about the lovable-ui frontend.
 This agent uses LlamaIndex to retrieve relevant information from TypeScript files
 and to provide answers based on the retrieved context.
+Answers are cached and reused for identical or near-duplicate questions until the indexed files change.
+Retrieved chunks are de-duplicated, merged per file, stripped of imports and packed into a token budget,
+see utils.context_packer.
 """
 class FrontendAgent:
 
-    def __init__(self):
-        # Set up LlamaIndex
-        Settings.llm = OpenAI(model=MODEL, temperature=TEMPERATURE)
-        Settings.embed_model = OpenAIEmbedding()
-        Settings.context_window = 32000
+    def __init__(self, use_cache: bool = True, llm=None, embed_model=None, index_dir: Path = INDEX_STORE_PATH,
+                 tracer=None, context_window: Optional[int] = CONTEXT_WINDOW):
+        # Set up LlamaIndex; llm defaults to OpenAI and embed_model to the EMBED_BACKEND model behind the shared
+        # embedding cache; both can be replaced, e.g. by benchmark fakes.
+        # Models are passed to the index and query engines instead of the global Settings, so agents with
+        # different models can be built and queried concurrently in one process
+        self.llm = llm or OpenAI(model=MODEL, temperature=TEMPERATURE)
+        self.embed_model = embed_model or create_embed_model()
+        self.index_dir = index_dir
+
+        # Record queries, retrievals, LLM and embedding calls as spans when a tracer is given
+        # (models passed in get this agent's callback manager, give separately traced agents their own models)
+        self.callback_manager = None
+        if tracer is not None:
+            self.callback_manager = CallbackManager([LlamaIndexTracingHandler(tracer, "frontend_agent")])
+            self.llm.callback_manager = self.callback_manager
+            self.embed_model.callback_manager = self.callback_manager
 
         # Load and index TypeScript files
         self.index = self._create_vector_index(TYPESCRIPT_FILES_PATH)
 
-        # Create a custom query engine with our prompt
-        self.query_engine = self.index.as_query_engine(
-            similarity_top_k=10,
-            # response_mode="tree_summarize"
+        # Create a query engine over hybrid BM25 + vector retrieval with local reranking,
+        # packing the best chunks into the token budget of the LLM context
+        self.retriever = HybridRetriever(
+            self.index,
+            vector_top_k=CANDIDATE_TOP_K,
+            lexical_top_k=CANDIDATE_TOP_K,
+            callback_manager=self.callback_manager,
+        )
+        self.context_packer = ContextPacker(token_budget=CONTEXT_TOKEN_BUDGET)
+        node_postprocessors = [IdentifierReranker(top_n=SIMILARITY_TOP_K), self.context_packer]
+        self.query_engine = RetrieverQueryEngine.from_args(
+            self.retriever,
+            llm=self.llm,
+            response_synthesizer=self._create_response_synthesizer(context_window),
+            node_postprocessors=node_postprocessors,
+            callback_manager=self.callback_manager,
         )
+        # Same engine yielding the answer tokens as the LLM produces them
+        self.streaming_query_engine = RetrieverQueryEngine.from_args(
+            self.retriever,
+            llm=self.llm,
+            response_synthesizer=self._create_response_synthesizer(context_window, streaming=True),
+            node_postprocessors=node_postprocessors,
+            callback_manager=self.callback_manager,
+        )
+
+        # Cache answers until an indexed file or the embedding model changes
+        embed_id = embed_model_id(self.embed_model)
+        self.cache = ResponseCache(
+            fingerprint=lambda: embed_id + "|" + directory_fingerprint(TYPESCRIPT_FILES_PATH, [".ts", ".tsx"]),
+            embed=self.embed_model.get_query_embedding,
+            persist_path=CACHE_PATH,
+        ) if use_cache else None
 
     def _create_vector_index(self, directory_path):
         """
-        Create a vector index from TypeScript files in the specified directory.
+        Load the vector index of TypeScript files in the specified directory.
+        The index is persisted on disk and only added or changed files are re-embedded.
+        Files are chunked along code structure, see CodeStructureNodeParser.
         """
-        documents = SimpleDirectoryReader(
-            input_dir=str(directory_path),
+        return PersistentIndexStore(
+            source_dir=directory_path,
             required_exts=[".ts", ".tsx"],
-            recursive=True,
-        ).load_data()
+            persist_dir=self.index_dir,
+            transformations=[CodeStructureNodeParser()],
+            embed_model=self.embed_model,
+            # Vectors of another embedding model can't be mixed in, rebuild the index instead
+            config=f"{CHUNKING_VERSION}|{embed_model_id(self.embed_model)}",
+        ).load()
 
-        # Create vector index
-        return VectorStoreIndex.from_documents(documents)
+    def _create_response_synthesizer(self, context_window, streaming=False):
+        """
+        Create the response synthesizer of the query engines, fitting prompts to this agent's LLM and context window.
+        """
+        metadata = self.llm.metadata
+        prompt_helper = PromptHelper(context_window=context_window or metadata.context_window,
+                                     num_output=metadata.num_output)
+        return get_response_synthesizer(
+            llm=self.llm,
+            prompt_helper=prompt_helper,
+            callback_manager=self.callback_manager,
+            streaming=streaming,
+            # response_mode="tree_summarize"
+        )
 
     def query(self, question):
         """
         Answer a question about the frontend UI.
         """
+        if self.cache is not None:
+            cached = self.cache.get(question)
+            if cached is not None:
+                return cached
+
         response = self.query_engine.query(question)
+
+        if self.cache is not None:
+            self.cache.put(question, response.response)
         return response.response
 
+    async def aquery(self, question):
+        """
+        Asynchronously answer a question about the frontend UI.
+        """
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, question)
+            if cached is not None:
+                return cached
+
+        response = await self.query_engine.aquery(question)
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, question, response.response)
+        return response.response
+
+    def stream(self, question):
+        """
+        Answer a question about the frontend UI, yielding the answer in chunks as the LLM produces them.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(question)
+            if cached is not None:
+                yield cached
+                return
+
+        chunks = []
+        for chunk in self.streaming_query_engine.query(question).response_gen:
+            chunks.append(chunk)
+            yield chunk
+
+        if self.cache is not None:
+            self.cache.put(question, "".join(chunks))
+
+    async def astream(self, question):
+        """
+        Asynchronously answer a question about the frontend UI, yielding the answer in chunks.
+        """
+        if self.cache is not None:
+            cached = await asyncio.to_thread(self.cache.get, question)
+            if cached is not None:
+                yield cached
+                return
+
+        chunks = []
+        response = await self.streaming_query_engine.aquery(question)
+        async for chunk in response.async_response_gen():
+            chunks.append(chunk)
+            yield chunk
+
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.put, question, "".join(chunks))
+
+    def batch_query(self, questions, concurrency=4):
+        """
+        Answer several questions concurrently, keeping the input order.
+        """
+        return batch_query(self.query, questions, concurrency)
+
+    async def abatch_query(self, questions, concurrency=4):
+        """
+        Asynchronously answer several questions concurrently, keeping the input order.
+        """
+        return await abatch_query(self.aquery, questions, concurrency)
+
+
+# Example questions, also used as the benchmark workload
+EXAMPLE_QUESTIONS = [
+    "What pages do we have on UI? Provide content of each page.",
+    "How is the application form structured? Provide a list of all fields used there.",
+    "How is user data validated in the application?",
+    "What API calls does the frontend make?",
+    "How does the UI handle application status updates?",
+]
+
 
 if __name__ == "__main__":
     # Example usage
     agent = FrontendAgent()
 
-    # Example questions
-    questions = [
-        "What pages do we have on UI? Provide content of each page.",
-        "How is the application form structured? Provide a list of all fields used there.",
-        "How is user data validated in the application?",
-        "What API calls does the frontend make?",
-        "How does the UI handle application status updates?",
-    ]
-
-    # Print answers to example questions
-    for question in questions:
+    # Answer example questions concurrently and print them in order
+    answers = agent.batch_query(EXAMPLE_QUESTIONS, concurrency=4)
+    for question, answer in zip(EXAMPLE_QUESTIONS, answers):
         print(f"Question: {question}")
-        print(f"Answer: {agent.query(question)}")
+        print(f"Answer: {answer}")
         print("-" * 100)
\ No newline at end of file
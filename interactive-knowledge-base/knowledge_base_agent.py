@@ -1,15 +1,27 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from contextvars import ContextVar, copy_context
 from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
+from langchain_core.callbacks.manager import dispatch_custom_event
 from langchain.agents import tool
 from langchain.agents import AgentExecutor
-from langchain.agents.react.agent import create_react_agent
-from database_agent import DatabaseAgent
-from backend_agent import BackendAgent
-from frontend_agent import FrontendAgent
-from database_executor import DatabaseExecutor
+from langchain.agents.output_parsers import ReActSingleInputOutputParser
+from langchain_core.runnables import RunnablePassthrough
+from langchain_core.tools import render_text_description
+from utils.batching import abatch_query, batch_query
 from utils.formatted_stdout_handler import FormattedStdOutCallbackHandler
+from utils.query_router import QueryRouter, RouteDecision
+from utils.scratchpad import Scratchpad, ScratchpadManager
+from utils.tracing import Tracer
+from utils.tracing_callback_handler import TracingCallbackHandler
 
 # Load environment variables
 load_dotenv()
@@ -18,70 +30,179 @@ MODEL = "gpt-4-turbo"
 TEMPERATURE = 0
 TOP_P = 0 # enforces nucleus sampling with no randomness — it’s a stricter form of deterministic generation
 AGENT_PROMPT_PATH = Path(__file__).parent / "knowledge_base_agent_prompt.md"
+MAX_ITERATIONS = 10  # Limit the number of iterations to prevent infinite loops
+MAX_EXECUTION_TIME = 60  # Limit execution time to 60 seconds
+PLATFORM_PATH = Path(__file__).parent.parent / "quick-loan-platform"
+FIELD_LINEAGE_PATH = Path(__file__).parent / "storage" / "lineage" / "field_lineage.json"
+SCRATCHPAD_TOKEN_BUDGET = 3000  # Tokens of tool observations re-sent to the LLM on every iteration
+ROUTING_LOG_PATH = Path(__file__).parent / "storage" / "logs" / "routing.jsonl"
+# Sub-agent answering the questions routed to a tool without the ReAct loop
+ROUTED_AGENTS = {"query_database": "db_agent", "query_backend": "backend_agent", "query_frontend": "frontend_agent"}
+
+TIMED_OUT_ANSWER = "No answer within the execution time limit."
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+TOOL_TOKEN_EVENT = "tool_token"  # Custom event carrying a chunk of a sub-agent answer
+
+# Deadline of the question currently being answered, shared with tools running in other threads
+_query_deadline: ContextVar[Optional[float]] = ContextVar("query_deadline", default=None)
+# Scratchpad of the question being answered, holds the full observations for recall_observation
+_scratchpad: ContextVar[Optional[Scratchpad]] = ContextVar("scratchpad", default=None)
+# Set while answering through stream/astream, makes the tools stream sub-agent answers
+_stream_tool_tokens: ContextVar[bool] = ContextVar("stream_tool_tokens", default=False)
+# Ends the queue of events passed from the streaming thread to stream()
+_END_OF_STREAM = object()
+
+
+class _FinalAnswerStream:
+    """Extracts the final answer tokens from the streamed ReAct output of LLM runs."""
+
+    def __init__(self):
+        self._texts: Dict[Any, str] = {}
+        self._emitted: Dict[Any, int] = {}
+
+    def feed(self, run_id: Any, chunk: str) -> str:
+        """Add a chunk of an LLM run and return the final answer text it completes, if any."""
+        text = self._texts.get(run_id, "") + chunk
+        self._texts[run_id] = text
+        marker = text.find(FINAL_ANSWER_MARKER)
+        if marker < 0:
+            return ""
+
+        start = marker + len(FINAL_ANSWER_MARKER)
+        if run_id not in self._emitted:
+            # Skip the whitespace after the marker, but only once it is followed by text
+            stripped = text[start:].lstrip()
+            if not stripped:
+                return ""
+            start = len(text) - len(stripped)
+        emitted = max(start, self._emitted.get(run_id, start))
+        self._emitted[run_id] = len(text)
+        return text[emitted:]
 
 """
 Knowledge Base Agent for answering questions about the Quick Loan Platform.
 This agent uses LangChain and OpenAI to provide answers based on the system overview.
 For database-related questions, it delegates to the DatabaseAgent.
+Sub-agents are built on first use; pass warm_up=True to build all of them concurrently upfront.
+With fan_out=True the agent gets an extra tool that asks all sub-agents concurrently in a single step;
+set concurrent_queries to the number of questions answered at the same time to size its thread pool.
+Field mapping questions (UI form field -> API -> entity -> table column) are answered in one step
+from a static field lineage index of the platform sources, see utils.field_lineage.
+stream and astream yield tool events and final answer tokens as they arrive, sub-agent answers are streamed too.
+Pass a utils.tracing.Tracer to record LLM calls, tool calls, retrievals and SQL executions as spans.
+Tool observations in the scratchpad are kept within a token budget: older ones are shortened
+to a preview the agent can read in full with the recall_observation tool.
+Questions clearly about a single domain are routed straight to its sub-agent, skipping the ReAct loop,
+see utils.query_router; pass route_questions=False to answer every question with the ReAct agent.
 """
 class KnowledgeBaseAgent:
 
-    def __init__(self, verbose: bool = False):
+    def __init__(self, verbose: bool = False, warm_up: bool = False, fan_out: bool = False, llm=None, agent_factories=None,
+                 tracer: Optional[Tracer] = None, scratchpad_token_budget: int = SCRATCHPAD_TOKEN_BUDGET,
+                 route_questions: bool = True, concurrent_queries: int = 1):
         self.verbose = verbose
+        self.tracer = tracer
+        self.scratchpad = ScratchpadManager(token_budget=scratchpad_token_budget)
+        self.router = QueryRouter(log_path=ROUTING_LOG_PATH) if route_questions else None
 
         # Load the agent prompt
         self.agent_prompt = self._load_agent_prompt(AGENT_PROMPT_PATH)
 
-        # Initialize the DatabaseAgent
-        self.db_agent = DatabaseAgent()
-
-        # Initialize the BackendAgent
-        self.backend_agent = BackendAgent()
+        # Sub-agents are created lazily by _get_agent, one lock per agent
+        self._agent_factories = {
+            "db_agent": self._create_db_agent,
+            "backend_agent": self._create_backend_agent,
+            "frontend_agent": self._create_frontend_agent,
+            "db_executor": self._create_db_executor,
+            "field_lineage": self._create_field_lineage,
+        }
+        # Factories passed in replace the defaults, e.g. to run sub-agents on benchmark fakes
+        self._agent_factories.update(agent_factories or {})
+        self._agents = {}
+        self._agent_locks = {name: threading.Lock() for name in self._agent_factories}
 
-        # Initialize the FrontendAgent
-        self.frontend_agent = FrontendAgent()
-
-        # Initialize the DatabaseExecutor
-        self.db_executor = DatabaseExecutor()
-
-        # Initialize the LLM
-        self.llm = ChatOpenAI(model=MODEL, temperature=TEMPERATURE, top_p=TOP_P)
+        # Initialize the LLM; defaults to OpenAI and can be replaced, e.g. by benchmark fakes
+        self.llm = llm or ChatOpenAI(model=MODEL, temperature=TEMPERATURE, top_p=TOP_P)
 
         # Define the database query tool
         @tool
         def query_database(question: str) -> str:
             """Use this tool for any questions related to database schema, tables, fields, or SQL queries."""
-            return self.db_agent.query(question)
+            return self._ask("query_database", "db_agent", question)
 
         # Define the backend query tool
         @tool
         def query_backend(question: str) -> str:
             """Use this tool for any questions related to the backend service, APIs, application submission process, or Java implementation details."""
-            return self.backend_agent.query(question)
+            return self._ask("query_backend", "backend_agent", question)
 
         # Define the frontend query tool
         @tool
         def query_frontend(question: str) -> str:
             """Use this tool for any questions related to the frontend UI, pages, components, forms, validation, or TypeScript implementation details."""
-            return self.frontend_agent.query(question)
+            return self._ask("query_frontend", "frontend_agent", question)
 
         # Define the database execution tool
         @tool
         def execute_database(query: str) -> str:
-            """Use this tool to execute SQL queries against the PostgreSQL database and get the results. 
-            Provide the SQL query as input. Be careful with destructive operations (DELETE, DROP, etc.)."""
+            """Use this tool to execute read-only SQL queries against the PostgreSQL database and get the results.
+            Provide the SQL query as input. Queries that are too expensive are rejected with an explanation of
+            their plan; rewrite them with join conditions, filters, aggregation or a LIMIT."""
             return self.db_executor.execute_query(query)
 
-        self.tools = [query_database, query_backend, query_frontend, execute_database]
+        # Define the field lineage tool, answering UI -> API -> DB mapping questions in one step
+        @tool
+        def query_field_lineage(query: str) -> str:
+            """Use this tool first for questions on how application fields flow through the system: which fields the UI
+            forms ask, how each is passed to the backend API (JSON path, DTO field, validation), and in which entity field,
+            table and column it is stored. Provide a field name, label, table or column, or "all" for every field."""
+            return self.field_lineage.lookup(query)
+
+        # Define the tool reading observations that were shortened in the scratchpad
+        @tool
+        def recall_observation(reference: str) -> str:
+            """Use this tool to read an earlier observation that was shortened in your notes. Provide its reference,
+            e.g. obs-2, or a line range of it, e.g. obs-2:41-80."""
+            return self._current_scratchpad().recall(reference)
+
+        self.tools = [query_database, query_backend, query_frontend, execute_database, query_field_lineage,
+                      recall_observation]
+
+        # Define the fan-out tool
+        self._fan_out_tools = [query_database, query_backend, query_frontend]
+        # A thread per tool for every question answered at the same time, so concurrent questions don't queue
+        # behind each other; tool calls past their deadline stop at the next check in _ask and free their thread
+        self._fan_out_pool = ThreadPoolExecutor(
+            max_workers=concurrent_queries * len(self._fan_out_tools),
+            thread_name_prefix="knowledge-base-fan-out",
+        ) if fan_out else None
+
+        @tool
+        def query_all_contexts(question: str) -> str:
+            """Use this tool when the context of the question is not obvious. It asks the database, backend and frontend
+            tools the same question concurrently and returns all of their answers at once."""
+            return self._fan_out(question)
+
+        if fan_out:
+            self.tools.append(query_all_contexts)
 
         # Create a prompt template for the ReAct agent using the loaded prompt
         self.react_prompt = PromptTemplate.from_template(self.agent_prompt)
 
-        # Create a ReAct agent with tools
-        self.agent = create_react_agent(
-            llm=self.llm,
-            tools=self.tools,
-            prompt=self.react_prompt
+        # Create a ReAct agent with tools, as create_react_agent does,
+        # but with a scratchpad that keeps observations within the token budget
+        prompt = self.react_prompt.partial(
+            tools=render_text_description(self.tools),
+            tool_names=", ".join(tool.name for tool in self.tools),
+        )
+        self.agent = (
+            RunnablePassthrough.assign(
+                agent_scratchpad=lambda x: self._current_scratchpad().render(x["intermediate_steps"])
+            )
+            | prompt
+            | self.llm.bind(stop=["\nObservation"])
+            | ReActSingleInputOutputParser()
         )
 
         # Create an agent executor with custom callback handler for better log formatting
@@ -91,11 +212,211 @@ class KnowledgeBaseAgent:
             tools=self.tools,
             verbose=verbose,
             handle_parsing_errors=True,
-            max_iterations=10,  # Limit the number of iterations to prevent infinite loops
-            max_execution_time=60,  # Limit execution time to 60 seconds
+            max_iterations=MAX_ITERATIONS,
+            max_execution_time=MAX_EXECUTION_TIME,
             callbacks=callbacks
         )
 
+        # Record LLM and tool calls of every run as spans; sub-agents get the same tracer
+        self.run_config = {"callbacks": [TracingCallbackHandler(tracer)]} if tracer is not None else {}
+
+        if warm_up:
+            self.warm_up()
+
+    @property
+    def db_agent(self):
+        return self._get_agent("db_agent")
+
+    @property
+    def backend_agent(self):
+        return self._get_agent("backend_agent")
+
+    @property
+    def frontend_agent(self):
+        return self._get_agent("frontend_agent")
+
+    @property
+    def db_executor(self):
+        return self._get_agent("db_executor")
+
+    @property
+    def field_lineage(self):
+        return self._get_agent("field_lineage")
+
+    def _get_agent(self, name):
+        """
+        Return the sub-agent with the given name, building it on first use.
+        """
+        agent = self._agents.get(name)
+        if agent is None:
+            with self._agent_locks[name]:
+                agent = self._agents.get(name)
+                if agent is None:
+                    agent = self._agent_factories[name]()
+                    self._agents[name] = agent
+        return agent
+
+    def warm_up(self):
+        """
+        Build all sub-agents concurrently in a thread pool.
+        """
+        with ThreadPoolExecutor(max_workers=len(self._agent_factories)) as pool:
+            futures = [pool.submit(self._get_agent, name) for name in self._agent_factories]
+            for future in futures:
+                # Re-raise the first initialization error, if any
+                future.result()
+
+    def agent_status(self):
+        """
+        Return for every sub-agent whether it is built.
+        """
+        return {name: name in self._agents for name in self._agent_factories}
+
+    # Heavy dependencies (llama_index, pandas) are imported only when a sub-agent is built
+
+    def _create_db_agent(self):
+        from database_agent import DatabaseAgent
+        return DatabaseAgent(tracer=self.tracer)
+
+    def _create_backend_agent(self):
+        from backend_agent import BackendAgent
+        return BackendAgent(tracer=self.tracer)
+
+    def _create_frontend_agent(self):
+        from frontend_agent import FrontendAgent
+        return FrontendAgent(tracer=self.tracer)
+
+    def _create_db_executor(self):
+        from database_executor import DatabaseExecutor
+        # Stream bounded results so a broad SELECT can't flood the prompt,
+        # reuse results of lookups the agent repeats within a question,
+        # and keep generated SQL read-only and within a cost budget
+        return DatabaseExecutor(stream_results=True, cache_results=True, guard_queries=True, tracer=self.tracer)
+
+    def _create_field_lineage(self):
+        from utils.field_lineage import FieldLineageIndex
+        # Parsed sources are stored on disk, lookups only re-parse files changed since
+        return FieldLineageIndex(PLATFORM_PATH, FIELD_LINEAGE_PATH)
+
+    def _fan_out(self, question):
+        """
+        Run the question through all sub-agent tools concurrently and merge their observations.
+        Tools still running when the query deadline passes are reported as timed out.
+        """
+        deadline = _query_deadline.get()
+        timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+
+        # Each tool runs in a copy of the current context, so its spans nest under the fan-out tool span
+        futures = {
+            tool.name: self._fan_out_pool.submit(copy_context().run, tool.func, question)
+            for tool in self._fan_out_tools
+        }
+        wait(futures.values(), timeout=timeout)
+
+        observations = []
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()
+                answer = TIMED_OUT_ANSWER
+            elif future.exception() is not None:
+                answer = f"Error: {future.exception()}"
+            else:
+                answer = future.result()
+            observations.append(f"[{name}]\n{answer}")
+        return "\n\n".join(observations)
+
+    def _ask(self, tool_name, agent_name, question):
+        """
+        Ask the sub-agent with the given name the question, building it first if needed.
+        While answering through stream/astream the sub-agent answer is streamed and
+        every chunk is dispatched as a custom event.
+        Calls made after the query deadline, e.g. fan-out calls nobody waits for anymore,
+        return without asking; streamed answers stop at the first chunk past the deadline.
+        """
+        if self._past_deadline():
+            return TIMED_OUT_ANSWER
+        # Resolved only now, so a late call doesn't build the sub-agent, e.g. its vector index
+        agent = self._get_agent(agent_name)
+        # Building the sub-agent, or waiting for another thread building it, may have used up the time left
+        if self._past_deadline():
+            return TIMED_OUT_ANSWER
+        if not _stream_tool_tokens.get():
+            return agent.query(question)
+
+        chunks = []
+        answer = agent.stream(question)
+        try:
+            for chunk in answer:
+                chunks.append(chunk)
+                dispatch_custom_event(TOOL_TOKEN_EVENT, {"tool": tool_name, "text": chunk})
+                if self._past_deadline():
+                    chunks.append(f"\n{TIMED_OUT_ANSWER}")
+                    break
+        finally:
+            answer.close()
+        return "".join(chunks)
+
+    @staticmethod
+    def _past_deadline() -> bool:
+        deadline = _query_deadline.get()
+        return deadline is not None and time.monotonic() >= deadline
+
+    def _current_scratchpad(self) -> Scratchpad:
+        """
+        Return the scratchpad of the question being answered, or a new one outside of query/aquery/astream.
+        """
+        scratchpad = _scratchpad.get()
+        if scratchpad is None:
+            scratchpad = self.scratchpad.create()
+            _scratchpad.set(scratchpad)
+        return scratchpad
+
+    def _report_scratchpad(self, scratchpad: Scratchpad):
+        """
+        Add the tokens saved by shortening observations to the totals of scratchpad_stats.
+        """
+        stats = self.scratchpad.record(scratchpad)
+        if self.verbose and stats["shortened"]:
+            print(f"Scratchpad: shortened {stats['shortened']} observations, "
+                  f"saved {stats['tokens_saved']:,} prompt tokens")
+
+    def scratchpad_stats(self):
+        """
+        Return the number of questions answered, observations shortened and prompt tokens sent and saved.
+        """
+        return self.scratchpad.stats()
+
+    def _route(self, question) -> Optional[RouteDecision]:
+        """
+        Decide whether a single sub-agent answers the question, None when routing is off.
+        """
+        if self.router is None:
+            return None
+        decision = self.router.route(question)
+        if self.verbose:
+            print(f"Router: {decision.route or 'react'} (confidence {decision.confidence:.2f}, {decision.reason})")
+        return decision
+
+    def _routed_agent(self, decision: RouteDecision):
+        return self._get_agent(ROUTED_AGENTS[decision.route])
+
+    def _trace_route(self, decision: RouteDecision):
+        """
+        Return a context manager recording the routed answer as a span, yielding None when tracing is off.
+        """
+        if self.tracer is None:
+            return nullcontext()
+        return self.tracer.span("router", decision.route, confidence=decision.confidence)
+
+    def _report_fallback(self, decision: RouteDecision, error: Exception):
+        if self.verbose:
+            print(f"Router: {decision.route} failed ({error}), falling back to the agent")
+
+    def router_stats(self):
+        """
+        Return the number of questions answered per route ("react" for the agent) and of fallbacks to the agent.
+        """
+        return self.router.stats() if self.router is not None else {}
 
     def _load_agent_prompt(self, agent_prompt_path):
         with open(agent_prompt_path, 'r') as f:
@@ -104,43 +425,227 @@ class KnowledgeBaseAgent:
             return f.read()
 
     def query(self, question):
-        # Use the agent executor to run the agent with the question
-        response = self.agent_executor.invoke({
-            "input": question
-        })
+        # Answer single-domain questions with the sub-agent, falling back to the agent if it fails
+        decision = self._route(question)
+        started = time.perf_counter()
+        fallback = False
+        if decision is not None and decision.route is not None:
+            try:
+                with self._trace_route(decision):
+                    answer = self._routed_agent(decision).query(question)
+            except Exception as e:
+                self._report_fallback(decision, e)
+                fallback = True
+            else:
+                self.router.log(question, decision, time.perf_counter() - started)
+                return answer
+
+        # Let the fan-out tool respect the executor's time limit
+        token = _query_deadline.set(time.monotonic() + MAX_EXECUTION_TIME)
+        scratchpad = self.scratchpad.create()
+        scratchpad_token = _scratchpad.set(scratchpad)
+        try:
+            # Use the agent executor to run the agent with the question
+            response = self.agent_executor.invoke({
+                "input": question
+            }, config=self.run_config)
+        finally:
+            _scratchpad.reset(scratchpad_token)
+            _query_deadline.reset(token)
+            self._report_scratchpad(scratchpad)
 
+        if decision is not None:
+            self.router.log(question, decision, time.perf_counter() - started, fallback)
         # Return the output from the agent
         return response["output"]
 
+    async def aquery(self, question):
+        decision = self._route(question)
+        started = time.perf_counter()
+        fallback = False
+        if decision is not None and decision.route is not None:
+            try:
+                with self._trace_route(decision):
+                    answer = await self._routed_agent(decision).aquery(question)
+            except Exception as e:
+                self._report_fallback(decision, e)
+                fallback = True
+            else:
+                self.router.log(question, decision, time.perf_counter() - started)
+                return answer
+
+        # Let the fan-out tool respect the executor's time limit
+        token = _query_deadline.set(time.monotonic() + MAX_EXECUTION_TIME)
+        scratchpad = self.scratchpad.create()
+        scratchpad_token = _scratchpad.set(scratchpad)
+        try:
+            response = await self.agent_executor.ainvoke({
+                "input": question
+            }, config=self.run_config)
+        finally:
+            _scratchpad.reset(scratchpad_token)
+            _query_deadline.reset(token)
+            self._report_scratchpad(scratchpad)
+
+        if decision is not None:
+            self.router.log(question, decision, time.perf_counter() - started, fallback)
+        return response["output"]
+
+    async def astream(self, question) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Answer the question, yielding events as they happen:
+        {"type": "tool_start", "tool", "input"} and {"type": "tool_end", "tool", "output"} around tool calls,
+        {"type": "tool_token", "tool", "text"} for chunks of sub-agent answers,
+        {"type": "token", "text"} for tokens of the final answer,
+        and at last {"type": "final", "output"} with the complete answer.
+        A routed question yields the sub-agent call as tool events and its answer chunks as tokens.
+        """
+        decision = self._route(question)
+        started = time.perf_counter()
+        fallback = False
+        if decision is not None and decision.route is not None:
+            yield {"type": "tool_start", "tool": decision.route, "input": question}
+            chunks = []
+            try:
+                with self._trace_route(decision):
+                    async for chunk in self._routed_agent(decision).astream(question):
+                        chunks.append(chunk)
+                        yield {"type": "token", "text": chunk}
+            except Exception as e:
+                # Tokens already yielded can't be taken back, only fall back before the first one
+                if chunks:
+                    raise
+                self._report_fallback(decision, e)
+                yield {"type": "tool_end", "tool": decision.route, "output": f"Error: {e}"}
+                fallback = True
+            else:
+                output = "".join(chunks)
+                self.router.log(question, decision, time.perf_counter() - started)
+                yield {"type": "tool_end", "tool": decision.route, "output": output}
+                yield {"type": "final", "output": output}
+                return
+
+        deadline_token = _query_deadline.set(time.monotonic() + MAX_EXECUTION_TIME)
+        stream_token = _stream_tool_tokens.set(True)
+        scratchpad = self.scratchpad.create()
+        scratchpad_token = _scratchpad.set(scratchpad)
+        try:
+            final_answer = _FinalAnswerStream()
+            root_run_id = None
+            async for event in self.agent_executor.astream_events(
+                {"input": question}, config=self.run_config, version="v2"
+            ):
+                kind = event["event"]
+                if root_run_id is None:
+                    root_run_id = event["run_id"]
+
+                if kind == "on_chat_model_stream":
+                    text = final_answer.feed(event["run_id"], event["data"]["chunk"].content)
+                    if text:
+                        yield {"type": "token", "text": text}
+                elif kind == "on_tool_start":
+                    yield {"type": "tool_start", "tool": event["name"], "input": event["data"].get("input")}
+                elif kind == "on_tool_end":
+                    yield {"type": "tool_end", "tool": event["name"], "output": str(event["data"].get("output"))}
+                elif kind == "on_custom_event" and event["name"] == TOOL_TOKEN_EVENT:
+                    yield {"type": "tool_token", **event["data"]}
+                elif kind == "on_chain_end" and event["run_id"] == root_run_id:
+                    yield {"type": "final", "output": event["data"]["output"]["output"]}
+        finally:
+            _scratchpad.reset(scratchpad_token)
+            _stream_tool_tokens.reset(stream_token)
+            _query_deadline.reset(deadline_token)
+            self._report_scratchpad(scratchpad)
+
+        if decision is not None:
+            self.router.log(question, decision, time.perf_counter() - started, fallback)
+
+    def stream(self, question) -> Iterator[Dict[str, Any]]:
+        """
+        Answer the question, yielding the events of astream as they happen.
+        The agent runs on an event loop in a background thread, which stops
+        when the generator is closed.
+        """
+        events = queue.Queue()
+        closed = threading.Event()
+
+        async def produce():
+            stream = self.astream(question)
+            try:
+                async for event in stream:
+                    if closed.is_set():
+                        break
+                    events.put(event)
+            finally:
+                # Close the stream in this task, so its context variables are reset where they were set
+                await stream.aclose()
+
+        def run():
+            try:
+                asyncio.run(produce())
+            except BaseException as e:
+                events.put(e)
+            finally:
+                events.put(_END_OF_STREAM)
+
+        threading.Thread(target=run, name="knowledge-base-stream", daemon=True).start()
+        try:
+            while True:
+                event = events.get()
+                if event is _END_OF_STREAM:
+                    return
+                if isinstance(event, BaseException):
+                    raise event
+                yield event
+        finally:
+            closed.set()
+
+    def batch_query(self, questions, concurrency=4):
+        """
+        Answer several questions concurrently, keeping the input order.
+        Identical questions are answered once.
+        """
+        return batch_query(self.query, questions, concurrency)
+
+    async def abatch_query(self, questions, concurrency=4):
+        """
+        Asynchronously answer several questions concurrently, keeping the input order.
+        Identical questions are answered once.
+        """
+        return await abatch_query(self.aquery, questions, concurrency)
+
+
+# Example questions, also used as the benchmark workload
+EXAMPLE_QUESTIONS = [
+    "What is the Quick Loan Platform?",
+    "How does our application submission process work?",
+    "What tables do we have in the database? Provide columns and types for each table.",
+    "Generate sql query to get application status by user email",
+    "Can a business have multiple loan applications?",
+    "Where to find the status of an application?",
+    "What APIs do we have? Provide url, request and response payloads in json format.",
+    "What validation do we have for the Phone field?",
+    "How is user data validated in the application?",
+    "What pages do we have on UI? Provide content of each page.",
+    "What application fields do we ask?",
+    "What is the status of an application for Wilma Mason?",
+    "Understand decline logic on the backend. Find the application id for Wilma Mason. Pull necessary application data by applicaiton id. Explain why it was declined.",
+    "Generate an e2e test plan to test the declining flow. Provide steps and expected results.",
+    "Step 1. Get a list of application fields we ask on UI during app intake."
+    "Step 2. Find how UI passes each field value to the backend."
+    "Step 3. Find in which table and column backend persist each field value."
+    "Step 4. Return a list of UI fields mapped to the database table and column."
+]
+
 
 if __name__ == "__main__":
     # Example usage
-    agent = KnowledgeBaseAgent(verbose = True)
-
-    # Example questions
-    questions = [
-        "What is the Quick Loan Platform?",
-        "How does our application submission process work?",
-        "What tables do we have in the database? Provide columns and types for each table.",
-        "Generate sql query to get application status by user email",
-        "Can a business have multiple loan applications?",
-        "Where to find the status of an application?",
-        "What APIs do we have? Provide url, request and response payloads in json format.",
-        "What validation do we have for the Phone field?",
-        "How is user data validated in the application?",
-        "What pages do we have on UI? Provide content of each page.",
-        "What application fields do we ask?",
-        "What is the status of an application for Wilma Mason?",
-        "Understand decline logic on the backend. Find the application id for Wilma Mason. Pull necessary application data by applicaiton id. Explain why it was declined.",
-        "Generate an e2e test plan to test the declining flow. Provide steps and expected results.",
-        "Step 1. Get a list of application fields we ask on UI during app intake."
-        "Step 2. Find how UI passes each field value to the backend."
-        "Step 3. Find in which table and column backend persist each field value."
-        "Step 4. Return a list of UI fields mapped to the database table and column."
-    ]
-
-    # Print answers to example questions
-    for question in questions:
+    agent = KnowledgeBaseAgent(verbose = True, fan_out = True)
+
+    # Verbose logs of concurrently answered questions interleave,
+    # raise the concurrency together with verbose = False
+    answers = agent.batch_query(EXAMPLE_QUESTIONS, concurrency=1)
+    for question, answer in zip(EXAMPLE_QUESTIONS, answers):
         print(f"Question: {question}")
-        print(f"Answer: {agent.query(question)}")
+        print(f"Answer: {answer}")
         print("-" * 100)
@@ -0,0 +1,356 @@
+import argparse
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Optional
+from utils.tracing import Tracer
+
+HOST = "127.0.0.1"
+PORT = 8000
+WORKERS = 4  # Questions answered at the same time
+QUEUE_SIZE = 16  # Questions waiting for a worker before new ones are rejected
+REQUEST_TIMEOUT = 120  # Seconds a request waits for its answer
+MAX_BODY_SIZE = 64 * 1024
+
+# Ends the queue of events passed from the worker streaming an answer to stream()
+_END_OF_STREAM = object()
+
+
+class ServiceUnavailable(Exception):
+    """Raised when a question can't be accepted because the service is not ready or is at capacity."""
+
+
+"""
+Resident HTTP service for the Knowledge Base Agent.
+The agent and its sub-agents (vector indexes, schema catalog, connection pool) are built once
+in the background at startup and then serve questions from many clients concurrently.
+Questions, streamed or not, run on a bounded worker pool; when all workers are busy and the queue
+is full, new questions are rejected with 503 so clients can back off instead of piling up.
+Answers not complete within the request timeout are answered with 504.
+
+Endpoints:
+    POST /query   {"question": "..."} -> {"answer": "...", "latency": seconds}
+    POST /stream  {"question": "..."} -> newline-delimited JSON events of KnowledgeBaseAgent.stream
+    GET  /healthz liveness
+    GET  /readyz  readiness, 503 until all sub-agents are warmed up
+    GET  /metrics Prometheus text metrics
+"""
+class KnowledgeBaseServer:
+
+    def __init__(self,
+                 host: str = HOST,
+                 port: int = PORT,
+                 workers: int = WORKERS,
+                 queue_size: int = QUEUE_SIZE,
+                 request_timeout: float = REQUEST_TIMEOUT,
+                 agent_factory: Optional[Callable[[], Any]] = None,
+                 tracer: Optional[Tracer] = None):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.request_timeout = request_timeout
+        self.tracer = tracer
+        self._agent_factory = agent_factory or self._create_agent
+
+        self.agent = None
+        self.state = "starting"
+        self.error = None
+        self.started_at = time.monotonic()
+
+        # Admission control: a slot per worker plus one per queued question
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="knowledge-base-worker")
+        self._stats_lock = threading.Lock()
+        self._stats = {"requests": 0, "rejected": 0, "timeouts": 0, "errors": 0, "admitted": 0, "running": 0}
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+
+    def _create_agent(self):
+        from knowledge_base_agent import KnowledgeBaseAgent
+        return KnowledgeBaseAgent(fan_out=True, concurrent_queries=self.workers, tracer=self.tracer)
+
+    def warm_up(self):
+        """
+        Build the agent and all of its sub-agents; the service is ready afterwards.
+        """
+        try:
+            agent = self._agent_factory()
+            self.agent = agent
+            agent.warm_up()
+            self.state = "ready"
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.state = "failed"
+
+    def serve_forever(self):
+        """
+        Warm up in the background and serve requests until shutdown() is called.
+        """
+        threading.Thread(target=self.warm_up, name="knowledge-base-warm-up", daemon=True).start()
+        host, port = self.httpd.server_address[:2]
+        print(f"Serving the knowledge base on http://{host}:{port}")
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def readiness(self) -> Dict[str, Any]:
+        return {
+            "status": self.state,
+            "agents": self.agent.agent_status() if self.agent is not None else {},
+            "error": self.error,
+            "uptime": time.monotonic() - self.started_at,
+        }
+
+    def answer(self, question: str) -> str:
+        """
+        Answer the question on the worker pool, waiting at most request_timeout seconds.
+        Raises ServiceUnavailable when the queue is full and TimeoutError when the answer takes too long.
+        """
+        self._admit()
+        try:
+            future = self._pool.submit(self._run, question)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is freed when the question is done, even if the client stopped waiting
+        future.add_done_callback(lambda _: self._release())
+
+        try:
+            return future.result(timeout=self.request_timeout)
+        except FutureTimeoutError:
+            # Only drops a question still waiting for a worker: a running one can't be interrupted and keeps
+            # its worker until the agent's own execution time limit ends it
+            future.cancel()
+            self._count("timeouts")
+            raise TimeoutError(f"No answer within {self.request_timeout} seconds")
+
+    def stream(self, question: str):
+        """
+        Stream the answer on the worker pool, yielding the events of KnowledgeBaseAgent.stream as they arrive.
+        Raises ServiceUnavailable when the queue is full and TimeoutError when the answer is not complete
+        within request_timeout seconds; the worker stops streaming once the generator is closed.
+        """
+        self._admit()
+        events = queue.Queue()
+        closed = threading.Event()
+        try:
+            future = self._pool.submit(self._produce, question, events, closed)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(lambda _: self._release())
+
+        deadline = time.monotonic() + self.request_timeout
+        try:
+            while True:
+                try:
+                    event = events.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    self._count("timeouts")
+                    raise TimeoutError(f"No answer within {self.request_timeout} seconds")
+                if event is _END_OF_STREAM:
+                    return
+                if isinstance(event, BaseException):
+                    raise event
+                yield event
+        finally:
+            closed.set()
+            future.cancel()
+
+    def metrics(self) -> str:
+        """
+        Render service counters, and the tracer metrics if tracing is on, in the Prometheus text format.
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lines = []
+        for name in ("requests", "rejected", "timeouts", "errors"):
+            lines += [f"# TYPE ikb_server_{name}_total counter", f"ikb_server_{name}_total {stats[name]}"]
+        gauges = {
+            "running": stats["running"],
+            "queued": max(stats["admitted"] - stats["running"], 0),
+            "ready": int(self.state == "ready"),
+        }
+        for name, value in gauges.items():
+            lines += [f"# TYPE ikb_server_{name} gauge", f"ikb_server_{name} {value}"]
+        text = "\n".join(lines) + "\n"
+        if self.tracer is not None:
+            text += self.tracer.prometheus_text()
+        return text
+
+    def _run(self, question: str) -> str:
+        with self._running():
+            return self.agent.query(question)
+
+    def _produce(self, question: str, events: queue.Queue, closed: threading.Event):
+        """
+        Put the events of the streamed answer on the queue until the stream ends or the reader closes it.
+        """
+        if closed.is_set():
+            return
+        with self._running():
+            stream = self.agent.stream(question)
+            try:
+                for event in stream:
+                    if closed.is_set():
+                        break
+                    events.put(event)
+            except BaseException as e:
+                events.put(e)
+            finally:
+                stream.close()
+                events.put(_END_OF_STREAM)
+
+    @contextmanager
+    def _running(self):
+        self._count("running")
+        try:
+            yield
+        finally:
+            self._count("running", -1)
+
+    def _admit(self):
+        self._count("requests")
+        if self.state != "ready":
+            self._count("rejected")
+            raise ServiceUnavailable(f"Knowledge base is {self.state}")
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            raise ServiceUnavailable("All workers are busy and the queue is full")
+        self._count("admitted")
+
+    def _release(self):
+        self._count("admitted", -1)
+        self._slots.release()
+
+    def _count(self, name: str, delta: int = 1):
+        with self._stats_lock:
+            self._stats[name] += delta
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def do_GET(self):
+                if self.path == "/healthz":
+                    self._send_json(HTTPStatus.OK, {"status": "ok"})
+                elif self.path == "/readyz":
+                    readiness = server.readiness()
+                    status = HTTPStatus.OK if readiness["status"] == "ready" else HTTPStatus.SERVICE_UNAVAILABLE
+                    self._send_json(status, readiness)
+                elif self.path == "/metrics":
+                    self._send(HTTPStatus.OK, server.metrics().encode("utf-8"), "text/plain; version=0.0.4")
+                else:
+                    self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {self.path}"})
+
+            def do_POST(self):
+                if self.path not in ("/query", "/stream"):
+                    self._send_json(HTTPStatus.NOT_FOUND, {"error": f"Unknown path {self.path}"})
+                    return
+
+                question = self._read_question()
+                if question is None:
+                    return
+
+                try:
+                    if self.path == "/stream":
+                        self._stream(question)
+                        return
+                    started = time.monotonic()
+                    answer = server.answer(question)
+                    self._send_json(HTTPStatus.OK, {"answer": answer, "latency": time.monotonic() - started})
+                except ServiceUnavailable as e:
+                    self._send_json(HTTPStatus.SERVICE_UNAVAILABLE, {"error": str(e)}, {"Retry-After": "1"})
+                except TimeoutError as e:
+                    self._send_json(HTTPStatus.GATEWAY_TIMEOUT, {"error": str(e)})
+                except Exception as e:
+                    server._count("errors")
+                    self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(e).__name__}: {e}"})
+
+            def _read_question(self) -> Optional[str]:
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_BODY_SIZE:
+                    self._send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {"error": "Request body too large"})
+                    return None
+                try:
+                    question = json.loads(self.rfile.read(length) or b"{}").get("question")
+                except (ValueError, AttributeError):
+                    question = None
+                if not isinstance(question, str) or not question.strip():
+                    self._send_json(HTTPStatus.BAD_REQUEST, {"error": 'Expected a JSON body {"question": "..."}'})
+                    return None
+                return question
+
+            def _stream(self, question: str):
+                events = server.stream(question)
+                # Admission errors and timeouts before the first event surface here, before any response is sent
+                first = next(events, None)
+                self.send_response(HTTPStatus.OK)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                try:
+                    if first is not None:
+                        self.wfile.write((json.dumps(first) + "\n").encode("utf-8"))
+                    for event in events:
+                        self.wfile.write((json.dumps(event) + "\n").encode("utf-8"))
+                        self.wfile.flush()
+                except TimeoutError as e:
+                    # Headers are sent already, report the timeout as the last event
+                    self.wfile.write((json.dumps({"type": "error", "error": str(e)}) + "\n").encode("utf-8"))
+                except Exception as e:
+                    server._count("errors")
+                    self.wfile.write((json.dumps({"type": "error", "error": f"{type(e).__name__}: {e}"}) + "\n").encode("utf-8"))
+                finally:
+                    events.close()
+
+            def _send_json(self, status, body, headers=None):
+                self._send(status, json.dumps(body).encode("utf-8"), "application/json", headers)
+
+            def _send(self, status, body: bytes, content_type: str, headers=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Keep probes out of the log
+                if not self.path.startswith(("/healthz", "/readyz", "/metrics")):
+                    super().log_message(format, *args)
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the knowledge base over HTTP.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS, help="Questions answered at the same time.")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="Questions waiting for a worker.")
+    parser.add_argument("--timeout", type=float, default=REQUEST_TIMEOUT, help="Seconds a request waits for its answer.")
+    parser.add_argument("--trace", action="store_true", help="Record spans and expose their metrics on /metrics.")
+    args = parser.parse_args()
+
+    server = KnowledgeBaseServer(
+        host=args.host,
+        port=args.port,
+        workers=args.workers,
+        queue_size=args.queue_size,
+        request_timeout=args.timeout,
+        tracer=Tracer() if args.trace else None,
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,47 @@
+"""Helpers for answering batches of questions concurrently."""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, List, Sequence
+
+
+def batch_query(query: Callable[[str], str], questions: Sequence[str], concurrency: int = 4) -> List[str]:
+    """Answer the questions with a thread pool.
+
+    Identical questions are answered once and the answers are returned in
+    the order of the input questions.
+
+    Args:
+        query: Blocking function answering a single question.
+        questions: Questions to answer.
+        concurrency: Maximum number of questions answered at the same time.
+    """
+    unique = list(dict.fromkeys(questions))
+    if not unique:
+        return []
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(unique)))) as pool:
+        answers = dict(zip(unique, pool.map(query, unique)))
+    return [answers[question] for question in questions]
+
+
+async def abatch_query(aquery: Callable[[str], Awaitable[str]], questions: Sequence[str], concurrency: int = 4) -> List[str]:
+    """Answer the questions concurrently on the running event loop.
+
+    Identical questions are answered once and the answers are returned in
+    the order of the input questions.
+
+    Args:
+        aquery: Coroutine function answering a single question.
+        questions: Questions to answer.
+        concurrency: Maximum number of questions answered at the same time.
+    """
+    unique = list(dict.fromkeys(questions))
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def answer(question: str) -> str:
+        async with semaphore:
+            return await aquery(question)
+
+    answers = dict(zip(unique, await asyncio.gather(*(answer(question) for question in unique))))
+    return [answers[question] for question in questions]
@@ -0,0 +1,356 @@
+"""Code-structure-aware chunking of Java and TypeScript sources for vector indexing."""
+
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Sequence, Tuple
+
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.node_parser import NodeParser
+from llama_index.core.node_parser.node_utils import build_nodes_from_splits
+from llama_index.core.schema import BaseNode
+
+# Bump when chunking changes so persisted indexes are rebuilt
+CHUNKING_VERSION = "code-structure-1"
+
+JAVA_EXTENSIONS = (".java",)
+TYPESCRIPT_EXTENSIONS = (".ts", ".tsx")
+
+JAVA_TYPE_DECLARATION = re.compile(r"\b(class|interface|enum|record)\s+(\w+)")
+JAVA_METHOD_DECLARATION = re.compile(r"(\w+)\s*\([^;]*$|(\w+)\s*\([^;]*\)\s*(throws\s+[\w.,\s]+)?\{")
+TS_DECLARATION = re.compile(
+    r"^(?:export\s+)?(?:default\s+)?(?:declare\s+)?(?:async\s+)?"
+    r"(?:(function)\s*\*?\s*(\w+)|(const|let|var)\s+(\w+)|(interface)\s+(\w+)|(type)\s+(\w+)"
+    r"|(class)\s+(\w+)|(enum)\s+(\w+)|(import)\b)"
+)
+TS_STATEMENT_START = re.compile(r"^(export|const|let|var|function|async|interface|type|class|enum|import|declare)\b")
+LINE_COMMENT = re.compile(r"(^|\s)//")
+JSX_MARKUP = re.compile(r"</\w|/>|React\.FC")
+
+
+def _line_depths(lines: List[str], track_strings: bool) -> List[Tuple[int, int]]:
+    """Return the brace depth at the start and at the end of every line.
+
+    Braces in comments are ignored. Java string and char literals are skipped
+    as well; TypeScript strings are not, since apostrophes in JSX text would
+    otherwise be taken for string delimiters.
+    """
+    depths = []
+    depth = 0
+    in_block_comment = False
+    for line in lines:
+        start = depth
+        i = 0
+        quote = None
+        while i < len(line):
+            char = line[i]
+            if in_block_comment:
+                if line.startswith("*/", i):
+                    in_block_comment = False
+                    i += 1
+            elif quote:
+                if char == "\\":
+                    i += 1
+                elif char == quote:
+                    quote = None
+            elif line.startswith("/*", i):
+                in_block_comment = True
+                i += 1
+            elif line.startswith("//", i) and (i == 0 or line[i - 1].isspace() or track_strings):
+                break
+            elif track_strings and char in "\"'":
+                quote = char
+            elif char == "{":
+                depth += 1
+            elif char == "}":
+                depth = max(depth - 1, 0)
+            i += 1
+        depths.append((start, depth))
+    return depths
+
+
+def _code_end(line: str) -> str:
+    """Return the line without a trailing line comment, stripped."""
+    match = LINE_COMMENT.search(line)
+    return (line[:match.start()] if match else line).strip()
+
+
+def _is_comment_or_annotation(line: str) -> bool:
+    stripped = line.strip()
+    return not stripped or stripped.startswith(("@", "//", "/*", "*"))
+
+
+def _java_member_name(lines: List[str]) -> Tuple[str, str]:
+    """Return (kind, name) of a Java class member given its lines."""
+    for line in lines:
+        if _is_comment_or_annotation(line):
+            continue
+        code = _code_end(line)
+        type_declaration = JAVA_TYPE_DECLARATION.search(code)
+        if type_declaration and "(" not in code.split(type_declaration.group(2))[0]:
+            return "class", type_declaration.group(2)
+        method = JAVA_METHOD_DECLARATION.search(code)
+        if method and "=" not in code.split("(")[0]:
+            return "method", method.group(1) or method.group(2)
+        return "field", ""
+    return "field", ""
+
+
+def split_java(text: str) -> List[Dict[str, Any]]:
+    """Split Java source into a class chunk with its fields and one chunk per method.
+
+    Each chunk is a dict with the chunk text, its kind, class and method name
+    and its 1-based line range. Imports are left out of all chunks.
+    """
+    lines = text.splitlines()
+    depths = _line_depths(lines, track_strings=True)
+    chunks = []
+
+    # Find top-level type declarations and their body ranges
+    i = 0
+    pending_start = None
+    while i < len(lines):
+        start_depth, end_depth = depths[i]
+        stripped = lines[i].strip()
+        if start_depth == 0 and stripped.startswith(("package ", "import ")):
+            pending_start = None
+            i += 1
+            continue
+        if start_depth == 0 and pending_start is None and stripped:
+            pending_start = i
+
+        is_code = start_depth == 0 and not _is_comment_or_annotation(lines[i])
+        declaration = JAVA_TYPE_DECLARATION.search(_code_end(lines[i])) if is_code else None
+        if not declaration:
+            i += 1
+            continue
+
+        class_name = declaration.group(2)
+        header_start = pending_start if pending_start is not None else i
+        # The declaration line may not open the body yet, e.g. with a long implements list
+        body_start = i
+        while body_start < len(lines) and depths[body_start][1] == 0:
+            body_start += 1
+        body_end = body_start
+        while body_end + 1 < len(lines) and depths[body_end + 1][0] > 0:
+            body_end += 1
+        chunks += _split_java_class(lines, depths, class_name, header_start, body_start, body_end)
+        pending_start = None
+        i = body_end + 1
+
+    return chunks
+
+
+def _split_java_class(lines, depths, class_name, header_start, body_start, body_end) -> List[Dict[str, Any]]:
+    """Split the members of a top-level Java type into chunks."""
+    header = lines[header_start:body_start + 1]
+    fields = []
+    methods = []
+
+    member_start = None
+    for i in range(body_start + 1, body_end + 1):
+        start_depth, end_depth = depths[i]
+        if member_start is None:
+            if start_depth != 1 or not lines[i].strip():
+                continue
+            member_start = i
+        code = _code_end(lines[i])
+        if end_depth == 1 and code.endswith((";", "}")):
+            member = lines[member_start:i + 1]
+            kind, name = _java_member_name(member)
+            if kind == "field":
+                fields += member
+            else:
+                methods.append((kind, name, member_start, i))
+            member_start = None
+
+    closing = [lines[body_end]] if depths[body_end][1] == 0 else []
+    chunks = [{
+        "text": "\n".join(header + fields + closing),
+        "kind": "class",
+        "class_name": class_name,
+        "method_name": "",
+        "start_line": header_start + 1,
+        "end_line": body_end + 1,
+    }]
+    for kind, name, start, end in methods:
+        chunks.append({
+            "text": "\n".join(lines[start:end + 1]),
+            "kind": "method" if kind == "method" else "class",
+            "class_name": class_name,
+            "method_name": name if kind == "method" else "",
+            "start_line": start + 1,
+            "end_line": end + 1,
+        })
+    return chunks
+
+
+def _typescript_kind(groups: Tuple, text: str) -> Tuple[str, str]:
+    """Return (kind, name) of a top-level TypeScript declaration."""
+    keyword = next((group for group in groups[0::2] if group), "")
+    name = next((group for group in groups[1::2] if group), "")
+    if keyword == "import" or groups[-1]:
+        return "import", ""
+    if keyword in ("interface", "type", "enum"):
+        return "type", name
+    if name.startswith("use") and name[3:4].isupper():
+        return "hook", name
+    if name[:1].isupper() and keyword in ("function", "const", "let", "var", "class") and JSX_MARKUP.search(text):
+        return "component", name
+    if keyword == "class":
+        return "class", name
+    return "function" if keyword == "function" or "=>" in text else "declaration", name
+
+
+def split_typescript(text: str) -> List[Dict[str, Any]]:
+    """Split TypeScript/TSX source into one chunk per top-level declaration.
+
+    Components, hooks, types and helpers each become a chunk, with leading
+    comments attached and small trailing statements (e.g. `export default X`)
+    merged into the preceding chunk. Imports are left out of all chunks.
+    """
+    lines = text.splitlines()
+    depths = _line_depths(lines, track_strings=False)
+
+    units = []
+    comment_start = None
+    for i, line in enumerate(lines):
+        stripped = line.strip()
+        if depths[i][0] != 0:
+            continue
+        if stripped.startswith(("//", "/*", "*")):
+            comment_start = i if comment_start is None else comment_start
+            continue
+        if TS_STATEMENT_START.match(stripped):
+            declaration = TS_DECLARATION.match(stripped)
+            groups = declaration.groups() if declaration else (None,) * 13
+            start = comment_start if comment_start is not None else i
+            units.append([start, i, groups])
+        elif not stripped:
+            continue
+        comment_start = None
+
+    chunks = []
+    for index, (start, declaration_line, groups) in enumerate(units):
+        end = units[index + 1][0] - 1 if index + 1 < len(units) else len(lines) - 1
+        while end > start and not lines[end].strip():
+            end -= 1
+        unit_text = "\n".join(lines[start:end + 1])
+        kind, name = _typescript_kind(groups, unit_text)
+        if kind == "import":
+            continue
+        chunk = {
+            "text": unit_text,
+            "kind": kind,
+            "symbol": name,
+            "start_line": start + 1,
+            "end_line": end + 1,
+        }
+        # Attach unnamed statements like `export default App;` to the previous chunk
+        if chunks and not name:
+            chunks[-1]["text"] += "\n" + unit_text
+            chunks[-1]["end_line"] = end + 1
+            continue
+        chunks.append(chunk)
+    return chunks
+
+
+def _merge_small(chunks: List[Dict[str, Any]], min_chars: int) -> List[Dict[str, Any]]:
+    """Merge chunks smaller than min_chars into their neighbour, keeping the larger chunk's symbol."""
+    merged = []
+    for chunk in chunks:
+        previous = merged[-1] if merged else None
+        if previous is not None and (len(previous["text"]) < min_chars or len(chunk["text"]) < min_chars):
+            main = previous if len(previous["text"]) >= len(chunk["text"]) else chunk
+            merged[-1] = dict(main,
+                              text=previous["text"] + "\n\n" + chunk["text"],
+                              start_line=previous["start_line"],
+                              end_line=chunk["end_line"])
+        else:
+            merged.append(chunk)
+    return merged
+
+
+def _split_oversized(chunk: Dict[str, Any], max_chars: int) -> List[Dict[str, Any]]:
+    """Split a chunk that exceeds max_chars on line boundaries, keeping its symbol metadata."""
+    if len(chunk["text"]) <= max_chars:
+        return [chunk]
+
+    parts = []
+    lines = chunk["text"].splitlines()
+    current, size, start = [], 0, 0
+    for offset, line in enumerate(lines):
+        if current and size + len(line) + 1 > max_chars:
+            parts.append((start, current))
+            current, size, start = [], 0, offset
+        current.append(line)
+        size += len(line) + 1
+    parts.append((start, current))
+
+    return [
+        dict(chunk,
+             text="\n".join(part),
+             part=number,
+             start_line=chunk["start_line"] + start,
+             end_line=chunk["start_line"] + start + len(part) - 1)
+        for number, (start, part) in enumerate(parts, start=1)
+    ]
+
+
+class CodeStructureNodeParser(NodeParser):
+    """Node parser that chunks Java and TypeScript documents along code structure.
+
+    Java is split by class and method, TypeScript/TSX by component, hook and
+    other top-level declarations. Small files are kept as a single chunk and
+    other file types are passed through unchanged. Every node carries symbol
+    metadata: file, class, method or symbol name, kind and line range.
+    """
+
+    min_split_chars: int = Field(
+        default=1500, description="Files up to this size are kept as a single chunk."
+    )
+    min_chunk_chars: int = Field(
+        default=500, description="Chunks below this size are merged into a neighbouring chunk."
+    )
+    max_chunk_chars: int = Field(
+        default=6000, description="Chunks above this size are split on line boundaries."
+    )
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CodeStructureNodeParser"
+
+    def _parse_nodes(self, nodes: Sequence[BaseNode], show_progress: bool = False, **kwargs: Any) -> List[BaseNode]:
+        all_nodes = []
+        for node in nodes:
+            for chunk in self.split(node.get_content(), node.metadata.get("file_path", "")):
+                text = chunk.pop("text")
+                for split_node in build_nodes_from_splits([text], node, id_func=self.id_func):
+                    split_node.metadata.update(chunk)
+                    all_nodes.append(split_node)
+        return all_nodes
+
+    def split(self, text: str, file_path: str) -> List[Dict[str, Any]]:
+        """Split the source text of the file into chunks with symbol metadata."""
+        suffix = Path(file_path).suffix
+        lines = len(text.splitlines())
+        whole_file = {"text": text, "kind": "file", "start_line": 1, "end_line": lines}
+
+        if suffix in JAVA_EXTENSIONS:
+            chunks = split_java(text)
+            if len(text) <= self.min_split_chars and chunks:
+                whole_file.update(kind="class", class_name=chunks[0]["class_name"], method_name="")
+                chunks = [whole_file]
+        elif suffix in TYPESCRIPT_EXTENSIONS:
+            chunks = split_typescript(text)
+            if len(text) <= self.min_split_chars and chunks:
+                main = next((c for c in chunks if c["kind"] in ("component", "hook")), chunks[0])
+                whole_file.update(kind=main["kind"], symbol=main["symbol"])
+                chunks = [whole_file]
+        else:
+            chunks = []
+
+        if not chunks:
+            chunks = [whole_file]
+
+        chunks = _merge_small(chunks, self.min_chunk_chars)
+        return [part for chunk in chunks for part in _split_oversized(chunk, self.max_chunk_chars)]
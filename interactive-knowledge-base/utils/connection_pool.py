@@ -0,0 +1,246 @@
+"""Bounded, thread-safe database connection pool with health checks and usage stats."""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the pool timeout."""
+
+
+class PooledConnection:
+    """A connection handed out by ConnectionPool.
+
+    Keeps the names of the statements prepared on this connection, so
+    prepared statements can be reused for as long as the connection lives.
+    """
+
+    def __init__(self, connection: Any):
+        self.connection = connection
+        self.prepared_statements: Dict[str, str] = {}
+        self.last_used = time.monotonic()
+
+    @property
+    def closed(self) -> bool:
+        return bool(getattr(self.connection, "closed", False))
+
+
+class ConnectionPool:
+    """Bounded pool of DB-API connections.
+
+    Connections are created by the given factory, so the pool works with
+    psycopg2 as well as with any stand-in object exposing cursor(),
+    rollback(), close() and a closed attribute.
+    """
+
+    def __init__(self,
+                 connect: Callable[[], Any],
+                 min_size: int = 1,
+                 max_size: int = 5,
+                 timeout: float = 30.0,
+                 health_check_interval: float = 30.0):
+        """
+        Args:
+            connect: Factory that opens a new connection
+            min_size: Number of connections opened on first use and kept idle
+            max_size: Maximum number of open connections
+            timeout: Seconds to wait for a free connection before giving up
+            health_check_interval: Idle seconds after which a connection is pinged before reuse
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._condition = threading.Condition()
+        self._idle = deque()
+        self._size = 0
+        self._filled = False
+        self._closed = False
+
+        self._checked_out = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait_time = 0.0
+        self._created = 0
+        self._discarded = 0
+        self._health_check_failures = 0
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        """Check out a connection for the duration of the with block."""
+        pooled = self.getconn()
+        try:
+            yield pooled
+        finally:
+            self.putconn(pooled)
+
+    def getconn(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Check out a healthy connection, waiting while the pool is exhausted."""
+        timeout = self.timeout if timeout is None else timeout
+        self._fill()
+
+        with self._condition:
+            started = None
+            while True:
+                if self._closed:
+                    raise PoolTimeoutError("Connection pool is closed")
+                if self._idle:
+                    pooled = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    # Reserve a slot and open the connection outside the lock
+                    self._size += 1
+                    pooled = None
+                    break
+
+                if started is None:
+                    started = time.monotonic()
+                    self._waits += 1
+                remaining = timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self._record_wait(started)
+                    raise PoolTimeoutError(
+                        f"No database connection available within {timeout} seconds "
+                        f"(max_size={self.max_size})"
+                    )
+                self._condition.wait(remaining)
+
+            if started is not None:
+                self._record_wait(started)
+            self._checked_out += 1
+            self._checkouts += 1
+
+        try:
+            if pooled is None:
+                return self._open()
+            if self._is_healthy(pooled):
+                return pooled
+            self._close(pooled)
+            with self._condition:
+                self._discarded += 1
+                self._health_check_failures += 1
+            return self._open()
+        except BaseException:
+            with self._condition:
+                self._size -= 1
+                self._checked_out -= 1
+                self._condition.notify()
+            raise
+
+    def putconn(self, pooled: PooledConnection, discard: bool = False) -> None:
+        """Return a connection to the pool, closing it if it is broken or discarded."""
+        if not discard and not pooled.closed:
+            discard = not self._reset(pooled)
+
+        with self._condition:
+            self._checked_out -= 1
+            if discard or pooled.closed or self._closed:
+                self._size -= 1
+                self._discarded += 1
+                close = True
+            else:
+                pooled.last_used = time.monotonic()
+                self._idle.append(pooled)
+                close = False
+            self._condition.notify()
+
+        if close:
+            self._close(pooled)
+
+    def closeall(self) -> None:
+        """Close all idle connections and refuse further checkouts."""
+        with self._condition:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            self._close(pooled)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of pool usage counters for sizing the pool."""
+        with self._condition:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "checked_out": self._checked_out,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "wait_time": self._wait_time,
+                "max_wait_time": self._max_wait_time,
+                "created": self._created,
+                "discarded": self._discarded,
+                "health_check_failures": self._health_check_failures,
+            }
+
+    def _fill(self) -> None:
+        """Open min_size connections on first use."""
+        if self._filled:
+            return
+        with self._condition:
+            if self._filled:
+                return
+            self._filled = True
+            missing = max(self.min_size - self._size, 0)
+            self._size += missing
+
+        opened = []
+        try:
+            for _ in range(missing):
+                opened.append(self._open())
+        finally:
+            with self._condition:
+                self._size -= missing - len(opened)
+                self._idle.extend(opened)
+                self._condition.notify_all()
+
+    def _open(self) -> PooledConnection:
+        pooled = PooledConnection(self._connect())
+        with self._condition:
+            self._created += 1
+        return pooled
+
+    def _is_healthy(self, pooled: PooledConnection) -> bool:
+        """Check that the connection is open and, if it idled for long, still responds."""
+        if pooled.closed:
+            return False
+        if time.monotonic() - pooled.last_used < self.health_check_interval:
+            return True
+        try:
+            with pooled.connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            pooled.connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _reset(self, pooled: PooledConnection) -> bool:
+        """End any open transaction so the next user gets a clean session."""
+        try:
+            pooled.connection.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _close(self, pooled: PooledConnection) -> None:
+        try:
+            pooled.connection.close()
+        except Exception:
+            pass
+
+    def _record_wait(self, started: float) -> None:
+        waited = time.monotonic() - started
+        self._wait_time += waited
+        self._max_wait_time = max(self._max_wait_time, waited)
@@ -0,0 +1,250 @@
+"""Packing of retrieved code chunks into a token budget before they are passed to the LLM."""
+
+import hashlib
+import re
+import threading
+from functools import partial
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from llama_index.core import QueryBundle
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.schema import NodeWithScore, TextNode
+
+from utils.scratchpad import approximate_tokens
+
+# Single-line imports and package declarations of Java and TypeScript
+IMPORT_LINE = re.compile(r"^\s*(?:import\s.*;?|package\s+[\w.]+\s*;|export\s+\*\s+from\s.*)\s*$")
+# First line of a TypeScript import spanning several lines, e.g. "import {" ... "} from 'x';"
+MULTILINE_IMPORT_START = re.compile(r"^\s*import\s[^;'\"]*\{[^}]*$")
+MULTILINE_IMPORT_END = re.compile(r"\}\s*from\s+['\"][^'\"]+['\"]\s*;?\s*$")
+BOILERPLATE_LINE = re.compile(r"^\s*(?:['\"]use (?:client|strict)['\"];?|@Override|//\s*eslint-disable.*)\s*$")
+# Generated or vendored files, e.g. the shadcn primitives of the UI, packed after all other chunks
+BOILERPLATE_PATHS = ("components/ui/",)
+# Last line of a node cut to the remaining budget
+TRUNCATION_MARKER = "// ... truncated"
+
+
+def kept_lines(lines: Sequence[str]) -> List[int]:
+    """Return the indices of the lines that are not imports, package declarations, directives or repeated blanks."""
+    kept = []
+    in_import = False
+    for index, line in enumerate(lines):
+        if in_import:
+            in_import = not MULTILINE_IMPORT_END.search(line)
+            continue
+        if MULTILINE_IMPORT_START.match(line):
+            in_import = True
+            continue
+        if IMPORT_LINE.match(line) or BOILERPLATE_LINE.match(line):
+            continue
+        if not line.strip() and (not kept or not lines[kept[-1]].strip()):
+            continue
+        kept.append(index)
+    while kept and not lines[kept[-1]].strip():
+        kept.pop()
+    return kept
+
+
+def strip_boilerplate(text: str) -> str:
+    """Remove imports, package declarations, directives and repeated blank lines from source text."""
+    lines = text.splitlines()
+    return "\n".join(lines[index] for index in kept_lines(lines))
+
+
+class _Span:
+    """Consecutive lines of one file merged from one or more retrieved chunks."""
+
+    def __init__(self, node: NodeWithScore, rank: int):
+        metadata = node.node.metadata
+        self.node = node.node
+        self.rank = rank
+        self.score = node.score or 0.0
+        self.file = metadata.get("file_path", "")
+        self.start = metadata.get("start_line")
+        self.end = metadata.get("end_line")
+        self.lines = node.node.get_content().splitlines()
+        self.symbols = [self._symbol(metadata)]
+
+    @property
+    def addressable(self) -> bool:
+        # Chunks merged by the splitter are joined with blank lines, so only a matching line count maps to line numbers
+        return self.start is not None and self.end is not None and len(self.lines) == self.end - self.start + 1
+
+    def absorb(self, other: "_Span") -> bool:
+        """Merge a chunk of the same file overlapping or directly following this span, return whether it was merged."""
+        if not (self.addressable and other.addressable) or other.start > self.end + 1 or other.end < self.start - 1:
+            return False
+        if other.start < self.start:
+            self.lines = other.lines[:self.start - other.start] + self.lines
+            self.start = other.start
+        if other.end > self.end:
+            self.lines += other.lines[len(other.lines) - (other.end - self.end):]
+            self.end = other.end
+        self.rank = min(self.rank, other.rank)
+        self.score = max(self.score, other.score)
+        self.symbols += [symbol for symbol in other.symbols if symbol not in self.symbols]
+        return True
+
+    @staticmethod
+    def _symbol(metadata: Dict[str, Any]) -> str:
+        if metadata.get("method_name"):
+            return f"{metadata.get('class_name', '')}.{metadata['method_name']}"
+        return metadata.get("symbol") or metadata.get("class_name") or ""
+
+
+class ContextPacker(BaseNodePostprocessor):
+    """Node postprocessor packing retrieved code chunks into a token budget.
+
+    Retrieved chunks often repeat each other's imports, overlap or follow
+    each other in the same file. The packer drops chunks whose content was
+    already seen, merges overlapping and adjacent chunks of a file into a
+    single node, strips imports and other boilerplate lines, and then adds
+    the nodes in relevance order while they fit token_budget. Chunks of
+    BOILERPLATE_PATHS files only fill what is left of the budget.
+    """
+
+    token_budget: int = Field(default=3000, description="Maximum number of tokens of the packed nodes.")
+    min_fragment_tokens: int = Field(
+        default=200, description="A node that doesn't fit is cut to the remaining budget if at least this many tokens remain."
+    )
+    strip: bool = Field(default=True, description="Whether imports and boilerplate lines are removed.")
+    boilerplate_paths: Sequence[str] = Field(default=BOILERPLATE_PATHS,
+                                             description="Path parts of files whose chunks are packed last.")
+    # Held in a partial, which unlike a plain function is never bound to the packer as a method
+    _token_counter: Optional[Callable[[str], int]] = PrivateAttr(default=None)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _totals: Dict[str, int] = PrivateAttr(
+        default_factory=lambda: {"queries": 0, "nodes_in": 0, "nodes_out": 0, "tokens_in": 0, "tokens_out": 0}
+    )
+
+    def __init__(self, count_tokens: Optional[Callable[[str], int]] = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._token_counter = partial(count_tokens or approximate_tokens)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "ContextPacker"
+
+    def _postprocess_nodes(self, nodes: List[NodeWithScore], query_bundle: Optional[QueryBundle] = None) -> List[NodeWithScore]:
+        if not nodes:
+            return nodes
+
+        spans = self._merge(self._deduplicate(nodes))
+        spans.sort(key=lambda span: (self._is_boilerplate(span.file), span.rank))
+
+        packed = []
+        remaining = self.token_budget
+        for span in spans:
+            # Indices of the span's lines passed on, to keep the line range of the node exact
+            kept = kept_lines(span.lines) if self.strip else list(range(len(span.lines)))
+            text = "\n".join(span.lines[index] for index in kept)
+            if not text.strip():
+                continue
+            tokens = self._count_tokens(text)
+            if tokens > remaining:
+                # The most relevant node is always passed, cut to the budget
+                if packed and remaining < self.min_fragment_tokens:
+                    continue
+                text, tokens, kept = self._truncate(span.lines, kept, remaining)
+            packed.append(NodeWithScore(node=self._node(span, text, kept), score=span.score))
+            remaining -= tokens
+            if remaining <= 0:
+                break
+
+        with self._lock:
+            self._totals["queries"] += 1
+            self._totals["nodes_in"] += len(nodes)
+            self._totals["nodes_out"] += len(packed)
+            self._totals["tokens_in"] += sum(self._count_tokens(node.node.get_content()) for node in nodes)
+            self._totals["tokens_out"] += self.token_budget - remaining
+        return packed
+
+    def _count_tokens(self, text: str) -> int:
+        return self._token_counter(text)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of packed queries and the nodes and tokens retrieved and passed on."""
+        with self._lock:
+            return dict(self._totals)
+
+    def _deduplicate(self, nodes: List[NodeWithScore]) -> List[NodeWithScore]:
+        """Drop nodes whose content, ignoring whitespace, equals a more relevant node's."""
+        seen = set()
+        unique = []
+        for node in nodes:
+            normalized = " ".join(node.node.get_content().split())
+            digest = hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+            if digest not in seen:
+                seen.add(digest)
+                unique.append(node)
+        return unique
+
+    def _merge(self, nodes: List[NodeWithScore]) -> List[_Span]:
+        """Merge overlapping and adjacent chunks of the same file, keeping the best rank and score."""
+        by_file: Dict[str, List[_Span]] = {}
+        for rank, node in enumerate(nodes):
+            span = _Span(node, rank)
+            by_file.setdefault(span.file, []).append(span)
+
+        merged = []
+        for spans in by_file.values():
+            spans.sort(key=lambda span: (span.start is None, span.start or 0))
+            file_spans: List[_Span] = []
+            for span in spans:
+                if not file_spans or not span.file or not file_spans[-1].absorb(span):
+                    file_spans.append(span)
+            merged += file_spans
+        return merged
+
+    def _is_boilerplate(self, file_path: str) -> bool:
+        normalized = file_path.replace("\\", "/")
+        return any(part in normalized for part in self.boilerplate_paths)
+
+    def _truncate(self, lines: Sequence[str], kept: List[int], max_tokens: int) -> Tuple[str, int, List[int]]:
+        """
+        Keep the leading kept lines and the truncation marker within max_tokens.
+        Return the text, its tokens and the indices of the lines kept.
+        """
+        # Reserve the marker's tokens, so the truncated text never exceeds max_tokens
+        budget = max_tokens - self._count_tokens(TRUNCATION_MARKER) - 1
+        selected = []
+        size = 0
+        for index in kept:
+            line_size = self._count_tokens(lines[index]) + 1
+            if size + line_size > budget:
+                break
+            selected.append(index)
+            size += line_size
+        # Token counts of single lines may not add up to the count of the joined text
+        while selected:
+            text = "\n".join([lines[index] for index in selected] + [TRUNCATION_MARKER])
+            tokens = self._count_tokens(text)
+            if tokens <= max_tokens:
+                return text, tokens, selected
+            selected.pop()
+
+        # Not even the first line fits with the marker, cut the line itself
+        text = lines[kept[0]][:max_tokens * 4]
+        while text and self._count_tokens(text) > max_tokens:
+            text = text[:len(text) * 9 // 10]
+        return text, self._count_tokens(text), kept[:1]
+
+    @staticmethod
+    def _node(span: _Span, text: str, kept: List[int]) -> TextNode:
+        """Return a node with the packed text and the metadata of the span's first chunk, updated to the span."""
+        metadata = dict(span.node.metadata)
+        if span.addressable:
+            # The last line passed on, earlier than the span's end if trailing lines were stripped or cut
+            metadata.update(start_line=span.start, end_line=span.start + kept[-1])
+        elif span.start is not None and span.end is not None:
+            metadata.update(start_line=span.start, end_line=span.end)
+        if len(span.symbols) > 1:
+            metadata["symbols"] = ", ".join(symbol for symbol in span.symbols if symbol)
+        return TextNode(
+            text=text,
+            metadata=metadata,
+            excluded_embed_metadata_keys=list(span.node.excluded_embed_metadata_keys),
+            excluded_llm_metadata_keys=list(span.node.excluded_llm_metadata_keys),
+            relationships=dict(span.node.relationships),
+        )
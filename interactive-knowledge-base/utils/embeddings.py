@@ -0,0 +1,306 @@
+"""Pluggable embedding models: a local hashing embedder and a content-hash cache shared by the agents."""
+
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from llama_index.core.base.embeddings.base import BaseEmbedding
+from llama_index.core.bridge.pydantic import Field, PrivateAttr
+
+EMBED_BACKEND_ENV = "EMBED_BACKEND"  # "openai" (default) or "local"
+EMBEDDING_CACHE_PATH = Path(__file__).parent.parent / "storage" / "cache" / "embeddings.sqlite"
+# Bump when the features of HashingEmbedding change, so indexes built with older vectors are rebuilt
+HASHING_VERSION = 1
+MAX_EMBED_BATCH_SIZE = 2048  # Largest embed_batch_size LlamaIndex accepts
+
+WORD = re.compile(r"\w+")
+# Parts of camelCase, PascalCase and snake_case identifiers, e.g. "loanAPIClient" -> loan, API, Client
+IDENTIFIER_PART = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def embed_model_id(embed_model: Any) -> str:
+    """Identify the vectors an embedding model produces, e.g. for the config of a persisted index."""
+    if isinstance(embed_model, CachedEmbedding):
+        return embed_model.model_name
+    return f"{embed_model.class_name()}:{getattr(embed_model, 'model_name', '')}"
+
+
+def hashing_features(text: str) -> List[str]:
+    """Return the words, identifier parts and word bigrams of the text hashed by HashingEmbedding."""
+    features = []
+    previous = None
+    for word in WORD.findall(text):
+        lower = word.lower()
+        features.append(lower)
+        parts = IDENTIFIER_PART.findall(word)
+        if len(parts) > 1:
+            features.extend("#" + part.lower() for part in parts)
+        if previous is not None:
+            features.append(previous + " " + lower)
+        previous = lower
+    return features
+
+
+def hashing_embeddings(texts: Sequence[str], dimensions: int) -> List[List[float]]:
+    """Embed the texts by feature hashing, see HashingEmbedding.
+
+    The features of all texts are hashed at once: every distinct feature is
+    hashed a single time and the signed buckets of all texts are counted in
+    one bincount over their flattened (row, bucket) indexes. A module-level
+    function, so chunks of a batch can be embedded in worker processes.
+    """
+    # numpy is imported here to keep it off the startup path when the local backend is unused
+    import numpy as np
+
+    features = [hashing_features(text) for text in texts]
+    matrix = np.zeros(len(texts) * dimensions, dtype=np.float32)
+    flat = [feature for text_features in features for feature in text_features]
+    if flat:
+        # Index of every feature among the distinct features, in order of first occurrence
+        distinct = {feature: index for index, feature in enumerate(dict.fromkeys(flat))}
+        ids = np.fromiter(map(distinct.__getitem__, flat), dtype=np.int64, count=len(flat))
+        digests = np.fromiter((zlib.crc32(feature.encode("utf-8")) for feature in distinct),
+                              dtype=np.int64, count=len(distinct))
+        buckets = digests % dimensions
+        signs = np.where(digests & 0x80000000, 1.0, -1.0)
+        rows = np.repeat(np.arange(len(texts)), [len(text_features) for text_features in features])
+        matrix = np.bincount(rows * dimensions + buckets[ids], weights=signs[ids],
+                             minlength=len(texts) * dimensions).astype(np.float32)
+    matrix = matrix.reshape(len(texts), dimensions)
+    matrix = np.sign(matrix) * np.log1p(np.abs(matrix))
+    matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    return matrix.tolist()
+
+
+class HashingEmbedding(BaseEmbedding):
+    """Local CPU embedding model based on feature hashing.
+
+    Words, the parts of code identifiers and word bigrams are hashed into a
+    fixed number of signed buckets with sublinear term frequency and L2
+    normalization, like a hashed TF vectorizer. It needs no model files or
+    network, and vectors only depend on the text, so they can be cached and
+    compared across processes. Large batches are split into chunks embedded
+    in parallel on a process pool, as feature extraction is pure Python and
+    would hold the GIL in threads; hashing and counting run in NumPy.
+    """
+
+    dimensions: int = Field(default=512, description="Number of hash buckets, i.e. the embedding dimension.")
+    chunk_size: int = Field(default=256, description="Texts embedded per process pool task.")
+    workers: int = Field(default_factory=lambda: os.cpu_count() or 1,
+                         description="Processes embedding chunks of a batch in parallel, 1 to embed in-process.")
+    _pool: Optional[ProcessPoolExecutor] = PrivateAttr(default=None)
+    _pool_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, **kwargs: Any):
+        # Batches are split into chunks here, so let LlamaIndex hand over large batches
+        kwargs.setdefault("embed_batch_size", MAX_EMBED_BATCH_SIZE)
+        dimensions = kwargs.get("dimensions", 512)
+        super().__init__(model_name=f"hashing-{dimensions}-v{HASHING_VERSION}", **kwargs)
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "HashingEmbedding"
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return hashing_embeddings([query], self.dimensions)[0]
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return self._get_query_embedding(query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return hashing_embeddings([text], self.dimensions)[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        chunks = [texts[start:start + self.chunk_size] for start in range(0, len(texts), self.chunk_size)]
+        if len(chunks) <= 1 or self.workers <= 1:
+            return hashing_embeddings(texts, self.dimensions)
+        embed = partial(hashing_embeddings, dimensions=self.dimensions)
+        return [vector for vectors in self._executor().map(embed, chunks) for vector in vectors]
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+
+class EmbeddingCache:
+    """Thread-safe cache of embeddings keyed by model and content hash.
+
+    Vectors are kept in memory and, if a path is given, in a SQLite file, so
+    unchanged chunks and repeated questions are never embedded twice, across
+    agents and across runs.
+    """
+
+    def __init__(self, path: Optional[Path] = None):
+        """
+        Args:
+            path: SQLite file persisting the cache, None to keep it in memory only
+        """
+        self.path = Path(path) if path is not None else None
+        self._lock = threading.Lock()
+        self._vectors: Dict[str, List[float]] = {}
+        self._hits = 0
+        self._misses = 0
+        self._db = None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+
+    @staticmethod
+    def key(model_id: str, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{model_id}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors of the keys that are cached."""
+        with self._lock:
+            found = {key: self._vectors[key] for key in keys if key in self._vectors}
+            missing = [key for key in keys if key not in found]
+            if missing and self._db is not None:
+                # Stay below SQLite's limit on the number of query parameters
+                for start in range(0, len(missing), 500):
+                    batch = missing[start:start + 500]
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({', '.join('?' * len(batch))})", batch
+                    ).fetchall()
+                    for key, blob in rows:
+                        found[key] = self._vectors[key] = array("f", blob).tolist()
+            self._hits += len(found)
+            self._misses += len(set(keys) - set(found))
+            return found
+
+    def put_many(self, vectors: Dict[str, List[float]]) -> None:
+        """Cache the vectors by key."""
+        with self._lock:
+            self._vectors.update(vectors)
+            if self._db is not None:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, array("f", vector).tobytes()) for key, vector in vectors.items()],
+                )
+                self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._vectors), "hits": self._hits, "misses": self._misses}
+
+
+_shared_caches: Dict[Optional[Path], EmbeddingCache] = {}
+_shared_caches_lock = threading.Lock()
+
+
+def shared_embedding_cache(path: Optional[Path] = EMBEDDING_CACHE_PATH) -> EmbeddingCache:
+    """Return the process-wide embedding cache stored at the path."""
+    with _shared_caches_lock:
+        if path not in _shared_caches:
+            _shared_caches[path] = EmbeddingCache(path)
+        return _shared_caches[path]
+
+
+class CachedEmbedding(BaseEmbedding):
+    """Embedding model answering from an EmbeddingCache and embedding only cache misses with the wrapped model.
+
+    Misses are split into batches of the wrapped model's embed_batch_size,
+    which are sent concurrently on a thread pool, so indexing with a remote
+    model like OpenAI is not bound by one round trip after the other. Every
+    batch is cached as soon as it is embedded.
+    """
+
+    workers: int = Field(default=4, description="Batches of cache misses embedded concurrently.")
+    _embed_model: BaseEmbedding = PrivateAttr()
+    _cache: EmbeddingCache = PrivateAttr()
+    _pool: Optional[ThreadPoolExecutor] = PrivateAttr(default=None)
+    _pool_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    def __init__(self, embed_model: BaseEmbedding, cache: EmbeddingCache, **kwargs: Any):
+        # LlamaIndex hands over at most embed_batch_size texts per call, enough for a batch per worker
+        workers = kwargs.get("workers", 4)
+        kwargs.setdefault("embed_batch_size", min(embed_model.embed_batch_size * workers, MAX_EMBED_BATCH_SIZE))
+        super().__init__(model_name=embed_model_id(embed_model), **kwargs)
+        self._embed_model = embed_model
+        self._cache = cache
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "CachedEmbedding"
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        key = self._cache.key(self.model_name, "query", query)
+        cached = self._cache.get_many([key]).get(key)
+        if cached is None:
+            cached = self._embed_model.get_query_embedding(query)
+            self._cache.put_many({key: cached})
+        return cached
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        key = self._cache.key(self.model_name, "query", query)
+        cached = self._cache.get_many([key]).get(key)
+        if cached is None:
+            cached = await self._embed_model.aget_query_embedding(query)
+            self._cache.put_many({key: cached})
+        return cached
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._get_text_embeddings([text])[0]
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._cache.key(self.model_name, "text", text) for text in texts]
+        found = self._cache.get_many(keys)
+        # Embed each distinct missing text once
+        missing = list({key: text for key, text in zip(keys, texts) if key not in found}.items())
+        size = self._embed_model.embed_batch_size
+        batches = [missing[start:start + size] for start in range(0, len(missing), size)]
+        if len(batches) <= 1 or self.workers <= 1:
+            computed = [self._embed_batch(batch) for batch in batches]
+        else:
+            computed = list(self._executor().map(self._embed_batch, batches))
+        for vectors in computed:
+            found.update(vectors)
+        return [found[key] for key in keys]
+
+    def _embed_batch(self, batch: List[Tuple[str, str]]) -> Dict[str, List[float]]:
+        """Embed one batch of (key, text) cache misses and cache the vectors."""
+        vectors = self._embed_model.get_text_embedding_batch([text for _, text in batch])
+        computed = {key: vector for (key, _), vector in zip(batch, vectors)}
+        self._cache.put_many(computed)
+        return computed
+
+    def _executor(self) -> ThreadPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="cached-embedding")
+            return self._pool
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self._cache.stats()
+
+
+def create_embed_model(backend: Optional[str] = None,
+                       cache_path: Optional[Path] = EMBEDDING_CACHE_PATH) -> BaseEmbedding:
+    """Create the embedding model of the agents, cached in the shared embedding cache.
+
+    Args:
+        backend: "openai" or "local", defaults to the EMBED_BACKEND environment variable, then "openai"
+        cache_path: SQLite file of the shared embedding cache, None to disable the cache
+    """
+    backend = backend or os.getenv(EMBED_BACKEND_ENV, "openai")
+    if backend == "local":
+        embed_model = HashingEmbedding()
+    elif backend == "openai":
+        from llama_index.embeddings.openai import OpenAIEmbedding
+        embed_model = OpenAIEmbedding()
+    else:
+        raise ValueError(f"Unknown embedding backend {backend!r}, expected 'openai' or 'local'")
+
+    if cache_path is None:
+        return embed_model
+    return CachedEmbedding(embed_model, shared_embedding_cache(cache_path))
@@ -0,0 +1,343 @@
+"""Static field lineage index from UI form fields through API DTOs and JPA entities to database columns."""
+
+import hashlib
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# Sources, relative to the platform root
+FORM_GLOB = "lovable-ui/src/components/*Form.tsx"
+JAVA_ROOT = "loan-application-service/src/main/java/com/loan/application"
+DTO_GLOB = f"{JAVA_ROOT}/model/*.java"
+ENTITY_GLOB = f"{JAVA_ROOT}/entity/*.java"
+MAPPER_GLOB = f"{JAVA_ROOT}/service/*.java"
+SCHEMA_FILE = "db/schema.sql"
+# Root DTO of the submission payload the UI sends
+ROOT_DTO = "LoanApplicationDTO"
+# Bump when parsing changes, so stored indexes are rebuilt
+LINEAGE_VERSION = 1
+
+FORM_STATE = re.compile(r"const\s*\{\s*(\w+)\s*,\s*set\w+[^}]*\}\s*=\s*useFormContext\(\)")
+FORM_LABEL = re.compile(r"<Label\s+htmlFor=\"([\w-]+)\"\s*>(.*?)</Label>", re.DOTALL)
+FORM_FIELD = re.compile(r"handleInputChange\(\s*\"(\w+)\"")
+JAVA_CLASS = re.compile(r"^\s*(?:public\s+)?(?:(?:final|abstract)\s+)*(?:class|enum)\s+(\w+)", re.MULTILINE)
+JAVA_FIELD = re.compile(r"((?:\s*@\w+(?:\([^)]*\))?[^\n]*\n)*)\s*private\s+([\w<>, ]+?)\s+(\w+)\s*;")
+JAVA_ANNOTATION = re.compile(r"@(\w+)(?:\(([^)]*)\))?")
+JAVA_TABLE = re.compile(r"@Table\(\s*name\s*=\s*\"(\w+)\"")
+JAVA_VARIABLE = re.compile(r"\b([A-Z]\w*)\s+(\w+)\s*(?:=|[,)])")
+JAVA_METHOD = re.compile(r"\b\w+\s+\w+\(([^)]*)\)\s*\{")
+MAPPER_CALL = re.compile(r"(\w+)\.set(\w+)\(\s*(\w+)((?:\.get\w+\(\))+)\s*\)")
+SQL_TABLE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(\w+)\s*\((.*?)\);", re.IGNORECASE | re.DOTALL)
+SQL_COLUMN = re.compile(r"^\s*(\w+)\s+([A-Za-z]+(?:\s*\([\d,\s]+\))?(?:\s+WITH(?:OUT)?\s+TIME\s+ZONE)?)(.*)$",
+                        re.IGNORECASE)
+SQL_KEYWORDS = ("constraint", "primary", "foreign", "unique", "check", "references", "on")
+VALIDATIONS = ("NotNull", "NotBlank", "NotEmpty", "Email", "Size", "Min", "Max", "Positive", "PositiveOrZero",
+               "Pattern", "Valid")
+
+
+def _snake_case(name: str) -> str:
+    """Column name Spring's default naming strategy derives from a field name."""
+    return re.sub(r"(?<=[a-z0-9])([A-Z])", r"_\1", name).lower()
+
+
+def _lower_first(name: str) -> str:
+    return name[:1].lower() + name[1:]
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def parse_form(source: str) -> List[Dict[str, Any]]:
+    """Return the fields of a form component: label, element id, state object and field name."""
+    state = FORM_STATE.search(source)
+    if state is None:
+        return []
+
+    fields = []
+    labels = list(FORM_LABEL.finditer(source))
+    for position, label in enumerate(labels):
+        # The field bound to a label is set in the markup between it and the next label
+        end = labels[position + 1].start() if position + 1 < len(labels) else len(source)
+        field = FORM_FIELD.search(source, label.end(), end)
+        if field is None:
+            continue
+        text = re.sub(r"<[^>]+>[^<]*</[^>]+>|<[^>]+>", "", label.group(2))
+        fields.append({
+            "object": state.group(1),
+            "field": field.group(1),
+            "label": " ".join(text.split()),
+            "element_id": label.group(1),
+            "required": "*" in label.group(2),
+            "line": source.count("\n", 0, label.start()) + 1,
+        })
+    return fields
+
+
+def parse_java_class(source: str) -> Dict[str, Any]:
+    """Return the class name, table and private fields with their annotations of a DTO or entity."""
+    name = JAVA_CLASS.search(source)
+    table = JAVA_TABLE.search(source)
+    fields = []
+    for match in JAVA_FIELD.finditer(source):
+        annotations = {annotation.group(1): annotation.group(2) or "" for annotation in JAVA_ANNOTATION.finditer(match.group(1))}
+        fields.append({"name": match.group(3), "type": match.group(2).strip(), "annotations": annotations})
+    return {"class": name.group(1) if name else None, "table": table.group(1) if table else None, "fields": fields}
+
+
+def parse_mappings(source: str) -> List[Dict[str, Any]]:
+    """Return the DTO to entity assignments like entity.setLoanAmount(dto.getLoanDetails().getAmount())."""
+    types = {variable: type_name for type_name, variable in JAVA_VARIABLE.findall(source)}
+    for parameters in JAVA_METHOD.findall(source):
+        for parameter in parameters.split(","):
+            words = parameter.split()
+            if len(words) >= 2:
+                types[words[-1]] = words[-2]
+
+    mappings = []
+    for target, setter, source_variable, getters in MAPPER_CALL.findall(source):
+        if target not in types or source_variable not in types:
+            continue
+        mappings.append({
+            "entity": types[target],
+            "entity_field": _lower_first(setter),
+            "dto": types[source_variable],
+            "dto_path": [_lower_first(getter) for getter in re.findall(r"\.get(\w+)\(\)", getters)],
+        })
+    return mappings
+
+
+def parse_schema(source: str) -> Dict[str, Dict[str, Dict[str, str]]]:
+    """Return table -> column -> type and constraints of the CREATE TABLE statements."""
+    source = re.sub(r"--[^\n]*", "", source)
+    tables = {}
+    for table, body in SQL_TABLE.findall(source):
+        columns = {}
+        depth = 0
+        current = ""
+        # Split column definitions on top-level commas only, CHECK (...) and NUMERIC(19, 2) contain commas
+        for char in body + ",":
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth -= 1
+            if char == "," and depth == 0:
+                match = SQL_COLUMN.match(" ".join(current.split()))
+                if match and match.group(1).lower() not in SQL_KEYWORDS:
+                    columns[match.group(1).lower()] = {
+                        "type": match.group(2).upper(),
+                        "constraints": match.group(3).strip(),
+                    }
+                current = ""
+            else:
+                current += char
+        tables[table.lower()] = columns
+    return tables
+
+
+class FieldLineageIndex:
+    """Lineage of every field from UI form to database column, built by static analysis.
+
+    Form fields in the *Form.tsx components are linked to the JSON payload,
+    the payload to the DTO fields, DTO fields to JPA entity fields through
+    the mapper assignments (or equal names), and entity fields to the
+    columns of db/schema.sql. The parsed files are stored with their content
+    hashes, so a refresh only re-parses files that changed. Lookups refresh
+    first, so the index never lags behind the sources.
+    """
+
+    def __init__(self, platform_dir: Path, persist_path: Optional[Path] = None):
+        """
+        Args:
+            platform_dir: Root of the quick-loan-platform sources
+            persist_path: JSON file storing the parsed files, None to keep the index in memory only
+        """
+        self.platform_dir = Path(platform_dir)
+        self.persist_path = Path(persist_path) if persist_path is not None else None
+        self._lock = threading.Lock()
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._stats: Dict[str, Tuple[int, int]] = {}
+        self.rows: List[Dict[str, Any]] = []
+        self._load()
+
+    def refresh(self) -> bool:
+        """Re-parse added or changed source files and rebuild the lineage; return whether anything changed."""
+        with self._lock:
+            sources = self._sources()
+            changed = False
+            for relative in list(self._files):
+                if relative not in sources:
+                    del self._files[relative]
+                    self._stats.pop(relative, None)
+                    changed = True
+
+            for relative, (kind, path) in sources.items():
+                stat = path.stat()
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if relative in self._files and self._stats.get(relative) == signature:
+                    continue
+                content = path.read_text(encoding="utf-8")
+                digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+                self._stats[relative] = signature
+                if self._files.get(relative, {}).get("hash") == digest:
+                    continue
+                self._files[relative] = {"kind": kind, "hash": digest, "parsed": self._parse(kind, content)}
+                changed = True
+
+            if changed or not self.rows:
+                self.rows = self._link()
+            if changed:
+                self._save()
+            return changed
+
+    def lookup(self, query: str = "") -> str:
+        """Return the lineage rows matching all words of the query, e.g. "phone" or "business zip code".
+
+        Words match form labels, field names, JSON paths, DTO and entity fields, tables and columns;
+        an empty query or "all" returns every row.
+        """
+        self.refresh()
+        words = [_normalize(word) for word in re.split(r"[\s,]+", query) if _normalize(word)]
+        if words == ["all"]:
+            words = []
+        # Words matching nothing, like "which" or "column" in a question, don't filter
+        words = [word for word in words if len(word) > 1 and any(word in key for row in self.rows for key in row["keys"])]
+        rows = [row for row in self.rows if all(any(word in key for key in row["keys"]) for word in words)]
+        if not rows or not words and query.strip().lower() not in ("", "all"):
+            return f"No field lineage found for {query!r}."
+        return "\n".join(self._format(row) for row in rows)
+
+    def _sources(self) -> Dict[str, Tuple[str, Path]]:
+        sources = {}
+        for kind, pattern in (("form", FORM_GLOB), ("dto", DTO_GLOB), ("entity", ENTITY_GLOB), ("mapper", MAPPER_GLOB)):
+            for path in sorted(self.platform_dir.glob(pattern)):
+                sources[path.relative_to(self.platform_dir).as_posix()] = (kind, path)
+        schema = self.platform_dir / SCHEMA_FILE
+        if schema.exists():
+            sources[SCHEMA_FILE] = ("schema", schema)
+        return sources
+
+    def _parse(self, kind: str, content: str) -> Any:
+        if kind == "form":
+            return parse_form(content)
+        if kind in ("dto", "entity"):
+            return parse_java_class(content)
+        if kind == "mapper":
+            return parse_mappings(content)
+        return parse_schema(content)
+
+    def _link(self) -> List[Dict[str, Any]]:
+        """Join the parsed files into one row per DTO field of the payload, with the UI and DB side if known."""
+        parsed = {kind: [] for kind in ("form", "dto", "entity", "mapper", "schema")}
+        for relative, entry in sorted(self._files.items()):
+            parsed[entry["kind"]].append((relative, entry["parsed"]))
+
+        dtos = {item["class"]: item for _, item in parsed["dto"] if item["class"]}
+        entities = {item["class"]: item for _, item in parsed["entity"] if item["class"]}
+        schema = {}
+        for _, tables in parsed["schema"]:
+            schema.update(tables)
+        mappings = [mapping for _, items in parsed["mapper"] for mapping in items]
+        form_fields = {
+            f"{field['object']}.{field['field']}": {**field, "form": Path(relative).name}
+            for relative, fields in parsed["form"] for field in fields
+        }
+
+        rows = []
+        for path, dto, field in self._payload_fields(dtos, ROOT_DTO):
+            entity, entity_field = self._entity_field(path, dto, field, entities, mappings)
+            table = entities[entity]["table"] if entity else None
+            column = None
+            if entity_field is not None:
+                annotations = entity_field["annotations"]
+                named = re.search(r"name\s*=\s*\"(\w+)\"", annotations.get("Column") or annotations.get("JoinColumn") or "")
+                column = named.group(1) if named else _snake_case(entity_field["name"])
+            db = schema.get(table, {}).get(column) if table else None
+            ui = form_fields.get(path)
+            row = {
+                "ui": ui,
+                "json_path": path,
+                "dto": {"class": dto, "field": field["name"], "type": field["type"],
+                        "validations": [name for name in field["annotations"] if name in VALIDATIONS]},
+                "entity": {"class": entity, "field": entity_field["name"], "type": entity_field["type"]} if entity_field else None,
+                "db": {"table": table, "column": column, **db} if db else None,
+            }
+            row["keys"] = [_normalize(key) for key in (
+                path, dto, field["name"],
+                ui and ui["label"], ui and ui["element_id"], ui and ui["form"],
+                entity, entity_field and entity_field["name"], table, column,
+            ) if key]
+            rows.append(row)
+        return rows
+
+    def _payload_fields(self, dtos: Dict[str, Any], dto: str, prefix: str = "", seen: Tuple[str, ...] = ()):
+        """Yield (json path, DTO class, field) for the leaf fields of the payload, following nested DTOs."""
+        if dto not in dtos or dto in seen:
+            return
+        for field in dtos[dto]["fields"]:
+            path = f"{prefix}{field['name']}"
+            if field["type"] in dtos:
+                yield from self._payload_fields(dtos, field["type"], path + ".", seen + (dto,))
+            else:
+                yield path, dto, field
+
+    def _entity_field(self, path: str, dto: str, field: Dict[str, Any], entities: Dict[str, Any],
+                      mappings: List[Dict[str, Any]]) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Find the entity field a DTO field is stored in, from the mapper assignments or by equal names."""
+        segments = path.split(".")
+        for mapping in mappings:
+            # The getter chain ends at this field, from the root DTO or from the field's own DTO
+            if mapping["dto_path"] == segments and mapping["dto"] == ROOT_DTO or \
+                    mapping["dto_path"] == [field["name"]] and mapping["dto"] == dto:
+                entity = entities.get(mapping["entity"])
+                if entity is not None:
+                    for entity_field in entity["fields"]:
+                        if entity_field["name"] == mapping["entity_field"]:
+                            return mapping["entity"], entity_field
+
+        # ApplicantDTO.email -> Applicant.email, LoanApplicationDTO.status -> LoanApplication.status
+        entity = dto[:-len("DTO")] if dto.endswith("DTO") else dto
+        for entity_field in entities.get(entity, {}).get("fields", []):
+            if entity_field["name"] == field["name"]:
+                return entity, entity_field
+        return None, None
+
+    def _format(self, row: Dict[str, Any]) -> str:
+        ui = row["ui"]
+        parts = [f"UI {ui['form']} \"{ui['label']}\" (#{ui['element_id']}{', required' if ui['required'] else ''})"
+                 if ui else "UI -"]
+        dto = row["dto"]
+        validations = f" [{', '.join('@' + name for name in dto['validations'])}]" if dto["validations"] else ""
+        parts.append(f"API {row['json_path']} -> {dto['class']}.{dto['field']}: {dto['type']}{validations}")
+        entity = row["entity"]
+        parts.append(f"Entity {entity['class']}.{entity['field']}: {entity['type']}" if entity else "Entity -")
+        db = row["db"]
+        parts.append(f"DB {db['table']}.{db['column']} {db['type']} {db['constraints']}".rstrip() if db else "DB -")
+        return " => ".join(parts)
+
+    def _load(self) -> None:
+        if self.persist_path is None or not self.persist_path.exists():
+            return
+        try:
+            with open(self.persist_path, "r") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        if stored.get("version") == LINEAGE_VERSION:
+            self._files = stored.get("files", {})
+
+    def _save(self) -> None:
+        if self.persist_path is None:
+            return
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.persist_path, "w") as f:
+            json.dump({"version": LINEAGE_VERSION, "files": self._files}, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    import sys
+
+    platform = Path(__file__).parent.parent.parent / "quick-loan-platform"
+    print(FieldLineageIndex(platform).lookup(" ".join(sys.argv[1:])))
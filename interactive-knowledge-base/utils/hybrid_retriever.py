@@ -0,0 +1,178 @@
+"""Hybrid lexical (BM25) + vector retrieval with reciprocal-rank fusion and local reranking."""
+
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+from llama_index.core import QueryBundle, VectorStoreIndex
+from llama_index.core.bridge.pydantic import Field
+from llama_index.core.callbacks import CallbackManager
+from llama_index.core.postprocessor.types import BaseNodePostprocessor
+from llama_index.core.retrievers import BaseRetriever
+from llama_index.core.schema import BaseNode, NodeWithScore
+
+IDENTIFIER = re.compile(r"[A-Za-z_$][A-Za-z0-9_$]*(?:\.[A-Za-z_$][A-Za-z0-9_$]*)*")
+CAMEL_CASE_PART = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+")
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "do", "does", "for", "from", "have", "how", "if",
+    "in", "is", "it", "of", "on", "or", "the", "this", "to", "we", "what", "when", "where", "which",
+    "with", "you", "import", "return", "const", "new", "private", "public", "class",
+}
+
+
+def _stem(token: str) -> str:
+    """Strip one common English suffix so that `decline`, `declined` and `declines` match."""
+    for suffix in ("ing", "ed", "es", "s", "e"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 4:
+            return token[:-len(suffix)]
+    return token
+
+
+def code_tokenize(text: str) -> List[str]:
+    """Tokenize text for lexical search over code.
+
+    Identifiers are kept whole and also split into their camelCase, snake_case
+    and dotted parts, so `LoanStatus.DECLINED` matches `loanstatus`, `loan`,
+    `status` and `declined`.
+    """
+    tokens = []
+    for identifier in IDENTIFIER.findall(text):
+        parts = []
+        for piece in re.split(r"[._$]+", identifier):
+            parts += CAMEL_CASE_PART.findall(piece)
+        candidates = {identifier.lower(), *(piece.lower() for piece in identifier.split(".")), *(part.lower() for part in parts)}
+        tokens += [_stem(token) for token in candidates if len(token) > 1 and token not in STOP_WORDS]
+    return tokens
+
+
+def exact_identifiers(text: str) -> Set[str]:
+    """Identifiers in a question that look like code: camelCase, dotted, CONSTANT or quoted."""
+    identifiers = set()
+    for identifier in IDENTIFIER.findall(text):
+        if "." in identifier or "_" in identifier or re.search(r"[a-z][A-Z]", identifier) or (identifier.isupper() and len(identifier) > 2):
+            identifiers.add(identifier)
+    identifiers.update(re.findall(r"[`'\"]([\w.]+)[`'\"]", text))
+    return identifiers
+
+
+class BM25Index:
+    """In-process BM25 inverted index over the text of index nodes."""
+
+    def __init__(self, nodes: Sequence[BaseNode], k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.nodes: Dict[str, BaseNode] = {}
+        self._postings: Dict[str, List[Tuple[str, int]]] = defaultdict(list)
+        self._lengths: Dict[str, int] = {}
+
+        for node in nodes:
+            tokens = code_tokenize(node.get_content())
+            self.nodes[node.node_id] = node
+            self._lengths[node.node_id] = len(tokens)
+            for token, count in Counter(tokens).items():
+                self._postings[token].append((node.node_id, count))
+
+        self._average_length = sum(self._lengths.values()) / len(self._lengths) if self._lengths else 0.0
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """Return (node_id, score) pairs of the best matching nodes."""
+        scores: Dict[str, float] = defaultdict(float)
+        total = len(self.nodes)
+        for token in set(code_tokenize(query)):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for node_id, count in postings:
+                length_norm = 1 - self.b + self.b * self._lengths[node_id] / (self._average_length or 1)
+                scores[node_id] += idf * count * (self.k1 + 1) / (count + self.k1 * length_norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+
+class HybridRetriever(BaseRetriever):
+    """Retriever fusing vector similarity and BM25 results with reciprocal-rank fusion.
+
+    The BM25 index is built from the nodes in the vector index's docstore, so
+    it always covers the same chunks as the vector index.
+    """
+
+    def __init__(self,
+                 index: VectorStoreIndex,
+                 vector_top_k: int = 10,
+                 lexical_top_k: int = 10,
+                 rrf_k: int = 60,
+                 callback_manager: Optional[CallbackManager] = None):
+        """
+        Args:
+            index: Vector index to retrieve from.
+            vector_top_k: Number of candidates taken from vector search.
+            lexical_top_k: Number of candidates taken from BM25 search.
+            rrf_k: Rank offset of reciprocal-rank fusion; higher values flatten rank differences.
+            callback_manager: Optional callback manager receiving retrieval events.
+        """
+        super().__init__(callback_manager=callback_manager)
+        self.vector_retriever = index.as_retriever(similarity_top_k=vector_top_k)
+        self.bm25 = BM25Index(list(index.docstore.docs.values()))
+        self.lexical_top_k = lexical_top_k
+        self.rrf_k = rrf_k
+
+    def _retrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        vector_results = self.vector_retriever.retrieve(query_bundle)
+        lexical_results = self.bm25.search(query_bundle.query_str, self.lexical_top_k)
+        return self._fuse(vector_results, lexical_results)
+
+    async def _aretrieve(self, query_bundle: QueryBundle) -> List[NodeWithScore]:
+        vector_results = await self.vector_retriever.aretrieve(query_bundle)
+        lexical_results = self.bm25.search(query_bundle.query_str, self.lexical_top_k)
+        return self._fuse(vector_results, lexical_results)
+
+    def _fuse(self, vector_results: List[NodeWithScore], lexical_results: List[Tuple[str, float]]) -> List[NodeWithScore]:
+        scores: Dict[str, float] = defaultdict(float)
+        nodes: Dict[str, BaseNode] = {}
+        for rank, result in enumerate(vector_results, start=1):
+            scores[result.node.node_id] += 1 / (self.rrf_k + rank)
+            nodes[result.node.node_id] = result.node
+        for rank, (node_id, _) in enumerate(lexical_results, start=1):
+            scores[node_id] += 1 / (self.rrf_k + rank)
+            nodes.setdefault(node_id, self.bm25.nodes[node_id])
+
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        return [NodeWithScore(node=nodes[node_id], score=scores[node_id]) for node_id in ranked]
+
+
+class IdentifierReranker(BaseNodePostprocessor):
+    """Local reranker that boosts nodes containing the question's terms and exact identifiers.
+
+    Runs without any model: the fused retrieval score is blended with the
+    share of question tokens found in the node and a bonus for code-like
+    identifiers (e.g. `LoanStatus.DECLINED`) that appear verbatim.
+    """
+
+    top_n: int = Field(default=4, description="Number of nodes kept after reranking.")
+    weight: float = Field(default=0.5, description="Weight of the lexical overlap in the final score.")
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "IdentifierReranker"
+
+    def _postprocess_nodes(self, nodes: List[NodeWithScore], query_bundle: Optional[QueryBundle] = None) -> List[NodeWithScore]:
+        if query_bundle is None or not nodes:
+            return nodes[:self.top_n]
+
+        query_tokens = set(code_tokenize(query_bundle.query_str))
+        identifiers = exact_identifiers(query_bundle.query_str)
+        max_score = max(node.score or 0.0 for node in nodes) or 1.0
+
+        reranked = []
+        for node in nodes:
+            content = node.node.get_content()
+            overlap = len(query_tokens & set(code_tokenize(content))) / len(query_tokens) if query_tokens else 0.0
+            if identifiers:
+                overlap += sum(identifier in content for identifier in identifiers) / len(identifiers)
+                overlap /= 2
+            score = (1 - self.weight) * (node.score or 0.0) / max_score + self.weight * overlap
+            reranked.append(NodeWithScore(node=node.node, score=score))
+
+        reranked.sort(key=lambda node: node.score, reverse=True)
+        return reranked[:self.top_n]
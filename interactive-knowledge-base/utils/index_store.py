@@ -0,0 +1,144 @@
+"""Persistent, incremental vector index store keyed by per-file content hashes."""
+
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from llama_index.core import (
+    Settings,
+    SimpleDirectoryReader,
+    StorageContext,
+    VectorStoreIndex,
+    load_index_from_storage,
+)
+from llama_index.core.ingestion import run_transformations
+
+MANIFEST_FILE = "manifest.json"
+
+
+class PersistentIndexStore:
+    """Vector index persisted on disk and refreshed incrementally on load.
+
+    The store keeps a manifest next to the persisted index that maps every
+    indexed file to its content hash and to the ids of the documents created
+    from it. On load only files that were added or changed are read and
+    embedded again, and documents of deleted files are dropped from the index.
+    If the ingestion config changes, the index is rebuilt from scratch.
+    """
+
+    def __init__(self,
+                 source_dir: Path,
+                 required_exts: Sequence[str],
+                 persist_dir: Path,
+                 transformations: Optional[List[Any]] = None,
+                 embed_model: Optional[Any] = None,
+                 config: str = ""):
+        """
+        Args:
+            source_dir: Directory with the files to index.
+            required_exts: File extensions to index, e.g. [".java"].
+            persist_dir: Directory where the index and its manifest are stored.
+            transformations: Optional ingestion transformations, e.g. a node parser.
+            embed_model: Embedding model of the index, defaults to the global Settings.embed_model.
+            config: Identifies how documents are turned into vectors; a stored index
+                built with a different config is discarded.
+        """
+        self.source_dir = Path(source_dir)
+        self.required_exts = tuple(required_exts)
+        self.persist_dir = Path(persist_dir)
+        self.manifest_path = self.persist_dir / MANIFEST_FILE
+        self.transformations = transformations
+        self.embed_model = embed_model
+        self.config = config
+
+    def load(self) -> VectorStoreIndex:
+        """Load the stored index and bring it in sync with the source directory."""
+        current = self._hash_files()
+        manifest = self._load_manifest()
+
+        if manifest is None:
+            index = VectorStoreIndex(nodes=[], transformations=self.transformations, embed_model=self.embed_model)
+            manifest = {}
+        else:
+            storage_context = StorageContext.from_defaults(persist_dir=str(self.persist_dir))
+            index = load_index_from_storage(storage_context, transformations=self.transformations,
+                                            embed_model=self.embed_model)
+
+        deleted = [path for path in manifest if path not in current]
+        changed = [
+            path for path, digest in current.items()
+            if path not in manifest or manifest[path]["hash"] != digest
+        ]
+
+        # Drop documents of deleted and changed files before re-inserting changed ones
+        for path in deleted + [path for path in changed if path in manifest]:
+            for doc_id in manifest.pop(path)["doc_ids"]:
+                index.delete_ref_doc(doc_id, delete_from_docstore=True)
+
+        grouped = self._load_documents(changed)
+        self._insert_documents(index, [document for documents in grouped.values() for document in documents])
+        for path, documents in grouped.items():
+            manifest[path] = {
+                "hash": current[path],
+                "doc_ids": [document.doc_id for document in documents],
+            }
+
+        if deleted or changed or not self.manifest_path.exists():
+            self._persist(index, manifest)
+
+        return index
+
+    def _insert_documents(self, index: VectorStoreIndex, documents: List[Any]) -> None:
+        """Insert the documents like index.insert, but embed the chunks of all of them in one batch."""
+        if not documents:
+            return
+        nodes = run_transformations(documents, self.transformations or Settings.transformations)
+        index.insert_nodes(nodes)
+        for document in documents:
+            index.docstore.set_document_hash(document.get_doc_id(), document.hash)
+
+    def _hash_files(self) -> Dict[str, str]:
+        """Return a mapping of relative file path to SHA-256 of its content."""
+        hashes = {}
+        for path in sorted(self.source_dir.rglob("*")):
+            relative = path.relative_to(self.source_dir)
+            if not path.is_file() or path.suffix not in self.required_exts:
+                continue
+            # Skip hidden files and directories like SimpleDirectoryReader does
+            if any(part.startswith(".") for part in relative.parts):
+                continue
+            hashes[relative.as_posix()] = hashlib.sha256(path.read_bytes()).hexdigest()
+        return hashes
+
+    def _load_documents(self, paths: List[str]) -> Dict[str, list]:
+        """Read the given files and group the resulting documents by file."""
+        if not paths:
+            return {}
+
+        documents = SimpleDirectoryReader(
+            input_files=[str(self.source_dir / path) for path in paths],
+            filename_as_id=True,
+        ).load_data()
+
+        grouped = {path: [] for path in paths}
+        for document in documents:
+            relative = Path(document.metadata["file_path"]).resolve().relative_to(self.source_dir.resolve())
+            grouped[relative.as_posix()].append(document)
+        return grouped
+
+    def _load_manifest(self) -> Optional[Dict[str, dict]]:
+        # A manifest without the persisted index behind it is treated as missing
+        if not self.manifest_path.exists() or not (self.persist_dir / "docstore.json").exists():
+            return None
+        with open(self.manifest_path, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("config") != self.config:
+            return None
+        return manifest["files"]
+
+    def _persist(self, index: VectorStoreIndex, manifest: Dict[str, dict]) -> None:
+        self.persist_dir.mkdir(parents=True, exist_ok=True)
+        index.storage_context.persist(persist_dir=str(self.persist_dir))
+        with open(self.manifest_path, "w") as f:
+            json.dump({"config": self.config, "files": manifest}, f, indent=2, sort_keys=True)
@@ -0,0 +1,67 @@
+"""LlamaIndex callback handler that records query engine events as spans of a Tracer."""
+
+import threading
+from typing import Any, Dict, List, Optional
+
+from llama_index.core.callbacks.base_handler import BaseCallbackHandler
+from llama_index.core.callbacks.schema import CBEventType, EventPayload
+
+from utils.tracing import Span, Tracer, current_span, openai_token_usage
+
+
+class LlamaIndexTracingHandler(BaseCallbackHandler):
+    """LlamaIndex callback handler that records queries, retrievals, LLM and embedding calls as spans.
+
+    All spans are named after the component they were recorded for, e.g. the
+    agent name, so metrics can be told apart per agent.
+    """
+
+    EVENT_KINDS = {
+        CBEventType.QUERY: "query",
+        CBEventType.RETRIEVE: "retrieval",
+        CBEventType.SYNTHESIZE: "synthesis",
+        CBEventType.LLM: "llm",
+        CBEventType.EMBEDDING: "embedding",
+        CBEventType.RERANKING: "rerank",
+    }
+
+    def __init__(self, tracer: Tracer, name: str):
+        super().__init__(event_starts_to_ignore=[], event_ends_to_ignore=[])
+        self.tracer = tracer
+        self.name = name
+        self._lock = threading.Lock()
+        self._spans: Dict[str, Span] = {}
+
+    def on_event_start(self, event_type: CBEventType, payload: Optional[Dict[str, Any]] = None,
+                       event_id: str = "", parent_id: str = "", **kwargs: Any) -> str:
+        kind = self.EVENT_KINDS.get(event_type)
+        if kind is not None:
+            with self._lock:
+                parent = self._spans.get(parent_id) or current_span()
+                self._spans[event_id] = self.tracer.start_span(kind, self.name, parent=parent)
+        return event_id
+
+    def on_event_end(self, event_type: CBEventType, payload: Optional[Dict[str, Any]] = None,
+                     event_id: str = "", **kwargs: Any) -> None:
+        # Failures are reported as an EXCEPTION event ending the failed event's id
+        with self._lock:
+            span = self._spans.pop(event_id, None)
+        if span is None:
+            return
+
+        payload = payload or {}
+        error = payload.get(EventPayload.EXCEPTION)
+        if EventPayload.NODES in payload:
+            span.attributes["nodes"] = len(payload[EventPayload.NODES] or [])
+        if EventPayload.CHUNKS in payload:
+            span.attributes["chunks"] = len(payload[EventPayload.CHUNKS] or [])
+        response = payload.get(EventPayload.RESPONSE) or payload.get(EventPayload.COMPLETION)
+        if span.kind == "llm" and response is not None:
+            span.attributes.update(openai_token_usage(getattr(response, "raw", None)))
+        self.tracer.finish(span, error)
+
+    def start_trace(self, trace_id: Optional[str] = None) -> None:
+        pass
+
+    def end_trace(self, trace_id: Optional[str] = None, trace_map: Optional[Dict[str, List[str]]] = None) -> None:
+        pass
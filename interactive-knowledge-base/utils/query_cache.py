@@ -0,0 +1,202 @@
+"""Result cache for SQL queries keyed by normalized SQL, invalidated by writes to the tables a query reads."""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+# String literals, quoted identifiers, comments and whitespace, in that order of precedence
+SQL_TOKEN = re.compile(
+    r"(?P<string>'(?:[^']|'')*')"
+    r"|(?P<identifier>\"(?:[^\"]|\"\")*\")"
+    r"|(?P<comment>--[^\n]*|/\*.*?\*/)"
+    r"|(?P<space>\s+)",
+    re.DOTALL,
+)
+READ_STATEMENTS = ("select", "with", "values", "table")
+# Statements that change the schema; the tables they affect are not tracked, so they clear the cache
+SCHEMA_STATEMENTS = ("alter", "drop", "create", "comment", "grant", "revoke", "reindex", "vacuum", "analyze")
+WRITE_TARGET = re.compile(
+    r"\b(?:insert into|(?<!for )update|delete from|truncate(?: table)?|merge into|copy)\s+(?:only\s+)?([\w.\"]+)"
+)
+READ_SOURCE = re.compile(
+    r"\b(?:from|join)\s+(?!\()((?:only\s+)?[\w.\"]+(?:\s+(?:as\s+)?\w+)?(?:\s*,\s*[\w.\"]+(?:\s+(?:as\s+)?\w+)?)*)"
+)
+# Results of these expressions change between runs of the same query
+VOLATILE = re.compile(
+    r"\b(?:now|random|nextval|currval|setval|clock_timestamp|statement_timestamp|timeofday|txid_current|"
+    r"pg_sleep|gen_random_uuid)\s*\(|\bcurrent_(?:date|time|timestamp)\b|\blocaltime(?:stamp)?\b|"
+    r"\bfor (?:update|share|no key update|key share)\b"
+)
+
+
+def normalize_sql(query: str) -> str:
+    """Normalize a query for use as cache key.
+
+    Comments are dropped, whitespace is collapsed and everything outside
+    string literals and quoted identifiers is lowercased, so queries that
+    differ only in formatting share a key.
+    """
+    parts = []
+    position = 0
+    for match in SQL_TOKEN.finditer(query):
+        parts.append(query[position:match.start()].lower())
+        if match.lastgroup in ("string", "identifier"):
+            parts.append(match.group())
+        else:
+            parts.append(" ")
+        position = match.end()
+    parts.append(query[position:].lower())
+    return re.sub(r"\s+", " ", "".join(parts)).strip().rstrip(";").strip()
+
+
+def _without_literals(normalized: str) -> str:
+    return re.sub(r"'(?:[^']|'')*'", "''", normalized)
+
+
+def _table(name: str) -> str:
+    return name.split(".")[-1].strip('"').lower()
+
+
+def written_tables(query: str) -> Optional[Set[str]]:
+    """Return the tables a statement writes to, an empty set for reads, or None if it may change any table."""
+    statement = _without_literals(normalize_sql(query))
+    keyword = statement.split(" ", 1)[0] if statement else ""
+    if keyword in SCHEMA_STATEMENTS:
+        return None
+
+    tables = {_table(name) for name in WRITE_TARGET.findall(statement)}
+    if keyword not in READ_STATEMENTS and not tables:
+        # A write whose target we can't tell, e.g. a function call in DO or CALL
+        return None
+    return tables
+
+
+def read_tables(query: str) -> Set[str]:
+    """Return the tables a query reads from its FROM and JOIN clauses."""
+    statement = _without_literals(normalize_sql(query))
+    tables = set()
+    for match in READ_SOURCE.findall(statement):
+        for item in match.split(","):
+            words = item.split()
+            if words and words[0] == "only":
+                words = words[1:]
+            if words:
+                tables.add(_table(words[0]))
+    return tables
+
+
+def is_cacheable(query: str) -> bool:
+    """Check whether the query is a read whose result only depends on the tables it reads."""
+    statement = _without_literals(normalize_sql(query))
+    keyword = statement.split(" ", 1)[0] if statement else ""
+    return keyword in READ_STATEMENTS and written_tables(query) == set() and not VOLATILE.search(statement)
+
+
+class QueryResultCache:
+    """Thread-safe LRU/TTL cache of query results.
+
+    Every entry remembers the tables its query reads. A write to a table
+    through the executor drops all entries that read that table, and a
+    statement whose targets can't be determined (e.g. DDL) drops all entries.
+    Writes by other clients are only picked up once entries expire.
+
+    A read running concurrently with a write may return the data from before
+    the write after the write invalidated the cache. To keep such results out,
+    take a version() before running the query and pass it to put(), which
+    skips the result if a table the query reads was invalidated since.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = 60.0):
+        """
+        Args:
+            max_entries: Maximum number of cached results, least recently used are evicted first
+            ttl: Seconds a result stays valid, None to keep results until evicted or invalidated
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._evictions = 0
+        # Incremented by every invalidation; the version each table, or all of them, was last invalidated at
+        self._version = 0
+        self._table_versions: Dict[str, int] = {}
+        self._cleared_version = 0
+
+    @staticmethod
+    def key(query: str, params: Any = None) -> Tuple[str, str]:
+        if isinstance(params, dict):
+            params = sorted(params.items())
+        return normalize_sql(query), repr(params)
+
+    def get(self, query: str, params: Any = None) -> Optional[Any]:
+        """Return the cached result of the query, or None."""
+        key = self.key(query, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry["created_at"] > self.ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry["result"]
+
+    def version(self) -> int:
+        """Return the current invalidation version, to be passed to put() for a query about to run."""
+        with self._lock:
+            return self._version
+
+    def put(self, query: str, params: Any, result: Any, version: Optional[int] = None) -> None:
+        """Cache the result of the query, unless a table it reads was invalidated after the given version."""
+        key = self.key(query, params)
+        tables = read_tables(query)
+        with self._lock:
+            if version is not None and (
+                self._cleared_version > version
+                or any(self._table_versions.get(table, 0) > version for table in tables)
+            ):
+                return
+            self._entries[key] = {"result": result, "tables": tables, "created_at": time.monotonic()}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def invalidate(self, tables: Optional[Set[str]]) -> int:
+        """Drop the entries reading any of the tables, or all entries if tables is None; return how many."""
+        with self._lock:
+            if tables is None or tables:
+                self._version += 1
+            if tables is None:
+                self._cleared_version = self._version
+                dropped = list(self._entries)
+            else:
+                for table in tables:
+                    self._table_versions[table] = self._version
+                dropped = [key for key, entry in self._entries.items() if entry["tables"] & tables]
+            for key in dropped:
+                del self._entries[key]
+            if dropped:
+                self._invalidations += 1
+            return len(dropped)
+
+    def clear(self) -> None:
+        self.invalidate(None)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss, invalidation and eviction counters and the current number of entries."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+                "evictions": self._evictions,
+            }
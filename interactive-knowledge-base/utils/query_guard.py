@@ -0,0 +1,122 @@
+"""Cost guard that checks the EXPLAIN plan of a query before it runs."""
+
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.query_cache import SQL_TOKEN
+
+READ_STATEMENTS = ("select", "with", "values", "table", "show", "explain")
+EXPLAINABLE_STATEMENTS = ("select", "with", "values", "table", "insert", "update", "delete", "merge")
+LIMITABLE_STATEMENTS = ("select", "with", "values", "table")
+TRAILING_LIMIT = re.compile(r"\blimit\s+(?:\d+|all)(?:\s+offset\s+\d+)?\s*$|\bfetch\s+(?:first|next)\b[^;]*$", re.IGNORECASE)
+SCAN_NODES = ("Seq Scan", "Index Scan", "Index Only Scan", "Bitmap Heap Scan")
+
+
+class QueryRejected(Exception):
+    """Raised when a query is refused by the guard; the message tells how to rewrite it."""
+
+
+def strip_comments(query: str) -> str:
+    """Remove SQL comments and a trailing semicolon, keeping everything else as written."""
+    parts = []
+    position = 0
+    for match in SQL_TOKEN.finditer(query):
+        parts.append(query[position:match.start()])
+        parts.append(" " if match.lastgroup == "comment" else match.group())
+        position = match.end()
+    parts.append(query[position:])
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def _walk(plan: Dict[str, Any]) -> List[Dict[str, Any]]:
+    nodes = [plan]
+    for child in plan.get("Plans", []):
+        nodes += _walk(child)
+    return nodes
+
+
+def explain_plan(plan: Dict[str, Any], max_nodes: int = 3) -> str:
+    """Describe the costliest parts of a JSON plan in one line, e.g. scans and joins without a condition."""
+    notes = []
+    for node in _walk(plan):
+        if node["Node Type"] == "Nested Loop" and "Join Filter" not in node:
+            inner = node.get("Plans", [{}])[-1]
+            if not any(key in inner for key in ("Index Cond", "Recheck Cond", "Filter")):
+                notes.append((node.get("Total Cost", 0), f"Nested Loop without join condition ({node.get('Plan Rows', 0):,} rows)"))
+        elif node["Node Type"] in SCAN_NODES and "Relation Name" in node:
+            filtered = " with filter" if "Filter" in node or "Index Cond" in node else ""
+            notes.append((node.get("Total Cost", 0), f"{node['Node Type']} on {node['Relation Name']}{filtered} ({node.get('Plan Rows', 0):,} rows)"))
+        elif node["Node Type"] in ("Sort", "Hash Join", "Merge Join", "Aggregate"):
+            notes.append((node.get("Total Cost", 0) / 2, f"{node['Node Type']} ({node.get('Plan Rows', 0):,} rows)"))
+    notes.sort(key=lambda note: note[0], reverse=True)
+    return "; ".join(text for _, text in notes[:max_nodes])
+
+
+class QueryGuard:
+    """Checks queries against their estimated cost and row count before they run.
+
+    Queries over the limits get a LIMIT appended when that brings them under
+    the limits, and are rejected otherwise with a compact explanation of the
+    plan the agent can use to rewrite the query. In read-only mode statements
+    other than reads are rejected upfront.
+    """
+
+    def __init__(self,
+                 max_cost: float = 1_000_000.0,
+                 max_rows: int = 100_000,
+                 auto_limit: Optional[int] = 100,
+                 read_only: bool = True):
+        """
+        Args:
+            max_cost: Maximum estimated total cost of the plan, in PostgreSQL cost units
+            max_rows: Maximum estimated number of result rows
+            auto_limit: Row limit applied to reads over the limits, None to reject them instead
+            read_only: Reject statements other than reads
+        """
+        self.max_cost = max_cost
+        self.max_rows = max_rows
+        self.auto_limit = auto_limit
+        self.read_only = read_only
+
+    def check(self, query: str, explain: Callable[[str], Dict[str, Any]]) -> Tuple[str, Optional[str]]:
+        """Return the query to run, possibly with a LIMIT, and a note for the result if it was changed.
+
+        Args:
+            query: SQL query to check
+            explain: Returns the JSON plan (the "Plan" object of EXPLAIN (FORMAT JSON)) of a query
+
+        Raises:
+            QueryRejected: If the query is not allowed or too expensive.
+        """
+        statement = strip_comments(query)
+        keyword = statement.split(None, 1)[0].lower() if statement else ""
+        if self.read_only and keyword not in READ_STATEMENTS:
+            raise QueryRejected(f"Query rejected: the database is read-only here, {keyword.upper() or 'empty'} "
+                                f"statements are not allowed. Use SELECT to read data.")
+        if keyword not in EXPLAINABLE_STATEMENTS:
+            return query, None
+
+        plan = explain(statement)
+        problems = self._problems(plan)
+        if not problems:
+            return query, None
+
+        if self.auto_limit and keyword in LIMITABLE_STATEMENTS and not TRAILING_LIMIT.search(statement):
+            limited = f"SELECT * FROM ({statement}) AS limited_query LIMIT {self.auto_limit}"
+            if not self._problems(explain(limited)):
+                return limited, (f"Note: the query was estimated to return {plan.get('Plan Rows', 0):,} rows, "
+                                 f"only the first {self.auto_limit} are shown. Add filters or aggregate in SQL "
+                                 f"for complete results.")
+
+        raise QueryRejected(f"Query rejected by the cost guard: {'; '.join(problems)}. "
+                            f"Plan: {explain_plan(plan)}. "
+                            f"Rewrite the query with join conditions, selective WHERE filters, aggregation or a LIMIT.")
+
+    def _problems(self, plan: Dict[str, Any]) -> List[str]:
+        problems = []
+        cost, rows = plan.get("Total Cost", 0), plan.get("Plan Rows", 0)
+        if cost > self.max_cost:
+            problems.append(f"estimated cost {cost:,.0f} exceeds {self.max_cost:,.0f}")
+        if rows > self.max_rows:
+            problems.append(f"estimated {rows:,} rows exceed {self.max_rows:,}")
+        return problems
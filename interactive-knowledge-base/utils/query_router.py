@@ -0,0 +1,119 @@
+"""Keyword router sending clearly single-domain questions straight to one sub-agent."""
+
+import json
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+# Route -> weighted patterns; a question's score for a route is the sum of the weights of its matching patterns
+DEFAULT_ROUTES: Dict[str, Sequence[Tuple[str, float]]] = {
+    "query_database": (
+        (r"\btables?\b", 2), (r"\bcolumns?\b", 2), (r"\bschema\b", 2), (r"\bsql\b", 2), (r"\bdatabase\b", 2),
+        (r"\bforeign keys?\b", 2), (r"\bindex(?:es)?\b", 1), (r"\bdata types?\b", 1), (r"\bquery\b", 1),
+        (r"\bpostgres(?:ql)?\b", 2),
+    ),
+    "query_backend": (
+        (r"\bapis?\b", 2), (r"\bendpoints?\b", 2), (r"\bbackend\b", 2), (r"\bcontrollers?\b", 2), (r"\bjava\b", 2),
+        (r"\bspring\b", 2), (r"\bdtos?\b", 2), (r"\b(?:request|response) payloads?\b", 1), (r"\bservices?\b", 1),
+        (r"\bentit(?:y|ies)\b", 1), (r"\brepositor(?:y|ies)\b", 1), (r"\bdecline logic\b", 1),
+    ),
+    "query_frontend": (
+        (r"\bui\b", 2), (r"\bpages?\b", 2), (r"\bfrontend\b", 2), (r"\bcomponents?\b", 2), (r"\breact\b", 2),
+        (r"\btypescript\b", 2), (r"\bscreens?\b", 1), (r"\bforms?\b", 1), (r"\bbuttons?\b", 1),
+    ),
+}
+# Questions matching any of these need several tools, data lookups or reasoning over answers: always use the agent.
+# Patterns are matched case-insensitively, parts in (?-i:...) case-sensitively, e.g. names of people
+MULTI_STEP = (
+    r"\bstep \d", r"\bthen\b", r"\bexplain why\b", r"\btest plan\b", r"\be2e\b", r"\bend[- ]to[- ]end\b",
+    r"\bapplication id\b", r"\bstatus of an application for\b", r"\bfor (?-i:[A-Z][a-z]+ [A-Z][a-z]+)",
+    r"\bpass(?:es)? .* to the backend\b", r"\bwhich table and column\b", r"\bpersist",
+)
+
+
+class RouteDecision(NamedTuple):
+    """Outcome of routing a question: the tool to answer it directly, or None for the ReAct agent."""
+
+    route: Optional[str]
+    confidence: float
+    scores: Dict[str, float]
+    reason: str
+
+
+class QueryRouter:
+    """Routes questions by weighted keyword matches, without an LLM call.
+
+    The confidence of the best route is its share of all route scores times
+    top / (top + 1), so a route needs both a clear lead and enough evidence.
+    Questions below the threshold, without matches or with multi-step
+    markers go to the ReAct agent. Every decision is appended to a JSONL log
+    with its scores and latency, to tune keywords and threshold.
+    """
+
+    def __init__(self,
+                 routes: Optional[Dict[str, Sequence[Tuple[str, float]]]] = None,
+                 threshold: float = 0.6,
+                 log_path: Optional[Path] = None):
+        """
+        Args:
+            routes: Route name -> (regex, weight) patterns, defaults to DEFAULT_ROUTES
+            threshold: Minimum confidence for answering without the ReAct agent
+            log_path: JSONL file receiving every decision, None to not log
+        """
+        self.routes = {
+            name: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in patterns]
+            for name, patterns in (routes or DEFAULT_ROUTES).items()
+        }
+        self.multi_step = [re.compile(pattern, re.IGNORECASE) for pattern in MULTI_STEP]
+        self.threshold = threshold
+        self.log_path = Path(log_path) if log_path is not None else None
+        self._lock = threading.Lock()
+        self._counts: Dict[str, int] = {}
+
+    def route(self, question: str) -> RouteDecision:
+        """Decide whether a single sub-agent can answer the question."""
+        scores = {
+            name: sum(weight for pattern, weight in patterns if pattern.search(question))
+            for name, patterns in self.routes.items()
+        }
+        best = max(scores, key=scores.get)
+        top, total = scores[best], sum(scores.values())
+        confidence = round(top / total * top / (top + 1), 3) if total else 0.0
+
+        marker = next((pattern.pattern for pattern in self.multi_step if pattern.search(question)), None)
+        if marker is not None:
+            return RouteDecision(None, confidence, scores, f"multi-step marker {marker!r}")
+        if question.count("?") > 1:
+            return RouteDecision(None, confidence, scores, "several questions")
+        if confidence < self.threshold:
+            return RouteDecision(None, confidence, scores, f"confidence below {self.threshold}")
+        return RouteDecision(best, confidence, scores, "single domain")
+
+    def log(self, question: str, decision: RouteDecision, latency: float, fallback: bool = False) -> None:
+        """Count the decision and append it with the answer latency to the log."""
+        route = decision.route if decision.route is not None and not fallback else "react"
+        with self._lock:
+            self._counts[route] = self._counts.get(route, 0) + 1
+            if fallback:
+                self._counts["fallbacks"] = self._counts.get("fallbacks", 0) + 1
+            if self.log_path is None:
+                return
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps({
+                    "time": time.time(),
+                    "question": question,
+                    "route": decision.route,
+                    "confidence": decision.confidence,
+                    "scores": decision.scores,
+                    "reason": decision.reason,
+                    "fallback": fallback,
+                    "latency": round(latency, 3),
+                }) + "\n")
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of questions answered per route ("react" for the agent) and of fallbacks."""
+        with self._lock:
+            return dict(self._counts)
@@ -0,0 +1,295 @@
+"""Semantic response cache for sub-agent answers."""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+# Terms that must be present in both questions for a semantic hit: quoted text, code identifiers and numbers
+QUOTED = re.compile(r"(?<!\w)'([^'\n]+)'(?!\w)|\"([^\"\n]+)\"|`([^`\n]+)`")
+IDENTIFIER = re.compile(r"\b(?:\w+_\w+|[a-z]+[A-Z]\w*|\w*\d\w*|[A-Za-z]\w*(?:\.\w+)+)\b")
+SENTENCE_BREAK = re.compile(r"[.?!:;]\s+|\n")
+WORD = re.compile(r"[A-Za-z][\w-]*")
+
+
+def files_fingerprint(paths: Iterable[Path]) -> str:
+    """Return a cheap fingerprint of the given files based on their size and modification time."""
+    digest = hashlib.sha256()
+    for path in sorted(Path(path) for path in paths):
+        stat = path.stat()
+        digest.update(f"{path}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def directory_fingerprint(directory: Path, required_exts: Sequence[str]) -> str:
+    """Return a fingerprint of all files with the given extensions in the directory."""
+    directory = Path(directory)
+    return files_fingerprint(
+        path for path in directory.rglob("*")
+        if path.is_file()
+        and path.suffix in required_exts
+        and not any(part.startswith(".") for part in path.relative_to(directory).parts)
+    )
+
+
+def salient_terms(question: str) -> List[str]:
+    """Return the quoted text, identifiers, numbers and capitalised names in the question.
+
+    Embeddings of "status of the application for Wilma Mason" and "...for
+    John Smith" are nearly identical, so a semantic hit is only accepted if
+    both questions contain the same salient terms. Capitalised words are
+    names unless they start a sentence.
+    """
+    terms = {next(group for group in match.groups() if group) for match in QUOTED.finditer(question)}
+    unquoted = QUOTED.sub(" ", question)
+    terms.update(IDENTIFIER.findall(unquoted))
+    for sentence in SENTENCE_BREAK.split(unquoted):
+        words = WORD.findall(sentence)
+        terms.update(word for word in words[1:] if word[0].isupper())
+    return sorted(terms)
+
+
+class ResponseCache:
+    """LRU/TTL cache of question -> answer with a semantic similarity fallback.
+
+    Lookups first try an exact match on the normalized question. If that
+    misses and an embedding function is configured, the most similar cached
+    question above the similarity threshold is used instead, provided both
+    questions contain the same salient terms (see salient_terms). The whole
+    cache is dropped when the corpus fingerprint changes, e.g. when schema.sql
+    or an indexed source file is edited.
+
+    Answers are persisted to an append-only JSONL file, one line per put,
+    which is compacted once it holds twice as many lines as entries.
+    """
+
+    def __init__(self,
+                 fingerprint: Callable[[], str],
+                 embed: Optional[Callable[[str], List[float]]] = None,
+                 similarity_threshold: float = 0.95,
+                 max_entries: int = 256,
+                 ttl: Optional[float] = 24 * 60 * 60,
+                 persist_path: Optional[Path] = None,
+                 fingerprint_check_interval: float = 5.0):
+        """
+        Args:
+            fingerprint: Returns a fingerprint of the corpus the answers are based on
+            embed: Optional function returning an embedding for a question
+            similarity_threshold: Minimum cosine similarity for a semantic hit
+            max_entries: Maximum number of cached answers, least recently used are evicted first
+            ttl: Seconds an answer stays valid, None to keep answers until evicted
+            persist_path: Optional JSONL file the cache is loaded from and appended to
+            fingerprint_check_interval: Minimum seconds between corpus fingerprint checks
+        """
+        self._fingerprint = fingerprint
+        self._embed = embed
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist_path = Path(persist_path) if persist_path else None
+        self.fingerprint_check_interval = fingerprint_check_interval
+
+        self._lock = threading.RLock()
+        # Serializes writes to persist_path, never acquired while holding _lock
+        self._file_lock = threading.Lock()
+        self._persisted_lines = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._corpus = None
+        self._checked_at = 0.0
+        self._hits = 0
+        self._semantic_hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        # The embedding of the last missed question, reused by the put that usually follows
+        self._last_embedding = (None, None)
+
+        self._load()
+
+    def get(self, question: str) -> Optional[str]:
+        """Return the cached answer for the question or a near-duplicate of it."""
+        key = self._normalize(question)
+        with self._lock:
+            self._check_corpus()
+            self._expire()
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry["answer"]
+
+        embedding = self._embedding(question) if self._embed is not None else None
+        if embedding is not None:
+            terms = salient_terms(question)
+            with self._lock:
+                match = self._most_similar(embedding, terms)
+                if match is not None:
+                    self._entries.move_to_end(match)
+                    self._semantic_hits += 1
+                    return self._entries[match]["answer"]
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def put(self, question: str, answer: str) -> None:
+        """Cache the answer to the question, unless its embedding can't be computed."""
+        embedding = None
+        if self._embed is not None:
+            embedding = self._embedding(question)
+            if embedding is None:
+                return
+
+        key = self._normalize(question)
+        entry = {
+            "answer": answer,
+            "embedding": embedding,
+            "norm": self._norm(embedding),
+            "terms": salient_terms(question),
+            "created_at": time.time(),
+        }
+        with self._lock:
+            self._check_corpus()
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            corpus = self._corpus
+        self._append({"corpus": corpus, "key": key, "entry": entry})
+
+    def clear(self) -> None:
+        """Drop all cached answers."""
+        with self._lock:
+            self._entries.clear()
+        self._compact()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current number of entries."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "semantic_hits": self._semantic_hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+            }
+
+    def _embedding(self, question: str) -> Optional[List[float]]:
+        """Return the embedding of the question, or None if the embedding function failed."""
+        cached_question, embedding = self._last_embedding
+        if cached_question != question:
+            try:
+                embedding = self._embed(question)
+            except Exception:
+                # The cache is an optimization, an unavailable embedding service must not fail the query
+                return None
+            self._last_embedding = (question, embedding)
+        return embedding
+
+    def _normalize(self, question: str) -> str:
+        return re.sub(r"\s+", " ", question).strip().lower()
+
+    def _norm(self, embedding: Optional[List[float]]) -> float:
+        return math.sqrt(sum(value * value for value in embedding)) if embedding else 0.0
+
+    def _most_similar(self, embedding: List[float], terms: List[str]) -> Optional[str]:
+        norm = self._norm(embedding)
+        if not norm:
+            return None
+
+        best_key, best_score = None, self.similarity_threshold
+        for key, entry in self._entries.items():
+            if not entry["embedding"] or not entry["norm"] or entry.get("terms") != terms:
+                continue
+            dot = sum(a * b for a, b in zip(embedding, entry["embedding"]))
+            score = dot / (norm * entry["norm"])
+            if score >= best_score:
+                best_key, best_score = key, score
+        return best_key
+
+    def _check_corpus(self) -> None:
+        """Drop all entries if the corpus changed since they were cached."""
+        now = time.monotonic()
+        if self._corpus is not None and now - self._checked_at < self.fingerprint_check_interval:
+            return
+        self._checked_at = now
+
+        corpus = self._fingerprint()
+        if corpus == self._corpus:
+            return
+        if self._corpus is not None and self._entries:
+            self._invalidations += 1
+            self._entries.clear()
+        # Entries persisted for the previous corpus are skipped on load, so the file needs no rewrite here
+        self._corpus = corpus
+
+    def _expire(self) -> None:
+        if self.ttl is None:
+            return
+        oldest_allowed = time.time() - self.ttl
+        expired = [key for key, entry in self._entries.items() if entry["created_at"] < oldest_allowed]
+        for key in expired:
+            del self._entries[key]
+
+    def _load(self) -> None:
+        """Replay the persisted puts, keeping the entries cached for the most recent corpus."""
+        if self.persist_path is None or not self.persist_path.exists():
+            return
+        records = []
+        try:
+            with open(self.persist_path, "r") as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        # A line cut off by a crash is not worth failing for, skip it
+                        continue
+        except OSError:
+            return
+
+        records = [record for record in records if isinstance(record, dict) and "key" in record]
+        self._persisted_lines = len(records)
+        if not records:
+            return
+        self._corpus = records[-1].get("corpus")
+        for record in records:
+            if record.get("corpus") == self._corpus:
+                self._entries[record["key"]] = record["entry"]
+                self._entries.move_to_end(record["key"])
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        if self.persist_path is None:
+            return
+        with self._file_lock:
+            self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.persist_path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+            self._persisted_lines += 1
+            if self._persisted_lines <= 2 * self.max_entries:
+                return
+        self._compact()
+
+    def _compact(self) -> None:
+        """Rewrite the persisted file with only the current entries."""
+        if self.persist_path is None:
+            return
+        with self._file_lock:
+            with self._lock:
+                corpus = self._corpus
+                entries = list(self._entries.items())
+            self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so a crash never leaves a half-written cache
+            temporary = self.persist_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(temporary, "w") as f:
+                for key, entry in entries:
+                    f.write(json.dumps({"corpus": corpus, "key": key, "entry": entry}) + "\n")
+            os.replace(temporary, self.persist_path)
+            self._persisted_lines = len(entries)
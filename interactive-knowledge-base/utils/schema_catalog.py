@@ -0,0 +1,302 @@
+"""Structured catalog of database tables with table-level retrieval for schema questions."""
+
+import re
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+# Keywords that end the type part of a column definition
+COLUMN_CONSTRAINT_KEYWORDS = {
+    "not", "null", "default", "primary", "unique", "check", "references",
+    "constraint", "generated", "collate",
+}
+TABLE_CONSTRAINT_KEYWORDS = ("constraint", "primary", "foreign", "unique", "check", "exclude")
+
+CREATE_TABLE = re.compile(
+    r"create\s+table\s+(?:if\s+not\s+exists\s+)?([\w.\"]+)\s*\((.*?)\)\s*;",
+    re.IGNORECASE | re.DOTALL,
+)
+CREATE_INDEX = re.compile(
+    r"create\s+(unique\s+)?index\s+(?:if\s+not\s+exists\s+)?([\w\"]+)\s+on\s+([\w.\"]+)\s*\((.*?)\)\s*;",
+    re.IGNORECASE | re.DOTALL,
+)
+ALTER_TABLE_FOREIGN_KEY = re.compile(
+    r"alter\s+table\s+(?:only\s+)?([\w.\"]+)\s+add\s+((?:constraint\s+[\w\"]+\s+)?foreign\s+key.*?);",
+    re.IGNORECASE | re.DOTALL,
+)
+FOREIGN_KEY = re.compile(
+    r"foreign\s+key\s*\(([^)]*)\)\s*references\s+([\w.\"]+)\s*(?:\(([^)]*)\))?",
+    re.IGNORECASE,
+)
+INLINE_REFERENCE = re.compile(r"references\s+([\w.\"]+)\s*(?:\(([^)]*)\))?", re.IGNORECASE)
+WORD = re.compile(r"[a-z0-9]+")
+# Common question words that would otherwise match column names like years_in_operation
+STOP_WORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "get", "have",
+    "how", "in", "is", "it", "of", "on", "or", "the", "to", "we", "what", "where", "which", "who", "with",
+}
+
+
+def _identifier(name: str) -> str:
+    """Normalize a possibly quoted or schema-qualified identifier."""
+    return name.strip().strip('"').split(".")[-1].strip('"').lower()
+
+
+def _split_top_level(body: str) -> List[str]:
+    """Split a CREATE TABLE body on commas that are not nested in parentheses."""
+    parts, depth, current = [], 0, []
+    for char in body:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append("".join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    if "".join(current).strip():
+        parts.append("".join(current).strip())
+    return parts
+
+
+def _words(text: str) -> Set[str]:
+    """Lowercase words of the text, each with a naive singular form added."""
+    words = set()
+    for word in WORD.findall(text.lower()):
+        if word in STOP_WORDS:
+            continue
+        words.add(word)
+        if word.endswith("ies") and len(word) > 4:
+            words.add(word[:-3] + "y")
+        elif word.endswith("es") and len(word) > 4:
+            words.add(word[:-2])
+        if word.endswith("s") and len(word) > 3:
+            words.add(word[:-1])
+    return words
+
+
+class Column:
+    """A table column with its type and the full definition it was declared with."""
+
+    def __init__(self, name: str, data_type: str, definition: str, nullable: bool = True):
+        self.name = name
+        self.data_type = data_type
+        self.definition = definition
+        self.nullable = nullable
+
+
+class ForeignKey:
+    """A foreign key from columns of one table to columns of another."""
+
+    def __init__(self, columns: List[str], referenced_table: str, referenced_columns: List[str], definition: str):
+        self.columns = columns
+        self.referenced_table = referenced_table
+        self.referenced_columns = referenced_columns
+        self.definition = definition
+
+
+class Table:
+    """A table with its columns, constraints, foreign keys and indexes."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.columns: List[Column] = []
+        self.constraints: List[str] = []
+        self.foreign_keys: List[ForeignKey] = []
+        self.indexes: List[str] = []
+
+    def render(self) -> str:
+        """Render the table as compact DDL."""
+        lines = [f"    {column.definition}" for column in self.columns]
+        lines += [f"    {constraint}" for constraint in self.constraints]
+        ddl = f"CREATE TABLE {self.name} (\n" + ",\n".join(lines) + "\n);"
+        return "\n".join([ddl] + self.indexes)
+
+
+class SchemaCatalog:
+    """Catalog of the tables of a database schema.
+
+    The catalog is built once, either from a SQL schema file or by live
+    introspection, and keeps an inverted index from table and column name
+    words to tables. For every question only the matching tables and their
+    foreign key neighbours are rendered, so prompt size depends on the
+    question rather than on the size of the schema.
+    """
+
+    def __init__(self, tables: Iterable[Table]):
+        self.tables: Dict[str, Table] = {table.name: table for table in tables}
+        self._neighbours: Dict[str, Set[str]] = defaultdict(set)
+        self._index: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+        for table in self.tables.values():
+            for foreign_key in table.foreign_keys:
+                if foreign_key.referenced_table in self.tables:
+                    self._neighbours[table.name].add(foreign_key.referenced_table)
+                    self._neighbours[foreign_key.referenced_table].add(table.name)
+
+            # Table name words weigh more than column name words
+            for word in _words(table.name.replace("_", " ")):
+                self._index[word][table.name] += 3
+            for column in table.columns:
+                for word in _words(column.name.replace("_", " ")):
+                    self._index[word][table.name] += 1
+
+        # Words shared by every table (id, created_at, ...) don't point to any of them
+        if len(self.tables) > 1:
+            for word in [word for word, tables in self._index.items() if len(tables) == len(self.tables)]:
+                del self._index[word]
+
+    @classmethod
+    def from_sql(cls, text: str) -> "SchemaCatalog":
+        """Parse CREATE TABLE, CREATE INDEX and ALTER TABLE ... FOREIGN KEY statements."""
+        text = re.sub(r"--[^\n]*", "", text)
+        text = re.sub(r"/\*.*?\*/", "", text, flags=re.DOTALL)
+
+        tables = {}
+        for match in CREATE_TABLE.finditer(text):
+            table = Table(_identifier(match.group(1)))
+            for item in _split_top_level(match.group(2)):
+                cls._parse_table_item(table, " ".join(item.split()))
+            tables[table.name] = table
+
+        for match in CREATE_INDEX.finditer(text):
+            table = tables.get(_identifier(match.group(3)))
+            if table is not None:
+                table.indexes.append(" ".join(match.group(0).split()))
+
+        for match in ALTER_TABLE_FOREIGN_KEY.finditer(text):
+            table = tables.get(_identifier(match.group(1)))
+            if table is not None:
+                cls._parse_table_item(table, " ".join(match.group(2).split()))
+
+        return cls(tables.values())
+
+    @classmethod
+    def from_file(cls, schema_path: Path) -> "SchemaCatalog":
+        with open(schema_path, "r") as f:
+            return cls.from_sql(f.read())
+
+    @classmethod
+    def from_database(cls, executor, schema: str = "public") -> "SchemaCatalog":
+        """Build the catalog by introspecting a live database through a DatabaseExecutor."""
+        tables = {}
+        for row in executor.fetch_rows(INTROSPECT_COLUMNS, {"schema": schema}):
+            table = tables.setdefault(row["table_name"], Table(row["table_name"]))
+            definition = f"{row['column_name']} {row['data_type']}"
+            if row["is_nullable"] == "NO":
+                definition += " NOT NULL"
+            if row["column_default"] is not None:
+                definition += f" DEFAULT {row['column_default']}"
+            table.columns.append(Column(row["column_name"], row["data_type"], definition, row["is_nullable"] != "NO"))
+
+        for row in executor.fetch_rows(INTROSPECT_CONSTRAINTS, {"schema": schema}):
+            table = tables.get(row["table_name"])
+            if table is not None:
+                cls._parse_table_item(table, f"CONSTRAINT {row['constraint_name']} {row['definition']}")
+
+        for row in executor.fetch_rows(INTROSPECT_INDEXES, {"schema": schema}):
+            table = tables.get(row["table_name"])
+            if table is not None:
+                table.indexes.append(f"{row['definition']};")
+
+        return cls(tables.values())
+
+    def relevant_tables(self, question: str, max_tables: int = 10) -> List[str]:
+        """Return the tables matching the question plus their foreign key neighbours.
+
+        If nothing in the question points to specific tables, all tables are
+        returned for a small catalog and none for a large one.
+        """
+        scores: Dict[str, int] = defaultdict(int)
+        for word in _words(question):
+            for table, weight in self._index.get(word, {}).items():
+                scores[table] += weight
+
+        if not scores:
+            return list(self.tables) if len(self.tables) <= max_tables else []
+
+        matched = sorted(scores, key=lambda table: (-scores[table], table))[:max_tables]
+        selected = list(matched)
+        for table in matched:
+            selected += sorted(self._neighbours[table] - set(selected))
+        return selected
+
+    def render(self, table_names: Optional[Iterable[str]] = None) -> str:
+        """Render the given tables as DDL, followed by the names of the remaining tables."""
+        names = list(self.tables) if table_names is None else list(table_names)
+        parts = [self.tables[name].render() for name in names if name in self.tables]
+
+        others = [name for name in self.tables if name not in names]
+        if others:
+            parts.append("-- Other tables (ask about them by name for details): " + ", ".join(others))
+        return "\n\n".join(parts)
+
+    def render_for(self, question: str, max_tables: int = 10) -> str:
+        """Render the part of the schema relevant to the question."""
+        return self.render(self.relevant_tables(question, max_tables))
+
+    @staticmethod
+    def _parse_table_item(table: Table, item: str) -> None:
+        """Add a column or table constraint from a CREATE TABLE body item."""
+        first_word = item.split(None, 1)[0].lower()
+        if first_word in TABLE_CONSTRAINT_KEYWORDS:
+            table.constraints.append(item)
+            foreign_key = FOREIGN_KEY.search(item)
+            if foreign_key:
+                table.foreign_keys.append(ForeignKey(
+                    columns=[_identifier(c) for c in foreign_key.group(1).split(",")],
+                    referenced_table=_identifier(foreign_key.group(2)),
+                    referenced_columns=[_identifier(c) for c in (foreign_key.group(3) or "").split(",") if c.strip()],
+                    definition=item,
+                ))
+            return
+
+        tokens = item.split()
+        name = _identifier(tokens[0])
+        type_tokens = []
+        for token in tokens[1:]:
+            if token.lower() in COLUMN_CONSTRAINT_KEYWORDS:
+                break
+            type_tokens.append(token)
+        table.columns.append(Column(name, " ".join(type_tokens), item, "not null" not in item.lower()))
+
+        reference = INLINE_REFERENCE.search(item)
+        if reference:
+            table.foreign_keys.append(ForeignKey(
+                columns=[name],
+                referenced_table=_identifier(reference.group(1)),
+                referenced_columns=[_identifier(c) for c in (reference.group(2) or "").split(",") if c.strip()],
+                definition=item,
+            ))
+
+
+INTROSPECT_COLUMNS = """
+    SELECT table_name, column_name, data_type, is_nullable, column_default
+    FROM information_schema.columns
+    WHERE table_schema = %(schema)s
+    ORDER BY table_name, ordinal_position
+"""
+
+INTROSPECT_CONSTRAINTS = """
+    SELECT rel.relname AS table_name, con.conname AS constraint_name,
+           pg_get_constraintdef(con.oid) AS definition
+    FROM pg_constraint con
+    JOIN pg_class rel ON rel.oid = con.conrelid
+    JOIN pg_namespace nsp ON nsp.oid = rel.relnamespace
+    WHERE nsp.nspname = %(schema)s
+    ORDER BY rel.relname, con.contype, con.conname
+"""
+
+# Indexes backing a constraint, e.g. of PRIMARY KEY and UNIQUE, are left out, the constraints are listed already
+INTROSPECT_INDEXES = """
+    SELECT tbl.relname AS table_name, pg_get_indexdef(idx.indexrelid) AS definition
+    FROM pg_index idx
+    JOIN pg_class ind ON ind.oid = idx.indexrelid
+    JOIN pg_class tbl ON tbl.oid = idx.indrelid
+    JOIN pg_namespace nsp ON nsp.oid = tbl.relnamespace
+    WHERE nsp.nspname = %(schema)s
+      AND NOT idx.indisprimary
+      AND NOT EXISTS (SELECT 1 FROM pg_constraint con WHERE con.conindid = idx.indexrelid AND con.conrelid = idx.indrelid)
+    ORDER BY tbl.relname, ind.relname
+"""
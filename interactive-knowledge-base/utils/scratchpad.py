@@ -0,0 +1,197 @@
+"""Token-bounded ReAct scratchpad that shortens older observations and keeps them addressable by reference."""
+
+import re
+import threading
+from typing import Any, Callable, Dict, Optional, Sequence, Set, Tuple
+
+RECALL_REFERENCE = re.compile(r"^\s*\"?(obs-\d+)\"?(?:\s*:\s*(?:lines?\s+)?(\d+)\s*-\s*(\d+))?\s*$", re.IGNORECASE)
+
+
+def approximate_tokens(text: str) -> int:
+    """Rough token count of English text and code, about four characters per token."""
+    return (len(text) + 3) // 4
+
+
+class Scratchpad:
+    """Scratchpad of a single question.
+
+    Keeps every observation in full under a reference like "obs-2", renders
+    the ReAct steps within the token budget and counts the tokens saved
+    compared to rendering all observations verbatim.
+    """
+
+    def __init__(self,
+                 token_budget: int,
+                 keep_recent: int,
+                 preview_tokens: int,
+                 recall_tokens: int,
+                 count_tokens: Callable[[str], int]):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.preview_tokens = preview_tokens
+        self.recall_tokens = recall_tokens
+        self.count_tokens = count_tokens
+        self.observations: Dict[str, str] = {}
+        self.shortened: Set[str] = set()
+        self.renders = 0
+        self.tokens_sent = 0
+        self.tokens_saved = 0
+        self._token_counts: Dict[str, int] = {}
+
+    def render(self, intermediate_steps: Sequence[Tuple[Any, Any]]) -> str:
+        """Render the steps like format_log_to_str, shortening observations oldest first to fit the budget.
+
+        The most recent keep_recent observations are only shortened if they don't fit on their own.
+        """
+        logs = [action.log for action, _ in intermediate_steps]
+        texts = []
+        for position, (_, observation) in enumerate(intermediate_steps):
+            reference = f"obs-{position + 1}"
+            self.observations[reference] = str(observation)
+            texts.append(str(observation))
+
+        sizes = [self._tokens(f"log-{i}", log) + self._tokens(f"obs-{i + 1}", text)
+                 for i, (log, text) in enumerate(zip(logs, texts))]
+        full = total = sum(sizes)
+        recent = max(len(texts) - self.keep_recent, 0)
+
+        # Oldest first, the recent ones last and only down to what is left of the budget
+        for position in range(len(texts)):
+            if total <= self.token_budget:
+                break
+            reference = f"obs-{position + 1}"
+            others = total - sizes[position]
+            limit = self.preview_tokens if position < recent else max(self.token_budget - others, self.preview_tokens)
+            shortened = self._shorten(reference, texts[position], limit)
+            if shortened is texts[position]:
+                continue
+            texts[position] = shortened
+            self.shortened.add(reference)
+            size = self._tokens(f"log-{position}", logs[position]) + self.count_tokens(shortened)
+            total += size - sizes[position]
+            sizes[position] = size
+
+        self.renders += 1
+        self.tokens_sent += total
+        self.tokens_saved += full - total
+        return "".join(f"{log}\nObservation: {text}\nThought: " for log, text in zip(logs, texts))
+
+    def recall(self, reference: str) -> str:
+        """Return an observation by reference, e.g. "obs-2", or a line range of it, e.g. "obs-2:41-80"."""
+        match = RECALL_REFERENCE.match(reference)
+        if match is None or match.group(1).lower() not in self.observations:
+            known = ", ".join(self.observations) or "none yet"
+            return f"Unknown reference {reference!r}. Available references: {known}."
+
+        name = match.group(1).lower()
+        lines = self.observations[name].splitlines()
+        first = int(match.group(2)) if match.group(2) else 1
+        last = int(match.group(3)) if match.group(3) else len(lines)
+        first, last = max(first, 1), min(last, len(lines))
+
+        # Return whole lines up to recall_tokens, so recalled text doesn't blow the budget itself
+        selected = []
+        size = 0
+        for number in range(first, last + 1):
+            line_size = self.count_tokens(lines[number - 1]) + 1
+            if selected and size + line_size > self.recall_tokens:
+                break
+            selected.append(lines[number - 1])
+            size += line_size
+        end = first + len(selected) - 1
+        text = "\n".join(selected)
+        if end < len(lines):
+            text += (f"\n[Lines {first}-{end} of {len(lines)}. Call recall_observation with "
+                     f"\"{name}:{end + 1}-{end + len(selected)}\" to read on.]")
+        return text
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "observations": len(self.observations),
+            "shortened": len(self.shortened),
+            "tokens_sent": self.tokens_sent,
+            "tokens_saved": self.tokens_saved,
+        }
+
+    def _shorten(self, reference: str, text: str, max_tokens: int) -> str:
+        """Keep the leading lines of the text within max_tokens and point to the full text by reference."""
+        tokens = self._tokens(reference, text)
+        if tokens <= max_tokens:
+            return text
+
+        lines = text.splitlines()
+        head = []
+        size = 0
+        for line in lines:
+            line_size = self.count_tokens(line) + 1
+            if size + line_size > max_tokens:
+                if not head:
+                    # A single long line, cut it proportionally
+                    head.append(line[:max(len(line) * max_tokens // line_size, 1)])
+                break
+            head.append(line)
+            size += line_size
+        shown = len(head)
+        return ("\n".join(head) +
+                f"\n[{reference} shortened from {tokens:,} tokens, showing {shown} of {len(lines)} lines. "
+                f"Call recall_observation with \"{reference}\" or a line range like "
+                f"\"{reference}:{shown + 1}-{shown + 40}\" to read the rest.]")
+
+    def _tokens(self, key: str, text: str) -> int:
+        # Steps are immutable, so their token counts are computed once per question
+        count = self._token_counts.get(key)
+        if count is None:
+            count = self._token_counts[key] = self.count_tokens(text)
+        return count
+
+
+class ScratchpadManager:
+    """Creates the scratchpads of an agent's questions and aggregates their savings.
+
+    ReAct agents re-send the whole scratchpad on every iteration, so long
+    observations such as query results or sub-agent answers make prompts
+    grow with every step. The scratchpads keep the rendered steps within
+    token_budget by shortening older observations to a preview with a
+    reference the agent can pass to a recall tool.
+    """
+
+    def __init__(self,
+                 token_budget: int = 3000,
+                 keep_recent: int = 1,
+                 preview_tokens: int = 150,
+                 recall_tokens: int = 1500,
+                 count_tokens: Optional[Callable[[str], int]] = None):
+        """
+        Args:
+            token_budget: Maximum number of tokens of the rendered scratchpad
+            keep_recent: Number of latest observations kept verbatim as long as they fit the budget
+            preview_tokens: Tokens kept of a shortened observation
+            recall_tokens: Maximum number of tokens returned by a single recall
+            count_tokens: Token counter, defaults to approximate_tokens
+        """
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.preview_tokens = preview_tokens
+        self.recall_tokens = recall_tokens
+        self.count_tokens = count_tokens or approximate_tokens
+        self._lock = threading.Lock()
+        self._totals = {"questions": 0, "shortened": 0, "tokens_sent": 0, "tokens_saved": 0}
+
+    def create(self) -> Scratchpad:
+        """Return a new scratchpad for a question."""
+        return Scratchpad(self.token_budget, self.keep_recent, self.preview_tokens, self.recall_tokens,
+                          self.count_tokens)
+
+    def record(self, scratchpad: Scratchpad) -> Dict[str, int]:
+        """Add the savings of an answered question to the totals and return its stats."""
+        stats = scratchpad.stats()
+        with self._lock:
+            self._totals["questions"] += 1
+            for key in ("shortened", "tokens_sent", "tokens_saved"):
+                self._totals[key] += stats[key]
+        return stats
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of questions, shortened observations and tokens sent and saved so far."""
+        with self._lock:
+            return dict(self._totals)
@@ -0,0 +1,209 @@
+"""Lightweight spans with JSONL trace export and Prometheus-style metrics."""
+
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRIC_PREFIX = "ikb"
+
+# Span of the code currently running, parent of spans opened with Tracer.span
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional["Span"]:
+    """Return the span opened with Tracer.span that encloses the running code, if any."""
+    return _current_span.get()
+
+
+def use_span(span: Optional["Span"]) -> Optional["Span"]:
+    """Make the span the parent of spans opened in this context and return the previous one."""
+    previous = _current_span.get()
+    _current_span.set(span)
+    return previous
+
+
+class Span:
+    """A timed operation such as an LLM call, tool call, retrieval or SQL execution.
+
+    Token usage (prompt_tokens, completion_tokens, total_tokens), the agent
+    iteration and other details are kept in attributes.
+    """
+
+    __slots__ = ("span_id", "trace_id", "parent_id", "kind", "name", "attributes",
+                 "start_time", "duration", "status", "error", "_started")
+
+    def __init__(self, kind: str, name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.span_id = uuid.uuid4().hex[:16]
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.parent_id = parent_id
+        self.kind = kind
+        self.name = name
+        self.attributes = attributes or {}
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self._started = time.perf_counter()
+
+    def fail(self, error: BaseException) -> None:
+        """Mark the span as failed, e.g. for errors that are handled rather than raised."""
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "kind": self.kind,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class Tracer:
+    """Thread-safe collector of finished spans and of metrics aggregated from them.
+
+    The most recent spans are kept in a bounded buffer for JSONL export,
+    metrics are aggregated for all spans ever finished. Components only
+    record spans when a tracer is passed to them, so tracing costs nothing
+    when it is off.
+    """
+
+    def __init__(self, max_spans: int = 10000, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Args:
+            max_spans: Number of finished spans buffered for export, older spans are dropped
+            buckets: Upper bounds in seconds of the latency histogram buckets
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+        # (kind, name, status) -> [count, sum, bucket counts...]
+        self._latency: Dict[Tuple[str, str, str], List[float]] = {}
+        # (kind, name, token type) -> tokens
+        self._tokens: Dict[Tuple[str, str, str], int] = defaultdict(int)
+
+    def start_span(self, kind: str, name: str, parent: Optional[Span] = None, **attributes: Any) -> Span:
+        """Start a span, as child of the given parent span if any."""
+        if parent is None:
+            return Span(kind, name, attributes=attributes)
+        return Span(kind, name, trace_id=parent.trace_id, parent_id=parent.span_id, attributes=attributes)
+
+    def finish(self, span: Span, error: Optional[BaseException] = None) -> None:
+        """End the span and record it."""
+        span.duration = time.perf_counter() - span._started
+        if error is not None:
+            span.fail(error)
+
+        with self._lock:
+            self._spans.append(span)
+            key = (span.kind, span.name, span.status)
+            latency = self._latency.get(key)
+            if latency is None:
+                latency = self._latency[key] = [0, 0.0] + [0] * len(self.buckets)
+            latency[0] += 1
+            latency[1] += span.duration
+            for position, bound in enumerate(self.buckets):
+                if span.duration <= bound:
+                    latency[2 + position] += 1
+            for token_type in ("prompt_tokens", "completion_tokens"):
+                tokens = span.attributes.get(token_type)
+                if tokens:
+                    self._tokens[(span.kind, span.name, token_type[:-len("_tokens")])] += tokens
+
+    @contextmanager
+    def span(self, kind: str, name: str, **attributes: Any) -> Iterator[Span]:
+        """Record the enclosed block as a span, nested under the span currently running in this context."""
+        span = self.start_span(kind, name, parent=_current_span.get(), **attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            self.finish(span, e)
+            raise
+        else:
+            self.finish(span)
+        finally:
+            _current_span.reset(token)
+
+    def spans(self) -> List[Span]:
+        """Return the buffered spans, oldest first."""
+        with self._lock:
+            return list(self._spans)
+
+    def drain(self) -> List[Span]:
+        """Return and remove the buffered spans."""
+        with self._lock:
+            spans = list(self._spans)
+            self._spans.clear()
+            return spans
+
+    def export_jsonl(self, path: Path) -> int:
+        """Append the buffered spans to a JSONL file, one span per line, and return how many were written."""
+        spans = self.drain()
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "a") as f:
+            for span in spans:
+                f.write(json.dumps(span.to_dict(), default=str) + "\n")
+        return len(spans)
+
+    def prometheus_text(self) -> str:
+        """Render the aggregated metrics in the Prometheus text exposition format."""
+        with self._lock:
+            latency = {key: list(values) for key, values in self._latency.items()}
+            tokens = dict(self._tokens)
+
+        duration = f"{METRIC_PREFIX}_span_duration_seconds"
+        lines = [
+            f"# HELP {duration} Duration of spans by kind, name and status.",
+            f"# TYPE {duration} histogram",
+        ]
+        for (kind, name, status), values in sorted(latency.items()):
+            labels = f'kind="{_escape(kind)}",name="{_escape(name)}",status="{status}"'
+            for bound, count in zip(self.buckets, values[2:]):
+                lines.append(f'{duration}_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'{duration}_bucket{{{labels},le="+Inf"}} {values[0]}')
+            lines.append(f"{duration}_sum{{{labels}}} {values[1]:.6f}")
+            lines.append(f"{duration}_count{{{labels}}} {values[0]}")
+
+        errors = f"{METRIC_PREFIX}_span_errors_total"
+        lines += [f"# HELP {errors} Number of failed spans.", f"# TYPE {errors} counter"]
+        for (kind, name, status), values in sorted(latency.items()):
+            if status == "error":
+                lines.append(f'{errors}{{kind="{_escape(kind)}",name="{_escape(name)}"}} {values[0]}')
+
+        tokens_total = f"{METRIC_PREFIX}_tokens_total"
+        lines += [f"# HELP {tokens_total} Tokens used by LLM calls.", f"# TYPE {tokens_total} counter"]
+        for (kind, name, token_type), count in sorted(tokens.items()):
+            lines.append(f'{tokens_total}{{kind="{_escape(kind)}",name="{_escape(name)}",type="{token_type}"}} {count}')
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def openai_token_usage(raw: Any) -> Dict[str, int]:
+    """Token usage of a raw OpenAI response, given as a dict or as a response object."""
+    usage = raw.get("usage") if isinstance(raw, dict) else getattr(raw, "usage", None)
+    if usage is None:
+        return {}
+    if not isinstance(usage, dict):
+        usage = {key: getattr(usage, key, None) for key in ("prompt_tokens", "completion_tokens", "total_tokens")}
+    return {key: usage[key] for key in ("prompt_tokens", "completion_tokens", "total_tokens") if usage.get(key)}
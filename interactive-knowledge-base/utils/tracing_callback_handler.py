@@ -0,0 +1,146 @@
+"""Callback Handler that records LangChain runs as spans of a Tracer."""
+
+import threading
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.agents import AgentAction
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from utils.tracing import Span, Tracer, current_span, openai_token_usage, use_span
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """Callback Handler that records LLM calls, tool calls and retrievals as spans.
+
+    The outermost chain run, e.g. the AgentExecutor, becomes the root span of
+    the trace and counts the agent iterations; LLM and tool spans carry the
+    iteration they belong to. Pass the handler in the run config
+    (`invoke(..., config={"callbacks": [handler]})`) so nested runs report to it.
+    While a synchronous tool runs its span is the current span, so spans the
+    tool records itself, e.g. sub-agent queries and SQL, nest under it.
+    """
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        self._lock = threading.Lock()
+        self._spans: Dict[UUID, Span] = {}
+        self._parents: Dict[UUID, Optional[UUID]] = {}
+        self._previous_spans: Dict[UUID, Optional[Span]] = {}
+
+    def on_chain_start(self, serialized: Optional[Dict[str, Any]], inputs: Dict[str, Any], *, run_id: UUID,
+                       parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        # Only the outermost chain gets a span, nested runnables are bookkeeping
+        if parent_run_id is None:
+            self._start("chain", _run_name(serialized, kwargs, "chain"), run_id, parent_run_id, iterations=0)
+        else:
+            with self._lock:
+                self._parents[run_id] = parent_run_id
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    def on_agent_action(self, action: AgentAction, *, run_id: UUID, **kwargs: Any) -> None:
+        with self._lock:
+            root = self._root_span(run_id)
+            if root is not None:
+                root.attributes["iterations"] = root.attributes.get("iterations", 0) + 1
+
+    def on_llm_start(self, serialized: Optional[Dict[str, Any]], prompts: List[str], *, run_id: UUID,
+                     parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._start("llm", _run_name(serialized, kwargs, "llm"), run_id, parent_run_id, step=1)
+
+    def on_chat_model_start(self, serialized: Optional[Dict[str, Any]], messages: List[List[Any]], *, run_id: UUID,
+                            parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._start("llm", _run_name(serialized, kwargs, "chat_model"), run_id, parent_run_id, step=1)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, **_token_usage(response))
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    def on_tool_start(self, serialized: Optional[Dict[str, Any]], input_str: str, *, run_id: UUID,
+                      parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        # The tool runs in the iteration of the agent action that requested it
+        self._start("tool", _run_name(serialized, kwargs, "tool"), run_id, parent_run_id, step=0)
+        self._previous_spans[run_id] = use_span(self._spans.get(run_id))
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        use_span(self._previous_spans.pop(run_id, None))
+        self._end(run_id)
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        use_span(self._previous_spans.pop(run_id, None))
+        self._end(run_id, error)
+
+    def on_retriever_start(self, serialized: Optional[Dict[str, Any]], query: str, *, run_id: UUID,
+                           parent_run_id: Optional[UUID] = None, **kwargs: Any) -> None:
+        self._start("retrieval", _run_name(serialized, kwargs, "retriever"), run_id, parent_run_id)
+
+    def on_retriever_end(self, documents: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, documents=len(documents))
+
+    def on_retriever_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._end(run_id, error)
+
+    def _start(self, kind: str, name: str, run_id: UUID, parent_run_id: Optional[UUID],
+               step: Optional[int] = None, **attributes: Any) -> None:
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+            parent = self._nearest_span(parent_run_id) if parent_run_id is not None else current_span()
+            if step is not None:
+                root = self._root_span(run_id)
+                if root is not None and "iterations" in root.attributes:
+                    attributes["iteration"] = root.attributes["iterations"] + step
+            self._spans[run_id] = self.tracer.start_span(kind, name, parent=parent, **attributes)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None, **attributes: Any) -> None:
+        with self._lock:
+            self._parents.pop(run_id, None)
+            span = self._spans.pop(run_id, None)
+        if span is not None:
+            span.attributes.update(attributes)
+            self.tracer.finish(span, error)
+
+    def _nearest_span(self, run_id: Optional[UUID]) -> Optional[Span]:
+        while run_id is not None:
+            span = self._spans.get(run_id)
+            if span is not None:
+                return span
+            run_id = self._parents.get(run_id)
+        return None
+
+    def _root_span(self, run_id: Optional[UUID]) -> Optional[Span]:
+        root = None
+        while run_id is not None:
+            root = self._spans.get(run_id, root)
+            run_id = self._parents.get(run_id)
+        return root
+
+
+def _run_name(serialized: Optional[Dict[str, Any]], kwargs: Dict[str, Any], default: str) -> str:
+    if kwargs.get("name"):
+        return kwargs["name"]
+    serialized = serialized or {}
+    return serialized.get("name") or (serialized.get("id") or [default])[-1]
+
+
+def _token_usage(response: LLMResult) -> Dict[str, int]:
+    """Token usage of a LangChain LLM result, from llm_output or from the message usage metadata."""
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    if usage:
+        return openai_token_usage({"usage": usage})
+
+    totals = {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    for generations in response.generations:
+        for generation in generations:
+            metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+            totals["prompt_tokens"] += metadata.get("input_tokens", 0)
+            totals["completion_tokens"] += metadata.get("output_tokens", 0)
+            totals["total_tokens"] += metadata.get("total_tokens", 0)
+    return {key: value for key, value in totals.items() if value}